@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import connection, transaction
 from django.db.models import Sum, Count
 from django.utils.html import format_html
 from django.urls import reverse
@@ -10,6 +11,9 @@ from .models import (
     RevenueEvent, CostEvent, Contract, ContractParty, RecoupmentAccount,
     PayoutRun, PayoutLine, PlatformRelease, PlatformTrack, FxRate
 )
+from .models_etl import DwDimStore
+from .services.dw_cache import DwGenerationService
+from .services.store_dimension import StoreDimensionService
 
 
 @admin.register(Platform)
@@ -109,7 +113,9 @@ class RevenueEventAdmin(admin.ModelAdmin):
             'ISRC', 'UPC/EAN', 'Label Order Nr'
         ])
         
-        for event in queryset:
+        # Server-side cursor so large selections are not loaded into memory at once
+        events = queryset.select_related('platform', 'store', 'country').iterator(chunk_size=2000)
+        for event in events:
             writer.writerow([
                 event.occurred_at,
                 event.platform.name if event.platform else '',
@@ -208,6 +214,26 @@ class FxRateAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
 
 
+@admin.register(DwDimStore)
+class DwDimStoreAdmin(admin.ModelAdmin):
+    list_display = ('store_name', 'store_canonical')
+    list_editable = ('store_canonical',)
+    search_fields = ('store_name', 'store_canonical')
+    # Facts reference the store by key and see changes at once; the rollup months and facets
+    # showing the store are refreshed on save. Each change bumps the DW generation, so cached
+    # analytics responses and ETags are not served stale.
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic(), connection.cursor() as cur:
+            super().save_model(request, obj, form, change)
+            StoreDimensionService.refresh_store(cur, obj.store_name)
+        DwGenerationService.bump(mode='store_mapping')
+
+    def has_delete_permission(self, request, obj=None):
+        # Facts keep referencing their store: members are never deleted
+        return False
+
+
 # Register remaining models with basic admin
 admin.site.register(RecoupmentAccount)
 admin.site.register(PayoutLine)
@@ -0,0 +1,39 @@
+"""
+Async routes for the finance analytics actions.
+
+Served under /api/finances/revenue-async/<action>/ through the ASGI
+application (label_manager/asgi.py). They return the same payloads as the
+RevenueAnalysisViewSet actions, but the viewset runs with
+concurrent_aggregates enabled so independent aggregates overlap on worker
+connections instead of running one after another.
+"""
+
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+
+from .views import RevenueAnalysisViewSet
+
+# Actions whose independent aggregates run concurrently in the async variant
+CONCURRENT_ACTIONS = (
+    'kpi_summary',
+    'monthly_overview',
+    'platform_pie_chart',
+    'currency_data',
+    'data_source_summary',
+)
+
+
+def _async_action(action_name):
+    view = RevenueAnalysisViewSet.as_view({'get': action_name}, concurrent_aggregates=True)
+
+    @csrf_exempt
+    async def async_view(request, *args, **kwargs):
+        # The DRF view itself is synchronous; it runs in the thread-sensitive
+        # executor while its aggregates are scheduled on this event loop
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    async_view.__name__ = f'{action_name}_async'
+    return async_view
+
+
+async_views = {name: _async_action(name) for name in CONCURRENT_ACTIONS}
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+
+from finances.async_views import CONCURRENT_ACTIONS
+
+
+class Command(BaseCommand):
+    help = 'Compare wall-clock time of the sync analytics actions with their concurrent async variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--actions', type=str, default=','.join(CONCURRENT_ACTIONS),
+                            help='Comma-separated actions to benchmark')
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--query', type=str, default='', help='Query string passed to every request (filters)')
+        parser.add_argument('--output', type=str, default=None, help='Write results as JSON to this path')
+
+    def handle(self, *args, **options):
+        actions = [a.strip() for a in options['actions'].split(',') if a.strip()]
+        unknown = [a for a in actions if a not in CONCURRENT_ACTIONS]
+        if unknown:
+            raise CommandError(f"No async variant for: {', '.join(unknown)}")
+        iterations = options['iterations']
+        query = f"?{options['query']}" if options['query'] else ''
+
+        # Dummy cache so every request runs its queries instead of hitting the generation cache
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            ALLOWED_HOSTS=['testserver'],
+        ):
+            results = asyncio.run(self._run(actions, iterations, query))
+
+        self.stdout.write(f"{'action':<22} {'sync ms':>10} {'async ms':>10} {'speedup':>8}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<22} {row['sync_ms']:>10.1f} {row['async_ms']:>10.1f} {row['speedup']:>7.2f}x"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'iterations': iterations, 'query': options['query'], 'actions': results}, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    async def _run(self, actions, iterations, query):
+        from asgiref.sync import sync_to_async
+
+        sync_client = Client()
+        async_client = AsyncClient()
+        results = {}
+        for name in actions:
+            sync_url = f'/api/finances/revenue/{name}/{query}'
+            async_url = f'/api/finances/revenue-async/{name}/{query}'
+
+            # Warm up connections and compare payloads once
+            sync_response = await sync_to_async(sync_client.get)(sync_url)
+            async_response = await async_client.get(async_url)
+            if sync_response.status_code != 200 or async_response.status_code != 200:
+                raise CommandError(
+                    f'{name}: HTTP {sync_response.status_code} (sync) / {async_response.status_code} (async)'
+                )
+            same = json.loads(sync_response.content) == json.loads(async_response.content)
+
+            sync_times = []
+            async_times = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                await sync_to_async(sync_client.get)(sync_url)
+                sync_times.append((time.perf_counter() - started) * 1000)
+
+                started = time.perf_counter()
+                await async_client.get(async_url)
+                async_times.append((time.perf_counter() - started) * 1000)
+
+            sync_ms = statistics.median(sync_times)
+            async_ms = statistics.median(async_times)
+            results[name] = {
+                'sync_ms': round(sync_ms, 2),
+                'async_ms': round(async_ms, 2),
+                'speedup': round(sync_ms / async_ms, 2) if async_ms else 0,
+                'same_payload': same,
+            }
+        return results
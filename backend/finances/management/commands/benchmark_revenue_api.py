@@ -0,0 +1,111 @@
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from finances.services.instrumentation import QueryCounter
+from finances.services.synthetic_data import SyntheticRevenueGenerator
+from finances.views import RevenueAnalysisViewSet
+
+
+class Command(BaseCommand):
+    help = 'Time every RevenueAnalysisViewSet action and write machine-readable results (optionally on synthetic data)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generate', type=str, default=None,
+                            help='Load this many synthetic rows first (e.g. 1M); replaces earlier synthetic rows and rebuilds the DW')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--actions', type=str, default='',
+                            help='Comma-separated actions (default: every GET action)')
+        parser.add_argument('--exclude', type=str, default='export', help='Comma-separated actions to skip')
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--query', type=str, default='', help='Query string passed to every request')
+        parser.add_argument('--output', type=str, default=None, help='Write results as JSON to this path')
+        parser.add_argument('--compare', type=str, default=None, help='Earlier results JSON to compare against')
+
+    def handle(self, *args, **options):
+        if options['generate']:
+            call_command('generate_synthetic_revenue', rows=options['generate'], seed=options['seed'],
+                         replace=True, stdout=self.stdout)
+
+        available = [
+            extra.__name__ for extra in RevenueAnalysisViewSet.get_extra_actions()
+            if 'get' in extra.mapping
+        ]
+        actions = [a.strip() for a in options['actions'].split(',') if a.strip()] or available
+        unknown = [a for a in actions if a not in available]
+        if unknown:
+            raise CommandError(f"Unknown actions: {', '.join(unknown)}")
+        excluded = {a.strip() for a in options['exclude'].split(',') if a.strip()}
+        if not options['actions']:
+            actions = [a for a in actions if a not in excluded]
+
+        query = f"?{options['query']}" if options['query'] else ''
+        # Dummy cache so every iteration measures the queries, not the generation cache
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            ALLOWED_HOSTS=['testserver'],
+        ):
+            results = {name: self._bench(Client(), name, query, options['iterations']) for name in actions}
+
+        report = {
+            'meta': {
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+                'iterations': options['iterations'],
+                'query': options['query'],
+                'python': platform.python_version(),
+                'postgres': connection.cursor().connection.server_version,
+            },
+            'dataset': SyntheticRevenueGenerator.existing_rows(),
+            'actions': results,
+        }
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh).get('actions', {})
+
+        self.stdout.write(f"{'action':<24} {'median ms':>10} {'p95 ms':>9} {'queries':>8} {'db ms':>8} {'bytes':>10}"
+                          + (f" {'vs base':>8}" if baseline else ''))
+        for name, row in results.items():
+            line = (f"{name:<24} {row['median_ms']:>10.1f} {row['p95_ms']:>9.1f} {row['queries']:>8} "
+                    f"{row['db_ms']:>8.1f} {row['bytes']:>10}")
+            if baseline and name in baseline and row['median_ms']:
+                line += f" {baseline[name]['median_ms'] / row['median_ms']:>7.2f}x"
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _bench(self, client, name, query, iterations):
+        url = f'/api/finances/revenue/{name}/{query}'
+        timings = []
+        for i in range(iterations + 1):
+            with QueryCounter() as counter:
+                started = time.perf_counter()
+                response = client.get(url)
+                size = sum(len(chunk) for chunk in response.streaming_content) if response.streaming \
+                    else len(response.content)
+                elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise CommandError(f'{name}: HTTP {response.status_code}')
+            # First request warms connections and plans; it is not timed
+            if i:
+                timings.append(elapsed)
+
+        timings.sort()
+        return {
+            'median_ms': round(statistics.median(timings), 2),
+            'min_ms': round(timings[0], 2),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            'queries': counter.count,
+            'db_ms': round(counter.db_time * 1000, 2),
+            'bytes': size,
+        }
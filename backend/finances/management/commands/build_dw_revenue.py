@@ -1,125 +1,600 @@
-from django.core.management.base import BaseCommand
-from django.db import connection
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from finances.services.exchange_rate_service import ExchangeRateService
+from finances.services.dw_rollup import MonthlyRollupService
+from finances.services.dw_sketches import DistinctSketchService
+from finances.services.dw_cache import DwGenerationService
+from finances.services.dw_facets import FacetIndexService
+from finances.services.dw_watermarks import DwWatermarkService
+from finances.services.dw_shadow import ShadowTableService
+from finances.services.dw_dimensions import DimensionService
+from finances.services.dw_partitions import FactPartitionError, FactPartitionService
+from finances.services.staging_sync import StagingSyncService
+from finances.services.store_dimension import StoreDimensionService
+from finances.services.leaderboard import LeaderboardService
+from finances.services.load_ledger import LoadLedgerService
+
+
+FACT_TABLE = 'dw.fact_revenue'
+
+# Facts of one source, for the incremental checks (the fact table holds dw.dim_source keys)
+SOURCE_FACTS = "source_key IN (SELECT id FROM dw.dim_source WHERE source = %s)"
+
+# Parallel full builds cut about this many month-range slices per worker, so
+# a worker that finishes early picks up another slice
+SLICES_PER_WORKER = 2
 
 
 class Command(BaseCommand):
-    help = 'Populate dw.fact_revenue from raw.bandcamp_event_raw and staging.distribution_event'
+    help = ('Populate dw.fact_revenue (partitioned by quarter) from raw.bandcamp_event_raw and '
+            'staging.distribution_event; loads only rows above each source\'s watermark unless --full is given')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild every fact into a shadow table and swap it in '
+                                 '(also re-converts old rows at current rates)')
+        parser.add_argument('--source-file', type=int, action='append', default=[], dest='source_files',
+                            help='Replace the distribution facts of this SourceFile id (repeatable), '
+                                 'e.g. after a statement was re-imported; files changed by '
+                                 'build_staging_distribution are replaced without it')
+        parser.add_argument('--quarter', action='append', default=[], dest='quarters',
+                            help='Rebuild the partition of this quarter, e.g. 2024Q1 (repeatable); '
+                                 'the quarter is loaded aside and attached in place of the current partition')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Load a full rebuild in slices by source and month range across this many '
+                                 'database connections (default: 1, a single INSERT per source)')
 
     def handle(self, *args, **options):
+        try:
+            quarters = sorted({FactPartitionService.parse_quarter(value) for value in options['quarters']})
+        except FactPartitionError as e:
+            raise CommandError(str(e))
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+
         # Get current exchange rates
         usd_to_brl_rate = ExchangeRateService.get_rate_to_brl('USD')
         eur_to_brl_rate = ExchangeRateService.get_rate_to_brl('EUR')
-        
+
         # Calculate cross rates (BRL as base)
         brl_to_usd_rate = 1 / usd_to_brl_rate  # ~0.185
         brl_to_eur_rate = 1 / eur_to_brl_rate  # ~0.158
-        
+
         # Calculate USD/EUR cross rate
         usd_to_eur_rate = brl_to_eur_rate / brl_to_usd_rate  # ~0.854
         eur_to_usd_rate = 1 / usd_to_eur_rate  # ~1.171
-        
+
         self.stdout.write(f'Exchange rates:')
         self.stdout.write(f'  USD->BRL: {usd_to_brl_rate}, BRL->USD: {brl_to_usd_rate}')
         self.stdout.write(f'  EUR->BRL: {eur_to_brl_rate}, BRL->EUR: {brl_to_eur_rate}')
         self.stdout.write(f'  USD->EUR: {usd_to_eur_rate}, EUR->USD: {eur_to_usd_rate}')
-        
-        with connection.cursor() as cur:
-            # Clear fact table
-            cur.execute("TRUNCATE TABLE dw.fact_revenue")
 
-            # Bandcamp (USD base) - convert to all currencies
+        # Worker connections only see committed tables, so this first transaction commits the
+        # store mappings and, for a parallel full build, the empty shadow they load into
+        with transaction.atomic(), connection.cursor() as cur:
+            # Map any new store names before facts are keyed against dw.dim_store
+            new_stores = StoreDimensionService.sync(cur)
+            self.stdout.write(f'  dw.dim_store: {new_stores} new store mappings')
+
+            cur.execute("SELECT EXISTS (SELECT 1 FROM staging.distribution_event)")
+            use_staging = cur.fetchone()[0]
+            sources = {
+                'bandcamp': self._bandcamp_source(usd_to_brl_rate, usd_to_eur_rate),
+                'distribution': self._distribution_source(
+                    use_staging, usd_to_brl_rate, eur_to_brl_rate, eur_to_usd_rate,
+                    brl_to_usd_rate, usd_to_eur_rate, brl_to_eur_rate
+                ),
+            }
+
+            # Facts are keyed and partitioned by date: rows without one are left out in every mode
+            for name, spec in sources.items():
+                cur.execute(f"SELECT COUNT(*) {spec['undated']}")
+                undated = cur.fetchone()[0]
+                if undated:
+                    self.stdout.write(self.style.WARNING(f'  {name}: {undated} rows without a date not loaded'))
+
+            # A fact table from before partitioning is converted by a full rebuild
+            full = (options['full'] or any(DwWatermarkService.get(cur, name) is None for name in sources)
+                    or not FactPartitionService.is_partitioned(cur, FACT_TABLE))
+            parallel = full and workers > 1
+            if parallel:
+                self.stdout.write(f'  Mode: full rebuild ({workers} workers)')
+                target = ShadowTableService.create(cur, FACT_TABLE, partition_by=FactPartitionService.PARTITION_BY)
+                latest, plan = self._plan_slices(cur, target, sources, workers)
+            elif full:
+                self.stdout.write('  Mode: full rebuild')
+            else:
+                self.stdout.write('  Mode: incremental')
+                if workers > 1:
+                    self.stdout.write('  --workers ignored: incremental builds run on one connection')
+
+        if parallel:
+            loaded = self._load_parallel(target, sources, latest, plan, workers)
+
+        # Facts, watermarks and derived tables commit together
+        with transaction.atomic(), connection.cursor() as cur:
+            if full:
+                if not parallel:
+                    # Readers keep the current facts while the shadow loads; it is swapped in before commit
+                    target = ShadowTableService.create(
+                        cur, FACT_TABLE, partition_by=FactPartitionService.PARTITION_BY
+                    )
+                LoadLedgerService.reset(cur, FACT_TABLE, source='build_dw_revenue')
+                DwWatermarkService.clear(cur)
+            else:
+                target = FACT_TABLE
+
+            # SourceFiles whose staging rows changed since the last build; a full build covers them
+            source_files = sorted(set(options['source_files']) | set(StagingSyncService.claim_source_files(cur)))
+
+            fact_rows = 0
+            months = set()
+            for name, spec in sources.items():
+                if parallel:
+                    # Loaded by the workers, up to the key seen when the slices were planned
+                    (written, amount), touched = loaded[name], None
+                    LoadLedgerService.add(cur, FACT_TABLE, written, amount, source='build_dw_revenue')
+                    DwWatermarkService.set(cur, name, latest[name])
+                else:
+                    written, touched = self._load_source(
+                        cur, name, spec, full, target,
+                        source_files if name == 'distribution' else []
+                    )
+                fact_rows += written
+                # None = every month (the source was reloaded)
+                months = None if months is None or touched is None else months | touched
+
+            # Quarters loaded aside; the derived tables are refreshed from them, and they are
+            # attached in place of their partitions at the end
+            rebuilt = {}
+            if quarters and full:
+                self.stdout.write('  --quarter ignored: every quarter is rebuilt')
+            elif quarters:
+                for start in quarters:
+                    rebuilt[start] = self._rebuild_quarter(cur, sources, start)
+                    if months is not None:
+                        months |= set(FactPartitionService.quarter_months(start))
+                target = self._rebuilt_facts(cur, rebuilt)
+
+            if months == set():
+                self.stdout.write('  No new facts')
+
+            if full:
+                indexes = ShadowTableService.build_indexes(cur, FACT_TABLE, target)
+                self.stdout.write(f'  {target}: {indexes} indexes built')
+
+            # Monthly rollup used by the dashboard aggregations
+            rollup_rows = MonthlyRollupService.refresh(cur, months, facts=target)
+            self.stdout.write(f'  dw.agg_month_store: {rollup_rows} rows')
+
+            # HyperLogLog sketches behind the approximate unique counts
+            sketch_rows = DistinctSketchService.refresh(cur, months, facts=target, datasets=['dw'])
+            self.stdout.write(f'  dw.agg_month_sketch: {sketch_rows} sketches')
+
+            # Facet index behind filter_options, derived from the rollup
+            facet_rows = FacetIndexService.refresh(cur)
+            self.stdout.write(f'  dw.facet_value: {facet_rows} facet values')
+
+            # Artist/track leaderboards: only the label/month slices changed since the last refresh
+            slices = LeaderboardService.refresh(cur)
+            self.stdout.write(f'  dw.leaderboard: {slices} label/month slices refreshed')
+
+            if full:
+                # Brief exclusive lock: queries on the old facts finish, later ones see the new table.
+                # Last statement before commit, so the lock is held for the renames only.
+                ShadowTableService.swap(cur, FACT_TABLE, target)
+                self.stdout.write(f'  {target} swapped in as {FACT_TABLE}')
+
+            if rebuilt:
+                cur.execute(f"DROP VIEW {target}")
+                # Dropping the replaced partitions locks the fact table: last statements before commit
+                for start, table in rebuilt.items():
+                    replaced = FactPartitionService.attach(cur, FACT_TABLE, start, table, source='build_dw_revenue')
+                    self.stdout.write(f'  {table} attached as {FactPartitionService.partition_name(FACT_TABLE, start)} '
+                                      f'({replaced} facts replaced)')
+
+        # Only when facts changed: the leaderboards are not served from the response cache
+        if months is None or months:
+            # New generation invalidates cached analytics responses
+            generation = DwGenerationService.bump(mode='full' if full else 'incremental', fact_rows=fact_rows)
+            self.stdout.write(f'  DW generation: {generation}')
+
+        self.stdout.write(self.style.SUCCESS('DW fact_revenue built'))
+
+    def _load_source(self, cur, name, spec, full, target, source_files):
+        """
+        Bring one source's facts up to date
+
+        Rows above the watermark are appended. Facts of the given SourceFile ids
+        are replaced, and so are those of every SourceFile whose upstream rows at
+        or below the watermark no longer match its facts in count or amount
+        (rows were corrected, deleted or re-imported). A source without
+        SourceFile keys is reloaded on such a mismatch.
+
+        Returns:
+            tuple: (rows written, first-of-month dates touched; None when reloaded)
+        """
+        key, fact_key = spec['key'], spec['fact_key']
+
+        # Highest key present now; rows appended while loading wait for the next build
+        cur.execute(f"SELECT MAX({key}) {spec['upstream']}")
+        latest = cur.fetchone()[0] or 0
+
+        if full:
+            written = self._insert(cur, spec, f"{key} <= %s", [latest], table=target)
+            DwWatermarkService.set(cur, name, latest)
+            self.stdout.write(f'  {name}: {written} facts loaded')
+            return written, None
+
+        watermark = DwWatermarkService.get(cur, name)
+        written = 0
+        touched = set()
+
+        changed = self._changed_keys(cur, name, spec, watermark)
+        if changed is None:
+            self.stdout.write(f'  {name}: upstream rows changed below the watermark, reloading the source')
+            LoadLedgerService.delete(
+                cur, 'dw.fact_revenue', f"DELETE FROM dw.fact_revenue WHERE {SOURCE_FACTS}", [name],
+                source='build_dw_revenue'
+            )
+            written = self._insert(cur, spec, f"{key} <= %s", [latest])
+            DwWatermarkService.set(cur, name, latest)
+            return written, None
+        if changed - set(source_files):
+            self.stdout.write(f'  {name}: {len(changed - set(source_files))} source file(s) changed '
+                              f'below the watermark')
+
+        source_files = sorted(set(source_files) | changed)
+        if source_files:
+            # Replace the facts of re-imported or changed statements
+            touched |= self._months(cur, f"{SOURCE_FACTS} AND {fact_key} = ANY(%s)", [name, source_files])
+            removed = LoadLedgerService.delete(
+                cur, 'dw.fact_revenue',
+                f"DELETE FROM dw.fact_revenue WHERE {SOURCE_FACTS} AND {fact_key} = ANY(%s)",
+                [name, source_files], source='build_dw_revenue'
+            )
+            start = self._max_fact_id(cur)
+            written += self._insert(cur, spec, f"{key} = ANY(%s) AND {key} <= %s", [source_files, watermark])
+            touched |= self._months(cur, "id > %s", [start])
+            self.stdout.write(f'  {name}: {removed} facts of {len(source_files)} source file(s) replaced '
+                              f'by {written}')
+
+        if latest > watermark:
+            start = self._max_fact_id(cur)
+            appended = self._insert(cur, spec, f"{key} > %s AND {key} <= %s", [watermark, latest])
+            touched |= self._months(cur, "id > %s", [start])
+            written += appended
+            DwWatermarkService.set(cur, name, latest)
+            self.stdout.write(f'  {name}: {appended} new facts (watermark {watermark} -> {latest})')
+        return written, touched
+
+    @staticmethod
+    def _changed_keys(cur, name, spec, watermark):
+        """
+        Compare a source's facts with its upstream rows at or below the watermark
+
+        Row counts and amount totals (revenue_base, the total the load ledger
+        records) are compared per SourceFile, or for the whole source when its
+        facts carry no SourceFile key.
+
+        Returns:
+            set: SourceFile ids whose facts differ from their rows; None when a
+            source without SourceFile keys differs
+        """
+        key, fact_key = spec['key'], spec['fact_key']
+        if not fact_key:
+            cur.execute(f"SELECT COUNT(*), COALESCE(SUM({spec['amount']}), 0) {spec['upstream']} AND {key} <= %s",
+                        [watermark])
+            upstream = cur.fetchone()
+            cur.execute(f"SELECT COUNT(*), COALESCE(SUM(revenue_base), 0) FROM dw.fact_revenue WHERE {SOURCE_FACTS}",
+                        [name])
+            return None if cur.fetchone() != upstream else set()
+
+        cur.execute(
+            f"""
+            SELECT COALESCE(u.file_id, f.file_id)
+            FROM (
+              SELECT {key} AS file_id, COUNT(*) AS n, COALESCE(SUM({spec['amount']}), 0) AS amount
+              {spec['upstream']} AND {key} <= %s
+              GROUP BY 1
+            ) u
+            FULL JOIN (
+              SELECT {fact_key} AS file_id, COUNT(*) AS n, COALESCE(SUM(revenue_base), 0) AS amount
+              FROM dw.fact_revenue
+              WHERE {SOURCE_FACTS} AND {fact_key} <= %s
+              GROUP BY 1
+            ) f ON f.file_id = u.file_id
+            WHERE u.n IS DISTINCT FROM f.n OR u.amount IS DISTINCT FROM f.amount
+            """,
+            [watermark, name, watermark]
+        )
+        return {file_id for file_id, in cur.fetchall()}
+
+    def _plan_slices(self, cur, target, sources, workers):
+        """
+        Cut each source into month ranges of about equal row counts and create their partitions
+
+        The sources' dimension members are added here too, so the workers only look up keys.
+
+        Returns:
+            tuple: (source -> highest key to load, [(source, first month, end month, rows)])
+        """
+        latest = {}
+        counts = {}
+        for name, spec in sources.items():
+            cur.execute(f"SELECT MAX({spec['key']}) {spec['upstream']}")
+            latest[name] = cur.fetchone()[0] or 0
+            DimensionService.stage(cur, f"{spec['select']} AND {spec['key']} <= %s", spec['params'] + [latest[name]])
+            DimensionService.sync(cur)
             cur.execute(
+                f"""
+                SELECT date_trunc('month', occurred_at)::date, COUNT(*)
+                FROM {DimensionService.LOAD_TABLE}
+                GROUP BY 1 ORDER BY 1
                 """
-                INSERT INTO dw.fact_revenue (
-                  occurred_at, source, platform, store, artist_name, track_title, isrc, catalog_number, upc_ean, quantity, 
-                  revenue_base, base_ccy, revenue_brl, revenue_usd, revenue_eur
-                )
-                SELECT 
-                  DATE(occurred_at), 'bandcamp', 'Bandcamp', NULL,
-                  artist, item_name, NULL, NULL, NULL,
-                  quantity, amount_received, 'USD', 
-                  amount_received * %s,  -- BRL
-                  amount_received,       -- USD (original)
-                  amount_received * %s   -- EUR
-                FROM raw.bandcamp_event_raw
-                WHERE item_type IN ('track','album','bundle')
-                """,
-                [float(usd_to_brl_rate), float(usd_to_eur_rate)]
             )
+            counts[name] = [(month, rows) for month, rows in cur.fetchall() if month is not None]
 
-            # Distribution (EUR base) from staging if available - convert to all currencies
-            cur.execute("SELECT COUNT(*) FROM staging.distribution_event")
-            staging_count = cur.fetchone()[0]
-            if staging_count and staging_count > 0:
-                cur.execute(
-                    """
-                    INSERT INTO dw.fact_revenue (
-                      occurred_at, source, platform, store, artist_name, track_title, isrc, catalog_number, upc_ean, quantity, 
-                      revenue_base, base_ccy, revenue_brl, revenue_usd, revenue_eur
+        total = sum(rows for by_month in counts.values() for _, rows in by_month)
+        slice_rows = max(1, math.ceil(total / (workers * SLICES_PER_WORKER)))
+        plan = []
+        for name, by_month in counts.items():
+            start, rows = None, 0
+            for i, (month, month_rows) in enumerate(by_month):
+                start = start or month
+                rows += month_rows
+                if rows >= slice_rows or i == len(by_month) - 1:
+                    end = by_month[i + 1][0] if i + 1 < len(by_month) else FactPartitionService.quarter_end(
+                        FactPartitionService.quarter_start(month)
                     )
-                    SELECT 
-                      DATE(occurred_at), 'distribution', 'Distribution', store,
-                      track_artist_name, track_title, isrc, catalog_number, upc_ean,
-                      quantity, net_amount_eur, 'EUR', 
-                      net_amount_eur * %s,  -- BRL
-                      net_amount_eur * %s,  -- USD
-                      net_amount_eur        -- EUR (original)
-                    FROM staging.distribution_event
-                    """,
-                    [float(eur_to_brl_rate), float(eur_to_usd_rate)]
-                )
-            else:
-                # Fallback: build from normalized finances_revenueevent if staging is empty
+                    plan.append((name, start, end, rows))
+                    start, rows = None, 0
+            FactPartitionService.ensure(cur, target, [month for month, _ in by_month])
+        # Largest slices first, so the last ones to finish are short
+        plan.sort(key=lambda item: item[3], reverse=True)
+        return latest, plan
+
+    def _load_parallel(self, target, sources, latest, plan, workers) -> dict:
+        """
+        Load the planned slices into the committed shadow, one transaction per slice
+
+        Returns:
+            dict: source -> (rows written, sum of their revenue_base)
+        """
+        started = time.monotonic()
+        written = {name: 0 for name in sources}
+        amounts = {name: 0 for name in sources}
+        busy = 0.0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(self._load_slice, target, sources[name], latest[name], start, end): (name, start, end)
+                for name, start, end, _ in plan
+            }
+            for future in as_completed(futures):
+                name, start, end = futures[future]
+                rows, amount, elapsed = future.result()
+                written[name] += rows
+                amounts[name] += amount
+                busy += elapsed
+                self.stdout.write(f'  {name} {start:%Y-%m}..{end:%Y-%m}: {rows} facts in {elapsed:.2f}s')
+        wall = time.monotonic() - started
+        self.stdout.write(f'  Parallel load: {len(plan)} slices on {workers} workers in {wall:.2f}s '
+                          f'({busy:.2f}s of slice time)')
+        for name, rows in written.items():
+            self.stdout.write(f'  {name}: {rows} facts loaded')
+        return {name: (written[name], amounts[name]) for name in sources}
+
+    @staticmethod
+    def _load_slice(target, spec, latest, start, end):
+        """Insert one source's facts up to key latest for [start, end) on this thread's own connection"""
+        started = time.monotonic()
+        try:
+            with transaction.atomic(), connection.cursor() as cur:
+                rows_sql = (f"{spec['select']} AND {spec['key']} <= %s "
+                            f"AND {spec['date']} >= %s AND {spec['date']} < %s")
+                keyed = DimensionService.keyed_select(f"({rows_sql}) AS l({DimensionService.load_columns()})")
+                # Counted here: worker inserts bypass the ledger, and the table is not rescanned later
                 cur.execute(
-                    """
-                    INSERT INTO dw.fact_revenue (
-                      occurred_at, source, platform, store, artist_name, track_title, isrc, catalog_number, upc_ean, quantity, 
-                      revenue_base, base_ccy, revenue_brl, revenue_usd, revenue_eur
+                    f"""
+                    WITH written AS (
+                      INSERT INTO {target} ({DimensionService.fact_columns()}) {keyed} RETURNING revenue_base
                     )
-                    SELECT 
-                      DATE(rev.occurred_at) AS occurred_at,
-                      'distribution' AS source,
-                      'Distribution' AS platform,
-                      s.name AS store,
-                      rev.track_artist_name,
-                      rev.track_title,
-                      rev.isrc,
-                      rev.catalog_number,
-                      rev.upc_ean,
-                      rev.quantity,
-                      rev.net_amount_base,
-                      rev.base_ccy,
-                      -- BRL conversion
-                      CASE 
-                        WHEN rev.base_ccy = 'USD' THEN rev.net_amount_base * %s
-                        WHEN rev.base_ccy = 'EUR' THEN rev.net_amount_base * %s
-                        ELSE rev.net_amount_base
-                      END,
-                      -- USD conversion
-                      CASE 
-                        WHEN rev.base_ccy = 'USD' THEN rev.net_amount_base
-                        WHEN rev.base_ccy = 'EUR' THEN rev.net_amount_base * %s
-                        ELSE rev.net_amount_base * %s
-                      END,
-                      -- EUR conversion
-                      CASE 
-                        WHEN rev.base_ccy = 'EUR' THEN rev.net_amount_base
-                        WHEN rev.base_ccy = 'USD' THEN rev.net_amount_base * %s
-                        ELSE rev.net_amount_base * %s
-                      END
-                    FROM finances_revenueevent rev
-                    JOIN finances_platform p ON rev.platform_id = p.id
-                    LEFT JOIN finances_store s ON rev.store_id = s.id
-                    WHERE p.name = 'Distribution'
+                    SELECT COUNT(*), COALESCE(SUM(revenue_base), 0) FROM written
                     """,
-                    [
-                        float(usd_to_brl_rate), float(eur_to_brl_rate),  # BRL conversion
-                        float(eur_to_usd_rate), float(brl_to_usd_rate),  # USD conversion
-                        float(usd_to_eur_rate), float(brl_to_eur_rate)   # EUR conversion
-                    ]
+                    spec['params'] + [latest, start, end]
                 )
+                rows, amount = cur.fetchone()
+        finally:
+            # Worker threads open their own connection; do not leave it behind
+            connection.close()
+        return rows, amount, time.monotonic() - started
 
-        self.stdout.write(self.style.SUCCESS('DW fact_revenue built'))
+    def _rebuild_quarter(self, cur, sources, start) -> str:
+        """
+        Reload one quarter of every source (up to its watermark) into an indexed table aside
+
+        Returns:
+            str: The loaded table, to attach in place of the quarter's partition
+        """
+        end = FactPartitionService.quarter_end(start)
+        loaded = FactPartitionService.create_detached(cur, FACT_TABLE, start)
+        written = 0
+        for name, spec in sources.items():
+            written += self._insert(
+                cur, spec, f"{spec['key']} <= %s AND {spec['date']} >= %s AND {spec['date']} < %s",
+                [DwWatermarkService.get(cur, name), start, end], table=loaded
+            )
+        indexes = FactPartitionService.prepare(cur, FACT_TABLE, loaded)
+        self.stdout.write(f'  {loaded}: {written} facts loaded, {indexes} indexes built')
+        return loaded
+
+    @staticmethod
+    def _rebuilt_facts(cur, rebuilt) -> str:
+        """
+        A temporary view of the facts as they will be once the rebuilt quarters are attached
+
+        Returns:
+            str: View name, to aggregate the derived tables from
+        """
+        view = 'pg_temp.fact_revenue_rebuilt'
+        ranges = ' OR '.join('(occurred_at >= %s AND occurred_at < %s)' for _ in rebuilt)
+        params = [bound for start in rebuilt for bound in (start, FactPartitionService.quarter_end(start))]
+        loaded = ' UNION ALL '.join(f'SELECT * FROM {table}' for table in rebuilt.values())
+        cur.execute(
+            f"CREATE TEMP VIEW {view.split('.')[1]} AS "
+            f"SELECT * FROM {FACT_TABLE} WHERE NOT ({ranges}) UNION ALL {loaded}",
+            params
+        )
+        return view
+
+    def _insert(self, cur, spec, where, params, table=FACT_TABLE) -> int:
+        # Rows are staged wide once, their new dimension members added, then inserted by key
+        if not DimensionService.stage(cur, f"{spec['select']} AND {where}", spec['params'] + params):
+            return 0
+        DimensionService.sync(cur)
+        if FactPartitionService.is_partitioned(cur, table):
+            # Create the quarter partitions the rows will land in
+            cur.execute(
+                f"SELECT DISTINCT date_trunc('quarter', occurred_at)::date FROM {DimensionService.LOAD_TABLE}"
+            )
+            FactPartitionService.ensure(cur, table, [quarter for quarter, in cur.fetchall()])
+        # Inserts go through the load ledger, which records rows and amounts as they are written;
+        # shadow and quarter loads are booked against the fact table they replace
+        return LoadLedgerService.insert(
+            cur, FACT_TABLE,
+            f"INSERT INTO {table} ({DimensionService.fact_columns()}) {DimensionService.keyed_select()}",
+            source='build_dw_revenue'
+        )
+
+    @staticmethod
+    def _max_fact_id(cur) -> int:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM dw.fact_revenue")
+        return cur.fetchone()[0]
+
+    @staticmethod
+    def _months(cur, where, params) -> set:
+        cur.execute(
+            f"SELECT DISTINCT date_trunc('month', occurred_at)::date FROM dw.fact_revenue WHERE {where}",
+            params
+        )
+        return {month for month, in cur.fetchall() if month is not None}
+
+    @staticmethod
+    def _bandcamp_source(usd_to_brl_rate, usd_to_eur_rate):
+        """Bandcamp (USD base), keyed by raw row id"""
+        sales = "FROM raw.bandcamp_event_raw WHERE item_type IN ('track','album','bundle')"
+        upstream = f"{sales} AND occurred_at IS NOT NULL"
+        return {
+            'key': 'id',
+            'fact_key': None,
+            'amount': 'amount_received',
+            'date': 'DATE(occurred_at)',
+            'upstream': upstream,
+            'undated': f"{sales} AND occurred_at IS NULL",
+            'select': f"""
+                SELECT
+                  DATE(occurred_at), 'bandcamp', 'Bandcamp', NULL,
+                  artist, item_name, NULL, NULL, NULL,
+                  quantity, amount_received, 'USD',
+                  amount_received * %s,  -- BRL
+                  amount_received,       -- USD (original)
+                  amount_received * %s,  -- EUR
+                  NULL::bigint           -- typed: parallel loads select it through a subquery
+                {upstream}
+            """,
+            'params': [float(usd_to_brl_rate), float(usd_to_eur_rate)],
+        }
 
+    @staticmethod
+    def _distribution_source(use_staging, usd_to_brl_rate, eur_to_brl_rate, eur_to_usd_rate,
+                             brl_to_usd_rate, usd_to_eur_rate, brl_to_eur_rate):
+        """Distribution (EUR base), keyed by SourceFile id"""
+        if use_staging:
+            # From staging - convert to all currencies
+            return {
+                'key': 'se.source_file_id',
+                'fact_key': 'source_file_id',
+                'amount': 'se.net_amount_eur',
+                'date': 'DATE(se.occurred_at)',
+                'upstream': "FROM staging.distribution_event se WHERE se.occurred_at IS NOT NULL",
+                'undated': "FROM staging.distribution_event se WHERE se.occurred_at IS NULL",
+                'select': """
+                    SELECT
+                      DATE(se.occurred_at), 'distribution', 'Distribution', se.store,
+                      se.track_artist_name, se.track_title, se.isrc, se.catalog_number, se.upc_ean,
+                      se.quantity, se.net_amount_eur, 'EUR',
+                      se.net_amount_eur * %s,  -- BRL
+                      se.net_amount_eur * %s,  -- USD
+                      se.net_amount_eur,       -- EUR (original)
+                      se.source_file_id
+                    FROM staging.distribution_event se
+                    WHERE se.occurred_at IS NOT NULL
+                """,
+                'params': [float(eur_to_brl_rate), float(eur_to_usd_rate)],
+            }
 
+        # Fallback: build from normalized finances_revenueevent if staging is empty
+        return {
+            'key': 'rev.source_file_id',
+            'fact_key': 'source_file_id',
+            'amount': 'rev.net_amount_base',
+            'date': 'DATE(rev.occurred_at)',
+            'upstream': """
+                FROM finances_revenueevent rev
+                JOIN finances_platform p ON rev.platform_id = p.id
+                WHERE p.name = 'Distribution' AND rev.occurred_at IS NOT NULL
+            """,
+            'undated': """
+                FROM finances_revenueevent rev
+                JOIN finances_platform p ON rev.platform_id = p.id
+                WHERE p.name = 'Distribution' AND rev.occurred_at IS NULL
+            """,
+            'select': """
+                SELECT
+                  DATE(rev.occurred_at) AS occurred_at,
+                  'distribution' AS source,
+                  'Distribution' AS platform,
+                  s.name AS store,
+                  rev.track_artist_name,
+                  rev.track_title,
+                  rev.isrc,
+                  rev.catalog_number,
+                  rev.upc_ean,
+                  rev.quantity,
+                  rev.net_amount_base,
+                  rev.base_ccy,
+                  -- BRL conversion
+                  CASE
+                    WHEN rev.base_ccy = 'USD' THEN rev.net_amount_base * %s
+                    WHEN rev.base_ccy = 'EUR' THEN rev.net_amount_base * %s
+                    ELSE rev.net_amount_base
+                  END,
+                  -- USD conversion
+                  CASE
+                    WHEN rev.base_ccy = 'USD' THEN rev.net_amount_base
+                    WHEN rev.base_ccy = 'EUR' THEN rev.net_amount_base * %s
+                    ELSE rev.net_amount_base * %s
+                  END,
+                  -- EUR conversion
+                  CASE
+                    WHEN rev.base_ccy = 'EUR' THEN rev.net_amount_base
+                    WHEN rev.base_ccy = 'USD' THEN rev.net_amount_base * %s
+                    ELSE rev.net_amount_base * %s
+                  END,
+                  rev.source_file_id
+                FROM finances_revenueevent rev
+                JOIN finances_platform p ON rev.platform_id = p.id
+                LEFT JOIN finances_store s ON rev.store_id = s.id
+                WHERE p.name = 'Distribution' AND rev.occurred_at IS NOT NULL
+            """,
+            'params': [
+                float(usd_to_brl_rate), float(eur_to_brl_rate),  # BRL conversion
+                float(eur_to_usd_rate), float(brl_to_usd_rate),  # USD conversion
+                float(usd_to_eur_rate), float(brl_to_eur_rate)   # EUR conversion
+            ],
+        }
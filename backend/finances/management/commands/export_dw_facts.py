@@ -0,0 +1,43 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.models import RevenueEvent
+from finances.models_etl import DwFactRevenue
+from finances.services.fact_export import FactExporter, FactExportError
+
+
+class Command(BaseCommand):
+    help = 'Stream dw.fact_revenue or RevenueEvent rows to CSV, NDJSON or Parquet with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=['dw', 'events'], default='dw')
+        parser.add_argument('--format', dest='export_format', choices=['csv', 'ndjson', 'parquet'], default='csv')
+        parser.add_argument('--output', type=str, default='-', help='Output file path ("-" for stdout)')
+        parser.add_argument('--chunk-size', type=int, default=FactExporter.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        queryset = RevenueEvent.objects.all() if dataset == 'events' else DwFactRevenue.objects.with_attributes()
+        try:
+            exporter = FactExporter(
+                queryset,
+                dataset=dataset,
+                export_format=options['export_format'],
+                chunk_size=options['chunk_size'],
+            )
+        except FactExportError as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+        output = options['output']
+        if output == '-':
+            rows = exporter.write(sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            with open(output, 'wb') as fh:
+                rows = exporter.write(fh)
+
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {rows} {dataset} rows as {options["export_format"]} in {time.monotonic() - started:.1f}s'
+        ))
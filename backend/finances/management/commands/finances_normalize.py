@@ -2,7 +2,7 @@ import csv
 import hashlib
 from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connection, transaction
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime, parse_date
 from decimal import Decimal
@@ -11,6 +11,7 @@ from datetime import datetime, date
 from finances.models import (
     Platform, Store, Country, SourceFile, RevenueEvent, CostEvent, ImportBatch
 )
+from finances.services.leaderboard import LeaderboardService
 from api.models import Label, Release, Track
 
 
@@ -31,23 +32,36 @@ class Command(BaseCommand):
         except Label.DoesNotExist:
             raise CommandError(f'Label "{label_name}" does not exist.')
         
-        # Create import batch
-        batch = ImportBatch.objects.create(label=label)
-        self.stdout.write(f'Created import batch #{batch.id} for {label.name}')
+        # Use the given import batch (its owner, e.g. finances_pipeline, finishes it) or create one
+        batch_id = options.get('batch_id')
+        if batch_id:
+            try:
+                batch = ImportBatch.objects.get(id=batch_id, label=label)
+            except ImportBatch.DoesNotExist:
+                raise CommandError(f'Import batch #{batch_id} does not exist for {label.name}.')
+            self.stdout.write(f'Using import batch #{batch.id} for {label.name}')
+        else:
+            batch = ImportBatch.objects.create(label=label)
+            self.stdout.write(f'Created import batch #{batch.id} for {label.name}')
         
         try:
             self.normalize_data(label, batch, options.get('force', False))
-            batch.finished_at = timezone.now()
-            batch.save()
+            with connection.cursor() as cur:
+                slices = LeaderboardService.refresh(cur)
+            self.stdout.write(f'Refreshed {slices} leaderboard slices')
+            if not batch_id:
+                batch.finished_at = timezone.now()
+                batch.save(update_fields=['finished_at'])
             
             self.stdout.write(
                 self.style.SUCCESS(f'Successfully normalized finance data for {label.name}')
             )
             
         except Exception as e:
-            batch.status = 'failed'
-            batch.finished_at = timezone.now()
-            batch.save()
+            if not batch_id:
+                batch.status = 'failed'
+                batch.finished_at = timezone.now()
+                batch.save(update_fields=['status', 'finished_at'])
             raise CommandError(f'Normalization failed: {e}')
 
     @transaction.atomic
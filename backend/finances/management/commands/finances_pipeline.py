@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Label
+from finances.services.pipeline import PipelineError, PipelineOrchestrator
+
+
+class Command(BaseCommand):
+    help = ('Refresh a label\'s finance data: ingest -> normalize -> staging -> DW, skipping stages whose '
+            'inputs are unchanged since their last run and running independent stages concurrently')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--label', type=str, required=True, help='Label name')
+        parser.add_argument('--path', type=str,
+                            help='Path to label sources (default: finance/sources/{label-slug})')
+        parser.add_argument('--force', action='store_true',
+                            help='Run every stage even if its inputs are unchanged')
+        parser.add_argument('--bandcamp-api', action='store_true',
+                            help='Also fetch Bandcamp sales via the API (runs alongside the distribution stages)')
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Maximum number of stages running at once (default: 2)')
+        parser.add_argument('--verbose-stages', action='store_true',
+                            help='Print the output of every stage that ran')
+
+    def handle(self, *args, **options):
+        try:
+            label = Label.objects.get(name=options['label'])
+        except Label.DoesNotExist:
+            raise CommandError(f'Label "{options["label"]}" does not exist.')
+
+        orchestrator = PipelineOrchestrator(
+            label,
+            source_path=options.get('path'),
+            force=options['force'],
+            bandcamp_api=options['bandcamp_api'],
+            workers=options['workers'],
+        )
+        self.stdout.write(f'Running finance pipeline for {label.name} ({orchestrator.source_path})')
+        self.verbose = options['verbose_stages']
+
+        try:
+            batch = orchestrator.run(log=self.log_stage)
+        except PipelineError as e:
+            raise CommandError(f'Pipeline failed: {e}')
+
+        ran = [name for name, result in batch.stages.items() if result['status'] == 'completed']
+        self.stdout.write(self.style.SUCCESS(
+            f'Import batch #{batch.id}: {len(ran)} of {len(batch.stages)} stages ran '
+            f'in {(batch.finished_at - batch.started_at).total_seconds():.2f}s'
+        ))
+
+    def log_stage(self, name, result):
+        status = result['status']
+        if status == 'blocked':
+            self.stdout.write(self.style.WARNING(f'  {name}: blocked by a failed stage'))
+            return
+        line = f"  {name}: {status} in {result['seconds']:.2f}s"
+        if status == 'failed':
+            self.stdout.write(self.style.ERROR(f"{line}: {result['error']}"))
+        elif status == 'skipped':
+            self.stdout.write(f'{line} (inputs unchanged)')
+        else:
+            self.stdout.write(self.style.SUCCESS(line))
+        if result.get('output') and (self.verbose or status == 'failed'):
+            for output_line in result['output'].rstrip().splitlines():
+                self.stdout.write(f'    {output_line}')
@@ -0,0 +1,60 @@
+import time
+from datetime import datetime
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.services.synthetic_data import SyntheticDataError, SyntheticRevenueGenerator
+
+
+def parse_scale(value: str) -> int:
+    """Parse row counts such as 250000, 500k, 10M"""
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    value = value.strip().lower().replace('_', '')
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+class Command(BaseCommand):
+    help = 'Load seeded synthetic revenue (events, raw, staging, DW) for benchmarking; use a dedicated database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=str, default='1M', help='Total events to generate (e.g. 1M, 10M, 50M)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--start', type=str, default='2018-01-01', help='YYYY-MM-DD first sales date')
+        parser.add_argument('--months', type=int, default=84, help='Months of history to spread sales over')
+        parser.add_argument('--batch-size', type=int, default=SyntheticRevenueGenerator.BATCH_SIZE)
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete previous synthetic events and raw rows before loading (other rows are kept)')
+        parser.add_argument('--skip-build', action='store_true',
+                            help='Only load events and raw rows; do not build staging and DW')
+
+    def handle(self, *args, **options):
+        try:
+            generator = SyntheticRevenueGenerator(
+                rows=parse_scale(options['rows']),
+                seed=options['seed'],
+                start=datetime.strptime(options['start'], '%Y-%m-%d').date(),
+                months=options['months'],
+                batch_size=options['batch_size'],
+            )
+        except (ValueError, SyntheticDataError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'Generating {generator.rows} synthetic events (seed {generator.seed})')
+        started = time.monotonic()
+        try:
+            stats = generator.generate(replace=options['replace'], log=self.stdout.write)
+        except SyntheticDataError as e:
+            raise CommandError(str(e))
+
+        if not options['skip_build']:
+            build_started = time.monotonic()
+            # A replace swaps out every synthetic event; copy staging afresh rather than by change log
+            call_command('build_staging_distribution', full=options['replace'], stdout=self.stdout)
+            call_command('build_dw_revenue', full=True, stdout=self.stdout)
+            stats['seconds']['build'] = round(time.monotonic() - build_started, 2)
+
+        for table, rows in stats['rows'].items():
+            self.stdout.write(f'  {table}: {rows} rows in {stats["seconds"][table]}s')
+        self.stdout.write(self.style.SUCCESS(f'Synthetic data loaded in {time.monotonic() - started:.1f}s'))
@@ -4,6 +4,7 @@ from django.utils import timezone
 
 from finances.services.bandcamp_curl_client import BandcampCurlAPI, BandcampCurlAPIError
 from finances.models_etl import RawBandcampEvent
+from finances.services.load_ledger import LoadLedgerService
 from dateutil import parser as dateparser
 
 
@@ -33,6 +34,11 @@ class Command(BaseCommand):
         start_dt = datetime.strptime(start, '%Y-%m-%d').date()
         end_dt = datetime.strptime(end, '%Y-%m-%d').date()
 
+        with LoadLedgerService.appending('raw.bandcamp_event_raw', source='ingest_bandcamp_api'):
+            self.ingest_months(api, band_id, start_dt, end_dt)
+        self.stdout.write(self.style.SUCCESS('Bandcamp API ingest completed'))
+
+    def ingest_months(self, api, band_id, start_dt, end_dt):
         cur = start_dt.replace(day=1)
         while cur <= end_dt:
             window_start = cur
@@ -46,7 +52,8 @@ class Command(BaseCommand):
                 self.stderr.write(self.style.ERROR(str(e)))
                 rows = []
 
-            # Upsert minimal fields into RAW
+            # Insert minimal fields into RAW
+            created = 0
             for r in rows:
                 # Parse date flexibly (e.g., '01 Feb 2016 13:23:00 GMT' or '2016-02-01')
                 date_str = r.get('date') or window_start.isoformat()
@@ -60,8 +67,9 @@ class Command(BaseCommand):
                     occurred = timezone.make_aware(datetime.strptime(window_start.isoformat(), '%Y-%m-%d'))
                 item_name = r.get('item_name') or ''
                 artist = r.get('artist') or ''
-                RawBandcampEvent.objects.update_or_create(
-                    id=None,
+                # Sales already ingested (e.g. by a run with an overlapping start) are kept as they are
+                _, is_new = RawBandcampEvent.objects.get_or_create(
+                    bandcamp_sale_id=self.sale_id(r),
                     defaults={
                         'date_str': date_str,
                         'occurred_at': occurred,
@@ -75,9 +83,19 @@ class Command(BaseCommand):
                         'raw_row': r,
                     }
                 )
+                created += is_new
+            if rows:
+                self.stdout.write(f"  {created} new sales, {len(rows) - created} already ingested")
 
             cur = next_month
 
-        self.stdout.write(self.style.SUCCESS('Bandcamp API ingest completed'))
-
-
+    @staticmethod
+    def sale_id(row):
+        """Bandcamp's id of a sale item: the report key, else transaction id and item id"""
+        if row.get('unique_bc_id'):
+            return str(row['unique_bc_id'])
+        transaction_id = row.get('bandcamp_transaction_id')
+        if not transaction_id:
+            raise CommandError(f"Bandcamp sale without a transaction id: {row}")
+        item_id = row.get('bandcamp_transaction_item_id')
+        return f'{transaction_id}:{item_id}' if item_id else str(transaction_id)
@@ -2,6 +2,7 @@ import csv
 from pathlib import Path
 from django.core.management.base import BaseCommand
 from finances.models_etl import RawLabelworxEvent
+from finances.services.load_ledger import LoadLedgerService
 
 
 class Command(BaseCommand):
@@ -19,6 +20,11 @@ class Command(BaseCommand):
         if max_files and max_files > 0:
             files = files[: max_files]
 
+        with LoadLedgerService.appending('raw.labelworx_event_raw', source='ingest_labelworx_raw'):
+            self.ingest_files(files, options)
+        self.stdout.write(self.style.SUCCESS('Labelworx raw ingest completed'))
+
+    def ingest_files(self, files, options):
         file_idx = 0
         for f in files:
             file_idx += 1
@@ -63,6 +69,3 @@ class Command(BaseCommand):
                 if buffer:
                     RawLabelworxEvent.objects.bulk_create(buffer, batch_size=batch_size)
             self.stdout.write("")
-        self.stdout.write(self.style.SUCCESS('Labelworx raw ingest completed'))
-
-
@@ -2,6 +2,7 @@ import csv
 from pathlib import Path
 from django.core.management.base import BaseCommand
 from finances.models_etl import RawZebralutionEvent
+from finances.services.load_ledger import LoadLedgerService
 
 
 class Command(BaseCommand):
@@ -20,7 +21,13 @@ class Command(BaseCommand):
         if options.get('truncate'):
             with connection.cursor() as cur:
                 cur.execute('TRUNCATE TABLE raw.zebralution_event_raw')
+                LoadLedgerService.reset(cur, 'raw.zebralution_event_raw', source='ingest_zebralution_raw')
 
+        with LoadLedgerService.appending('raw.zebralution_event_raw', source='ingest_zebralution_raw'):
+            self.ingest_files(files)
+        self.stdout.write(self.style.SUCCESS('Zebralution raw ingest completed'))
+
+    def ingest_files(self, files):
         for f in files:
             # Only true Zebralution files: semicolon header containing 'Period'
             try:
@@ -49,6 +56,5 @@ class Command(BaseCommand):
                         rev_less_publ_eur=(row.get('Rev.less Publ.EUR', '0').replace(',', '.') or 0),
                         raw_row=row,
                     )
-        self.stdout.write(self.style.SUCCESS('Zebralution raw ingest completed'))
 
 
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from finances.services.leaderboard import LeaderboardService
+
+
+class Command(BaseCommand):
+    help = 'Refresh dw.leaderboard for the label/month slices changed since the last refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every slice from RevenueEvent')
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cur:
+            slices = LeaderboardService.refresh(cur, full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'dw.leaderboard: {slices} label/month slices refreshed'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-16 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0004_delete_dwartist_delete_dwrelease_delete_dwtrack_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwAggMonthStore',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('source', models.CharField(max_length=32)),
+                ('platform', models.CharField(max_length=100)),
+                ('store', models.CharField(blank=True, max_length=100)),
+                ('artist_name', models.CharField(blank=True, max_length=200)),
+                ('catalog_number', models.CharField(blank=True, max_length=64)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('transactions', models.BigIntegerField(default=0)),
+                ('revenue_base', models.DecimalField(decimal_places=6, default=0, max_digits=20)),
+                ('revenue_brl', models.DecimalField(decimal_places=6, default=0, max_digits=20)),
+                ('revenue_usd', models.DecimalField(decimal_places=6, default=0, max_digits=20)),
+                ('revenue_eur', models.DecimalField(decimal_places=6, default=0, max_digits=20)),
+            ],
+            options={
+                'db_table': 'dw"."agg_month_store',
+                'indexes': [models.Index(fields=['month', 'source'], name='agg_month_store_month_src'), models.Index(fields=['platform', 'store'], name='agg_month_store_store')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-16 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0005_agg_month_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwGeneration',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('built_at', models.DateTimeField(auto_now_add=True)),
+                ('mode', models.CharField(default='full', max_length=32)),
+                ('fact_rows', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'dw"."generation',
+            },
+        ),
+    ]
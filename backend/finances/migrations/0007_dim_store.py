@@ -0,0 +1,85 @@
+# Generated by Django 5.2 on 2026-10-16 19:40
+
+from django.db import migrations, models
+
+
+# Canonical store rules as of this migration (StoreDimensionService.RULES may change later;
+# the seed must not). Ordered (substrings, canonical name); the first match wins.
+STORE_RULES = [
+    (('youtube',), 'YouTube'),
+    (('apple music', 'applemusic', 'itunes'), 'Apple Music'),
+    (('amazon',), 'Amazon Music'),
+    (('google play',), 'Google Play'),
+    (('tiktok',), 'TikTok'),
+    (('deezer',), 'Deezer'),
+    (('tidal',), 'TIDAL'),
+    (('spotify',), 'Spotify'),
+    (('beatport',), 'Beatport'),
+    (('qobuz',), 'Qobuz'),
+    (('yandex',), 'Yandex'),
+    (('netease',), 'Netease'),
+    (('traxsource',), 'Traxsource'),
+    (('juno',), 'Juno'),
+]
+
+
+def canonicalize(store_name):
+    name = store_name.strip()
+    lower = name.lower()
+    for needles, canonical in STORE_RULES:
+        if any(needle in lower for needle in needles):
+            return canonical
+    return name
+
+
+def seed_dim_store(apps, schema_editor):
+    Store = apps.get_model('finances', 'Store')
+    DwDimStore = apps.get_model('finances', 'DwDimStore')
+    names = set(Store.objects.exclude(name='').values_list('name', flat=True))
+    DwDimStore.objects.bulk_create(
+        [DwDimStore(store_name=name, store_canonical=canonicalize(name)) for name in sorted(names)],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0006_dw_generation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwDimStore',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('store_name', models.CharField(max_length=100, unique=True)),
+                ('store_canonical', models.CharField(max_length=100)),
+            ],
+            options={
+                'verbose_name': 'DW store',
+                'db_table': 'dw"."dim_store',
+                'ordering': ['store_canonical', 'store_name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='dwfactrevenue',
+            name='store_canonical',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunSQL(
+            sql="ALTER TABLE IF EXISTS dw.fact_revenue ADD COLUMN IF NOT EXISTS store_canonical varchar(100) NOT NULL DEFAULT ''",
+            reverse_sql="ALTER TABLE IF EXISTS dw.fact_revenue DROP COLUMN IF EXISTS store_canonical",
+        ),
+        migrations.AddField(
+            model_name='dwaggmonthstore',
+            name='store_canonical',
+            field=models.CharField(blank=True, default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='dwaggmonthstore',
+            index=models.Index(fields=['platform', 'store_canonical'], name='agg_month_store_canonical'),
+        ),
+        migrations.RunPython(seed_dim_store, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-16 19:55
+
+from django.db import migrations
+
+
+# dw.fact_revenue is created outside Django migrations, so only index it when present
+CREATE_INDEXES = """
+DO $$
+BEGIN
+  IF to_regclass('dw.fact_revenue') IS NOT NULL THEN
+    CREATE INDEX IF NOT EXISTS fact_revenue_brl_id_idx ON dw.fact_revenue (revenue_brl DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS fact_revenue_usd_id_idx ON dw.fact_revenue (revenue_usd DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS fact_revenue_eur_id_idx ON dw.fact_revenue (revenue_eur DESC, id DESC);
+  END IF;
+END
+$$;
+"""
+
+DROP_INDEXES = """
+DROP INDEX IF EXISTS dw.fact_revenue_brl_id_idx;
+DROP INDEX IF EXISTS dw.fact_revenue_usd_id_idx;
+DROP INDEX IF EXISTS dw.fact_revenue_eur_id_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0007_dim_store'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=CREATE_INDEXES, reverse_sql=DROP_INDEXES),
+    ]
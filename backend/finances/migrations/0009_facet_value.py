@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-16 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0008_fact_revenue_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwFacetValue',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('facet', models.CharField(max_length=16)),
+                ('value', models.CharField(max_length=200)),
+                ('rows', models.BigIntegerField(default=0)),
+                ('revenue_brl', models.DecimalField(decimal_places=6, default=0, max_digits=20)),
+            ],
+            options={
+                'db_table': 'dw"."facet_value',
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='facet_value_unique')],
+            },
+        ),
+    ]
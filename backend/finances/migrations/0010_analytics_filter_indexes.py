@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-16 19:35
+
+from django.db import migrations, models
+
+
+# dw.fact_revenue is created outside Django migrations, so only index it when present
+CREATE_FACT_INDEXES = """
+DO $$
+BEGIN
+  IF to_regclass('dw.fact_revenue') IS NOT NULL THEN
+    CREATE INDEX IF NOT EXISTS fact_revenue_occurred_idx ON dw.fact_revenue (occurred_at);
+    CREATE INDEX IF NOT EXISTS fact_revenue_source_occurred_idx ON dw.fact_revenue (source, occurred_at);
+    CREATE INDEX IF NOT EXISTS fact_revenue_platform_store_idx ON dw.fact_revenue (platform, store_canonical);
+    CREATE INDEX IF NOT EXISTS fact_revenue_artist_idx ON dw.fact_revenue (artist_name);
+    CREATE INDEX IF NOT EXISTS fact_revenue_catalog_idx ON dw.fact_revenue (catalog_number);
+  END IF;
+END
+$$;
+"""
+
+DROP_FACT_INDEXES = """
+DROP INDEX IF EXISTS dw.fact_revenue_occurred_idx;
+DROP INDEX IF EXISTS dw.fact_revenue_source_occurred_idx;
+DROP INDEX IF EXISTS dw.fact_revenue_platform_store_idx;
+DROP INDEX IF EXISTS dw.fact_revenue_artist_idx;
+DROP INDEX IF EXISTS dw.fact_revenue_catalog_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_artist_payment_address_release_cover_url_and_more'),
+        ('finances', '0009_facet_value'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dwaggmonthstore',
+            index=models.Index(fields=['artist_name'], name='agg_month_store_artist'),
+        ),
+        migrations.AddIndex(
+            model_name='dwaggmonthstore',
+            index=models.Index(fields=['catalog_number'], name='agg_month_store_catalog'),
+        ),
+        migrations.AddIndex(
+            model_name='revenueevent',
+            index=models.Index(fields=['occurred_at'], name='finances_re_occurre_44e612_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revenueevent',
+            index=models.Index(fields=['track_artist_name'], name='finances_re_track_a_fac886_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revenueevent',
+            index=models.Index(fields=['catalog_number'], name='finances_re_catalog_336304_idx'),
+        ),
+        migrations.RunSQL(sql=CREATE_FACT_INDEXES, reverse_sql=DROP_FACT_INDEXES),
+    ]
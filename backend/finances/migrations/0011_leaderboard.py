@@ -0,0 +1,86 @@
+# Generated by Django 5.2 on 2026-10-16 19:48
+
+from django.db import migrations, models
+
+
+# Record the (label, month) slices touched by every statement on RevenueEvent so
+# LeaderboardService can refresh just those slices
+CREATE_CHANGE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION dw.leaderboard_track_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO dw.leaderboard_change (label_id, month)
+    SELECT DISTINCT label_id, date_trunc('month', occurred_at)::date FROM new_rows
+    ON CONFLICT DO NOTHING;
+  END IF;
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    INSERT INTO dw.leaderboard_change (label_id, month)
+    SELECT DISTINCT label_id, date_trunc('month', occurred_at)::date FROM old_rows
+    ON CONFLICT DO NOTHING;
+  END IF;
+  RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER revenueevent_leaderboard_insert AFTER INSERT ON finances_revenueevent
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION dw.leaderboard_track_changes();
+CREATE TRIGGER revenueevent_leaderboard_update AFTER UPDATE ON finances_revenueevent
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION dw.leaderboard_track_changes();
+CREATE TRIGGER revenueevent_leaderboard_delete AFTER DELETE ON finances_revenueevent
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION dw.leaderboard_track_changes();
+"""
+
+DROP_CHANGE_TRIGGERS = """
+DROP TRIGGER IF EXISTS revenueevent_leaderboard_insert ON finances_revenueevent;
+DROP TRIGGER IF EXISTS revenueevent_leaderboard_update ON finances_revenueevent;
+DROP TRIGGER IF EXISTS revenueevent_leaderboard_delete ON finances_revenueevent;
+DROP FUNCTION IF EXISTS dw.leaderboard_track_changes();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0010_analytics_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwLeaderboard',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=8)),
+                ('label_id', models.UUIDField()),
+                ('month', models.DateField()),
+                ('key', models.CharField(max_length=200)),
+                ('artist_name', models.CharField(blank=True, max_length=200)),
+                ('track_title', models.CharField(blank=True, max_length=200)),
+                ('catalog_number', models.CharField(blank=True, max_length=64)),
+                ('revenue', models.DecimalField(decimal_places=6, default=0, max_digits=20)),
+                ('transactions', models.BigIntegerField(default=0)),
+                ('tracks_count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'dw"."leaderboard',
+                'indexes': [models.Index(models.F('kind'), models.F('label_id'), models.F('month'), models.OrderBy(models.F('revenue'), descending=True), name='leaderboard_top')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'label_id', 'month', 'key', 'artist_name', 'track_title', 'catalog_number'), name='leaderboard_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DwLeaderboardChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('label_id', models.UUIDField()),
+                ('month', models.DateField(null=True)),
+            ],
+            options={
+                'db_table': 'dw"."leaderboard_change',
+                'constraints': [models.UniqueConstraint(fields=('label_id', 'month'), name='leaderboard_change_unique', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunSQL(sql=CREATE_CHANGE_TRIGGERS, reverse_sql=DROP_CHANGE_TRIGGERS),
+    ]
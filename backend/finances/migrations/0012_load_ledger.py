@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-16 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0011_leaderboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwLoadLedger',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('table_name', models.CharField(max_length=64, unique=True)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('amount_column', models.CharField(blank=True, max_length=64)),
+                ('amount_sum', models.DecimalField(decimal_places=6, default=0, max_digits=24)),
+                ('updated_by', models.CharField(blank=True, max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dw"."load_ledger',
+                'ordering': ['table_name'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-16 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0012_load_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwAggMonthSketch',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('dataset', models.CharField(max_length=8)),
+                ('month', models.DateField(null=True)),
+                ('source', models.CharField(max_length=32)),
+                ('kind', models.CharField(max_length=8)),
+                ('registers', models.BinaryField()),
+            ],
+            options={
+                'db_table': 'dw"."agg_month_sketch',
+                'indexes': [models.Index(fields=['dataset', 'kind', 'month'], name='agg_month_sketch_lookup')],
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'month', 'source', 'kind'), name='agg_month_sketch_unique', nulls_distinct=False)],
+            },
+        ),
+    ]
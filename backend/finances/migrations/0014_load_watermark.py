@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-16 20:05
+
+from django.db import migrations, models
+
+
+# dw.fact_revenue and staging.distribution_event are unmanaged (staging may not
+# exist until build_staging_distribution first runs), so add the SourceFile
+# column and its indexes only where the tables are present
+ADD_SOURCE_FILE = """
+DO $$
+BEGIN
+  IF to_regclass('dw.fact_revenue') IS NOT NULL THEN
+    ALTER TABLE dw.fact_revenue ADD COLUMN IF NOT EXISTS source_file_id bigint NULL;
+    CREATE INDEX IF NOT EXISTS fact_revenue_source_file_idx ON dw.fact_revenue (source, source_file_id);
+  END IF;
+  IF to_regclass('staging.distribution_event') IS NOT NULL THEN
+    ALTER TABLE staging.distribution_event ADD COLUMN IF NOT EXISTS source_file_id bigint NULL;
+    CREATE INDEX IF NOT EXISTS distribution_event_source_file_idx ON staging.distribution_event (source_file_id);
+  END IF;
+END
+$$;
+"""
+
+DROP_SOURCE_FILE = """
+DROP INDEX IF EXISTS dw.fact_revenue_source_file_idx;
+DROP INDEX IF EXISTS staging.distribution_event_source_file_idx;
+ALTER TABLE IF EXISTS dw.fact_revenue DROP COLUMN IF EXISTS source_file_id;
+ALTER TABLE IF EXISTS staging.distribution_event DROP COLUMN IF EXISTS source_file_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0013_agg_month_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwLoadWatermark',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('source', models.CharField(max_length=32, unique=True)),
+                ('watermark', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dw"."load_watermark',
+                'ordering': ['source'],
+            },
+        ),
+        migrations.RunSQL(sql=ADD_SOURCE_FILE, reverse_sql=DROP_SOURCE_FILE),
+    ]
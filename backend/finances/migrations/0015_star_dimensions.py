@@ -0,0 +1,214 @@
+# Generated by Django 5.2 on 2026-10-16 20:24
+
+from django.db import migrations, models
+
+
+# dw.fact_revenue is created outside Django migrations: where it exists with
+# its text columns, seed the dimensions from it, replace the columns by
+# integer keys and rebuild the indexes that used them. Missing text becomes ''.
+NARROW_FACTS = """
+DO $$
+BEGIN
+  IF to_regclass('dw.fact_revenue') IS NULL OR NOT EXISTS (
+    SELECT 1 FROM pg_attribute
+    WHERE attrelid = to_regclass('dw.fact_revenue') AND attname = 'artist_name' AND NOT attisdropped
+  ) THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO dw.dim_date (date, month, quarter, year, quarter_of_year)
+  SELECT d, date_trunc('month', d)::date, date_trunc('quarter', d)::date,
+         EXTRACT(year FROM d), EXTRACT(quarter FROM d)
+  FROM (SELECT DISTINCT occurred_at AS d FROM dw.fact_revenue) dates;
+  INSERT INTO dw.dim_source (source, platform, base_ccy)
+  SELECT DISTINCT source, platform, base_ccy FROM dw.fact_revenue;
+  INSERT INTO dw.dim_store (store_name, store_canonical)
+  SELECT DISTINCT ON (store) store, COALESCE(NULLIF(store_canonical, ''), store)
+  FROM dw.fact_revenue WHERE store <> ''
+  ON CONFLICT (store_name) DO NOTHING;
+  INSERT INTO dw.dim_artist (name)
+  SELECT DISTINCT COALESCE(artist_name, '') FROM dw.fact_revenue;
+  INSERT INTO dw.dim_track (title, isrc)
+  SELECT DISTINCT COALESCE(track_title, ''), COALESCE(isrc, '') FROM dw.fact_revenue;
+  INSERT INTO dw.dim_release (catalog_number, upc_ean)
+  SELECT DISTINCT COALESCE(catalog_number, ''), COALESCE(upc_ean, '') FROM dw.fact_revenue;
+
+  ALTER TABLE dw.fact_revenue
+    ADD COLUMN source_key smallint,
+    ADD COLUMN store_key bigint,
+    ADD COLUMN artist_key integer,
+    ADD COLUMN track_key integer,
+    ADD COLUMN release_key integer;
+  UPDATE dw.fact_revenue f
+  SET source_key = s.id,
+      store_key = st.id,
+      artist_key = a.id,
+      track_key = t.id,
+      release_key = r.id
+  FROM dw.fact_revenue w
+  JOIN dw.dim_source s ON s.source = w.source AND s.platform = w.platform AND s.base_ccy = w.base_ccy
+  LEFT JOIN dw.dim_store st ON st.store_name = w.store
+  JOIN dw.dim_artist a ON a.name = COALESCE(w.artist_name, '')
+  JOIN dw.dim_track t ON t.title = COALESCE(w.track_title, '') AND t.isrc = COALESCE(w.isrc, '')
+  JOIN dw.dim_release r ON r.catalog_number = COALESCE(w.catalog_number, '') AND r.upc_ean = COALESCE(w.upc_ean, '')
+  WHERE f.id = w.id AND f.occurred_at = w.occurred_at;
+  ALTER TABLE dw.fact_revenue
+    ALTER COLUMN source_key SET NOT NULL,
+    ALTER COLUMN artist_key SET NOT NULL,
+    ALTER COLUMN track_key SET NOT NULL,
+    ALTER COLUMN release_key SET NOT NULL;
+
+  -- Dropping the columns drops their indexes too
+  ALTER TABLE dw.fact_revenue
+    DROP COLUMN source,
+    DROP COLUMN platform,
+    DROP COLUMN store,
+    DROP COLUMN artist_name,
+    DROP COLUMN track_title,
+    DROP COLUMN isrc,
+    DROP COLUMN catalog_number,
+    DROP COLUMN upc_ean,
+    DROP COLUMN base_ccy,
+    DROP COLUMN store_canonical;
+  CREATE INDEX fact_revenue_source_occurred_idx ON dw.fact_revenue (source_key, occurred_at);
+  CREATE INDEX fact_revenue_source_file_idx ON dw.fact_revenue (source_key, source_file_id);
+  CREATE INDEX fact_revenue_store_idx ON dw.fact_revenue (store_key);
+  CREATE INDEX fact_revenue_artist_idx ON dw.fact_revenue (artist_key);
+  CREATE INDEX fact_revenue_track_idx ON dw.fact_revenue (track_key);
+  CREATE INDEX fact_revenue_release_idx ON dw.fact_revenue (release_key);
+END
+$$;
+"""
+
+WIDEN_FACTS = """
+DO $$
+BEGIN
+  IF to_regclass('dw.fact_revenue') IS NULL OR NOT EXISTS (
+    SELECT 1 FROM pg_attribute
+    WHERE attrelid = to_regclass('dw.fact_revenue') AND attname = 'artist_key' AND NOT attisdropped
+  ) THEN
+    RETURN;
+  END IF;
+
+  ALTER TABLE dw.fact_revenue
+    ADD COLUMN source varchar(32),
+    ADD COLUMN platform varchar(100),
+    ADD COLUMN store varchar(100),
+    ADD COLUMN artist_name varchar(200),
+    ADD COLUMN track_title varchar(200),
+    ADD COLUMN isrc varchar(32),
+    ADD COLUMN catalog_number varchar(64),
+    ADD COLUMN upc_ean varchar(32),
+    ADD COLUMN base_ccy varchar(3),
+    ADD COLUMN store_canonical varchar(100) NOT NULL DEFAULT '';
+  UPDATE dw.fact_revenue f
+  SET source = s.source,
+      platform = s.platform,
+      base_ccy = s.base_ccy,
+      store = st.store_name,
+      store_canonical = COALESCE(st.store_canonical, ''),
+      artist_name = a.name,
+      track_title = t.title,
+      isrc = t.isrc,
+      catalog_number = r.catalog_number,
+      upc_ean = r.upc_ean
+  FROM dw.fact_revenue k
+  JOIN dw.dim_source s ON s.id = k.source_key
+  LEFT JOIN dw.dim_store st ON st.id = k.store_key
+  JOIN dw.dim_artist a ON a.id = k.artist_key
+  JOIN dw.dim_track t ON t.id = k.track_key
+  JOIN dw.dim_release r ON r.id = k.release_key
+  WHERE f.id = k.id AND f.occurred_at = k.occurred_at;
+  ALTER TABLE dw.fact_revenue
+    ALTER COLUMN source SET NOT NULL,
+    ALTER COLUMN platform SET NOT NULL,
+    ALTER COLUMN base_ccy SET NOT NULL,
+    DROP COLUMN source_key,
+    DROP COLUMN store_key,
+    DROP COLUMN artist_key,
+    DROP COLUMN track_key,
+    DROP COLUMN release_key;
+  CREATE INDEX fact_revenue_source_occurred_idx ON dw.fact_revenue (source, occurred_at);
+  CREATE INDEX fact_revenue_source_file_idx ON dw.fact_revenue (source, source_file_id);
+  CREATE INDEX fact_revenue_platform_store_idx ON dw.fact_revenue (platform, store_canonical);
+  CREATE INDEX fact_revenue_artist_idx ON dw.fact_revenue (artist_name);
+  CREATE INDEX fact_revenue_catalog_idx ON dw.fact_revenue (catalog_number);
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0014_load_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwDimArtist',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'db_table': 'dw"."dim_artist',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DwDimDate',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('quarter', models.DateField()),
+                ('year', models.SmallIntegerField()),
+                ('quarter_of_year', models.SmallIntegerField()),
+            ],
+            options={
+                'db_table': 'dw"."dim_date',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DwDimRelease',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('catalog_number', models.CharField(max_length=64)),
+                ('upc_ean', models.CharField(max_length=32)),
+            ],
+            options={
+                'db_table': 'dw"."dim_release',
+                'ordering': ['catalog_number', 'upc_ean'],
+                'constraints': [models.UniqueConstraint(fields=('catalog_number', 'upc_ean'), name='dim_release_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DwDimSource',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('source', models.CharField(max_length=32)),
+                ('platform', models.CharField(max_length=100)),
+                ('base_ccy', models.CharField(max_length=3)),
+            ],
+            options={
+                'db_table': 'dw"."dim_source',
+                'ordering': ['source', 'platform', 'base_ccy'],
+                'constraints': [models.UniqueConstraint(fields=('source', 'platform', 'base_ccy'), name='dim_source_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DwDimTrack',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('isrc', models.CharField(max_length=32)),
+            ],
+            options={
+                'db_table': 'dw"."dim_track',
+                'ordering': ['title', 'isrc'],
+                'constraints': [models.UniqueConstraint(fields=('title', 'isrc'), name='dim_track_unique')],
+            },
+        ),
+        migrations.RunSQL(sql=NARROW_FACTS, reverse_sql=WIDEN_FACTS),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2 on 2026-10-16 20:30
+
+from django.db import migrations, models
+
+
+# Record the Distribution events touched by every statement on RevenueEvent so
+# build_staging_distribution can re-copy just those. Updates log both the old
+# and new platform, so events moved off Distribution are removed from staging.
+CREATE_CHANGE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION staging.distribution_track_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO staging.distribution_change (event_id)
+    SELECT DISTINCT r.id FROM new_rows r JOIN finances_platform p ON p.id = r.platform_id
+    WHERE p.name = 'Distribution'
+    ON CONFLICT DO NOTHING;
+  END IF;
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    INSERT INTO staging.distribution_change (event_id)
+    SELECT DISTINCT r.id FROM old_rows r JOIN finances_platform p ON p.id = r.platform_id
+    WHERE p.name = 'Distribution'
+    ON CONFLICT DO NOTHING;
+  END IF;
+  RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER revenueevent_staging_insert AFTER INSERT ON finances_revenueevent
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION staging.distribution_track_changes();
+CREATE TRIGGER revenueevent_staging_update AFTER UPDATE ON finances_revenueevent
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION staging.distribution_track_changes();
+CREATE TRIGGER revenueevent_staging_delete AFTER DELETE ON finances_revenueevent
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION staging.distribution_track_changes();
+"""
+
+DROP_CHANGE_TRIGGERS = """
+DROP TRIGGER IF EXISTS revenueevent_staging_insert ON finances_revenueevent;
+DROP TRIGGER IF EXISTS revenueevent_staging_update ON finances_revenueevent;
+DROP TRIGGER IF EXISTS revenueevent_staging_delete ON finances_revenueevent;
+DROP FUNCTION IF EXISTS staging.distribution_track_changes();
+"""
+
+# staging.distribution_event is unmanaged and may not exist until
+# build_staging_distribution first runs; existing rows get their event id on
+# the next (full) sync
+ADD_EVENT_MAPPING = """
+DO $$
+BEGIN
+  IF to_regclass('staging.distribution_event') IS NOT NULL THEN
+    ALTER TABLE staging.distribution_event ADD COLUMN IF NOT EXISTS revenue_event_id bigint NULL;
+    CREATE UNIQUE INDEX IF NOT EXISTS distribution_event_revenue_event_idx
+      ON staging.distribution_event (revenue_event_id);
+  END IF;
+END
+$$;
+"""
+
+DROP_EVENT_MAPPING = """
+DROP INDEX IF EXISTS staging.distribution_event_revenue_event_idx;
+ALTER TABLE IF EXISTS staging.distribution_event DROP COLUMN IF EXISTS revenue_event_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0015_star_dimensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StagingDistributionChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_id', models.BigIntegerField(unique=True)),
+            ],
+            options={
+                'db_table': 'staging"."distribution_change',
+            },
+        ),
+        migrations.RunSQL(sql=CREATE_CHANGE_TRIGGERS, reverse_sql=DROP_CHANGE_TRIGGERS),
+        migrations.RunSQL(sql=ADD_EVENT_MAPPING, reverse_sql=DROP_EVENT_MAPPING),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-16 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0016_staging_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='stages',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+# Bandcamp's id of each API sale item, so re-fetching a period finds the rows
+# already ingested instead of inserting them again. Rows from CSV imports have
+# no id (NULL; the unique index allows any number of those).
+ADD_SALE_ID = """
+DO $$
+BEGIN
+  IF to_regclass('raw.bandcamp_event_raw') IS NOT NULL THEN
+    ALTER TABLE raw.bandcamp_event_raw ADD COLUMN IF NOT EXISTS bandcamp_sale_id text NULL;
+    CREATE UNIQUE INDEX IF NOT EXISTS bandcamp_event_raw_sale_id_idx
+      ON raw.bandcamp_event_raw (bandcamp_sale_id);
+  END IF;
+END
+$$;
+"""
+
+DROP_SALE_ID = """
+DROP INDEX IF EXISTS raw.bandcamp_event_raw_sale_id_idx;
+ALTER TABLE IF EXISTS raw.bandcamp_event_raw DROP COLUMN IF EXISTS bandcamp_sale_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0017_import_batch_stages'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=ADD_SALE_ID, reverse_sql=DROP_SALE_ID),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-16 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0018_bandcamp_sale_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StagingSourceFileChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('source_file_id', models.BigIntegerField(unique=True)),
+            ],
+            options={
+                'db_table': 'staging"."source_file_change',
+            },
+        ),
+    ]
@@ -62,6 +62,8 @@ class ImportBatch(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, default='completed')
+    # finances_pipeline runs: stage name -> status, input fingerprint and timings
+    stages = models.JSONField(default=dict, blank=True)
 
 
 class PlatformRelease(models.Model):
@@ -126,6 +128,9 @@ class RevenueEvent(models.Model):
         indexes = [
             models.Index(fields=['label', 'occurred_at']),
             models.Index(fields=['platform', 'store']),
+            models.Index(fields=['occurred_at']),
+            models.Index(fields=['track_artist_name']),
+            models.Index(fields=['catalog_number']),
         ]
 
 
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 
 
 class RawBandcampEvent(models.Model):
@@ -13,6 +14,8 @@ class RawBandcampEvent(models.Model):
     item_total = models.DecimalField(max_digits=18, decimal_places=6, default=0)
     amount_received = models.DecimalField(max_digits=18, decimal_places=6, default=0)
     raw_row = models.JSONField(null=True, blank=True)
+    # Bandcamp's sale item id (API rows only; unique, see migration 0018)
+    bandcamp_sale_id = models.TextField(null=True, blank=True, unique=True)
 
     class Meta:
         managed = False
@@ -71,34 +74,376 @@ class StagingDistributionEvent(models.Model):
     quantity = models.IntegerField(default=0)
     gross_amount_eur = models.DecimalField(max_digits=18, decimal_places=6, default=0)
     net_amount_eur = models.DecimalField(max_digits=18, decimal_places=6, default=0)
+    source_file_id = models.BigIntegerField(null=True, blank=True)
+    # RevenueEvent the row was copied from; build_staging_distribution syncs by it
+    revenue_event_id = models.BigIntegerField(null=True, blank=True, unique=True)
 
     class Meta:
         managed = False
         db_table = 'staging"."distribution_event'
 
 
+class StagingDistributionChange(models.Model):
+    """Distribution RevenueEvent ids inserted, updated or deleted since the last staging sync.
+
+    Filled by statement triggers on finances_revenueevent; build_staging_distribution
+    claims the ids and re-copies just those events.
+    """
+    id = models.BigAutoField(primary_key=True)
+    event_id = models.BigIntegerField(unique=True)
+
+    class Meta:
+        db_table = 'staging"."distribution_change'
+
+
+class StagingSourceFileChange(models.Model):
+    """SourceFiles whose staging rows changed since the last DW build.
+
+    Recorded by incremental staging syncs; build_dw_revenue claims the ids and
+    replaces the facts of those files.
+    """
+    id = models.BigAutoField(primary_key=True)
+    source_file_id = models.BigIntegerField(unique=True)
+
+    class Meta:
+        db_table = 'staging"."source_file_change'
+
+
+class DwFactRevenueQuerySet(models.QuerySet):
+    # Fact attributes held by the dimensions, by the column names of the former wide fact table
+    ATTRIBUTES = {
+        'source': models.F('source_key__source'),
+        'platform': models.F('source_key__platform'),
+        'base_ccy': models.F('source_key__base_ccy'),
+        'store': models.F('store_key__store_name'),
+        'store_canonical': Coalesce(models.F('store_key__store_canonical'), models.Value('')),
+        'artist_name': models.F('artist_key__name'),
+        'track_title': models.F('track_key__title'),
+        'isrc': models.F('track_key__isrc'),
+        'catalog_number': models.F('release_key__catalog_number'),
+        'upc_ean': models.F('release_key__upc_ean'),
+    }
+
+    def with_attributes(self, *names):
+        """Join the dimensions and annotate the given attributes (all by default) onto each fact"""
+        return self.annotate(**{name: self.ATTRIBUTES[name] for name in names or self.ATTRIBUTES})
+
+
 class DwFactRevenue(models.Model):
+    """Revenue facts: dimension keys and measures only, one row per upstream sale.
+
+    Text attributes live in the dw.dim_* tables; use
+    DwFactRevenue.objects.with_attributes() to read them alongside the facts.
+    occurred_at doubles as the key of dw.dim_date.
+    """
     id = models.BigAutoField(primary_key=True)
     occurred_at = models.DateField()
-    source = models.CharField(max_length=32)
-    platform = models.CharField(max_length=100)
-    store = models.CharField(max_length=100, blank=True)
-    artist_name = models.CharField(max_length=200, blank=True)
-    track_title = models.CharField(max_length=200, blank=True)
-    isrc = models.CharField(max_length=32, blank=True)
-    catalog_number = models.CharField(max_length=64, blank=True)
-    upc_ean = models.CharField(max_length=32, blank=True)
+    source_key = models.ForeignKey('DwDimSource', on_delete=models.DO_NOTHING, db_column='source_key',
+                                   db_constraint=False, related_name='+')
+    # NULL for facts without a store (Bandcamp)
+    store_key = models.ForeignKey('DwDimStore', on_delete=models.DO_NOTHING, db_column='store_key',
+                                  db_constraint=False, related_name='+', null=True)
+    artist_key = models.ForeignKey('DwDimArtist', on_delete=models.DO_NOTHING, db_column='artist_key',
+                                   db_constraint=False, related_name='+')
+    track_key = models.ForeignKey('DwDimTrack', on_delete=models.DO_NOTHING, db_column='track_key',
+                                  db_constraint=False, related_name='+')
+    release_key = models.ForeignKey('DwDimRelease', on_delete=models.DO_NOTHING, db_column='release_key',
+                                    db_constraint=False, related_name='+')
     quantity = models.IntegerField(default=0)
     revenue_base = models.DecimalField(max_digits=18, decimal_places=6, default=0)
-    base_ccy = models.CharField(max_length=3)
     revenue_brl = models.DecimalField(max_digits=18, decimal_places=6, default=0)
     revenue_usd = models.DecimalField(max_digits=18, decimal_places=6, default=0)
     revenue_eur = models.DecimalField(max_digits=18, decimal_places=6, default=0)
+    # SourceFile the row was loaded from (distribution rows); used by incremental builds
+    source_file_id = models.BigIntegerField(null=True, blank=True)
+
+    objects = DwFactRevenueQuerySet.as_manager()
 
     class Meta:
         managed = False
         # Important: schema-qualified table name for Postgres
         # Use the special quoting pattern so Django does not quote the dot
+        # Range-partitioned by occurred_at, one partition per quarter (see services/dw_partitions.py)
         db_table = 'dw"."fact_revenue'
 
 
+class DwDimDate(models.Model):
+    """Calendar dimension, one row per day that carries facts; keyed by the date itself.
+
+    Rows are added by build_dw_revenue (DimensionService.sync) as facts are loaded.
+    """
+    date = models.DateField(primary_key=True)
+    month = models.DateField()
+    quarter = models.DateField()
+    year = models.SmallIntegerField()
+    quarter_of_year = models.SmallIntegerField()
+
+    class Meta:
+        db_table = 'dw"."dim_date'
+        ordering = ['date']
+
+
+class DwDimSource(models.Model):
+    """Fact source (bandcamp, distribution) with its platform and base currency."""
+    id = models.SmallAutoField(primary_key=True)
+    source = models.CharField(max_length=32)
+    platform = models.CharField(max_length=100)
+    base_ccy = models.CharField(max_length=3)
+
+    class Meta:
+        db_table = 'dw"."dim_source'
+        ordering = ['source', 'platform', 'base_ccy']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'platform', 'base_ccy'], name='dim_source_unique'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.source} ({self.platform}, {self.base_ccy})"
+
+
+class DwDimArtist(models.Model):
+    """Artist names as reported upstream; '' for facts without one."""
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=200, unique=True)
+
+    class Meta:
+        db_table = 'dw"."dim_artist'
+        ordering = ['name']
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class DwDimTrack(models.Model):
+    """Track title and ISRC pairs as reported upstream; '' for missing values."""
+    id = models.AutoField(primary_key=True)
+    title = models.CharField(max_length=200)
+    isrc = models.CharField(max_length=32)
+
+    class Meta:
+        db_table = 'dw"."dim_track'
+        ordering = ['title', 'isrc']
+        constraints = [
+            models.UniqueConstraint(fields=['title', 'isrc'], name='dim_track_unique'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.title} ({self.isrc})" if self.isrc else self.title
+
+
+class DwDimRelease(models.Model):
+    """Catalog number and UPC/EAN pairs as reported upstream; '' for missing values."""
+    id = models.AutoField(primary_key=True)
+    catalog_number = models.CharField(max_length=64)
+    upc_ean = models.CharField(max_length=32)
+
+    class Meta:
+        db_table = 'dw"."dim_release'
+        ordering = ['catalog_number', 'upc_ean']
+        constraints = [
+            models.UniqueConstraint(fields=['catalog_number', 'upc_ean'], name='dim_release_unique'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.catalog_number} ({self.upc_ean})" if self.upc_ean else self.catalog_number
+
+
+class DwAggMonthStore(models.Model):
+    """Monthly rollup of dw.fact_revenue, rebuilt by build_dw_revenue.
+
+    One row per month, source, platform, store, artist and catalog so the
+    dashboard aggregations read thousands of rows instead of every fact.
+    """
+    id = models.BigAutoField(primary_key=True)
+    month = models.DateField()
+    source = models.CharField(max_length=32)
+    platform = models.CharField(max_length=100)
+    store = models.CharField(max_length=100, blank=True)
+    store_canonical = models.CharField(max_length=100, blank=True)
+    artist_name = models.CharField(max_length=200, blank=True)
+    catalog_number = models.CharField(max_length=64, blank=True)
+    quantity = models.BigIntegerField(default=0)
+    transactions = models.BigIntegerField(default=0)
+    revenue_base = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+    revenue_brl = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+    revenue_usd = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+    revenue_eur = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+
+    class Meta:
+        db_table = 'dw"."agg_month_store'
+        indexes = [
+            models.Index(fields=['month', 'source'], name='agg_month_store_month_src'),
+            models.Index(fields=['platform', 'store'], name='agg_month_store_store'),
+            models.Index(fields=['platform', 'store_canonical'], name='agg_month_store_canonical'),
+            models.Index(fields=['artist_name'], name='agg_month_store_artist'),
+            models.Index(fields=['catalog_number'], name='agg_month_store_catalog'),
+        ]
+
+
+class DwAggMonthSketch(models.Model):
+    """HyperLogLog sketches of distinct artists, tracks and catalogs per month, rebuilt by build_dw_revenue.
+
+    One row per dataset ('dw' facts or 'events'), month, source and kind;
+    registers holds the dense HLL registers (one byte each). Sketches of any
+    set of months merge by taking the register-wise maximum. Events without a
+    date are sketched under a NULL month.
+    """
+    id = models.BigAutoField(primary_key=True)
+    dataset = models.CharField(max_length=8)
+    month = models.DateField(null=True)
+    source = models.CharField(max_length=32)
+    kind = models.CharField(max_length=8)
+    registers = models.BinaryField()
+
+    class Meta:
+        db_table = 'dw"."agg_month_sketch'
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'month', 'source', 'kind'], name='agg_month_sketch_unique',
+                                    nulls_distinct=False),
+        ]
+        indexes = [
+            models.Index(fields=['dataset', 'kind', 'month'], name='agg_month_sketch_lookup'),
+        ]
+
+
+class DwGeneration(models.Model):
+    """One row per completed warehouse build; the latest id is the current DW generation."""
+    id = models.BigAutoField(primary_key=True)
+    built_at = models.DateTimeField(auto_now_add=True)
+    mode = models.CharField(max_length=32, default='full')
+    fact_rows = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'dw"."generation'
+
+
+class DwDimStore(models.Model):
+    """Maps raw distributor store names to the canonical store shown on the dashboard.
+
+    New store names are seeded by build_dw_revenue from StoreDimensionService
+    rules; existing rows are never overwritten, so admin edits stick.
+    """
+    id = models.BigAutoField(primary_key=True)
+    store_name = models.CharField(max_length=100, unique=True)
+    store_canonical = models.CharField(max_length=100)
+
+    class Meta:
+        db_table = 'dw"."dim_store'
+        ordering = ['store_canonical', 'store_name']
+        verbose_name = 'DW store'
+
+    def __str__(self) -> str:
+        return f"{self.store_name} -> {self.store_canonical}"
+
+
+class DwFacetValue(models.Model):
+    """Facet index behind the finance filter sidebar, rebuilt by build_dw_revenue.
+
+    One row per facet value (year, quarter, platform, store, artist, catalog,
+    source) with the number of facts and BRL revenue carrying that value.
+    """
+    id = models.BigAutoField(primary_key=True)
+    facet = models.CharField(max_length=16)
+    value = models.CharField(max_length=200)
+    rows = models.BigIntegerField(default=0)
+    revenue_brl = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+
+    class Meta:
+        db_table = 'dw"."facet_value'
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='facet_value_unique'),
+        ]
+
+
+class DwLeaderboard(models.Model):
+    """Artist and track revenue leaderboards behind revenue_by_artist/revenue_by_track.
+
+    Track rows (key = ISRC) and artist rows (key = artist name) per label and
+    month. The all-label totals use LeaderboardService.ALL_LABELS (nil UUID)
+    and the all-time totals LeaderboardService.ALL_TIME (0001-01-01) rather
+    than NULL so every top-N lookup is an equality prefix of leaderboard_top.
+    Maintained incrementally by LeaderboardService.
+    """
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=8)
+    label_id = models.UUIDField()
+    month = models.DateField()
+    key = models.CharField(max_length=200)
+    artist_name = models.CharField(max_length=200, blank=True)
+    track_title = models.CharField(max_length=200, blank=True)
+    catalog_number = models.CharField(max_length=64, blank=True)
+    revenue = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+    transactions = models.BigIntegerField(default=0)
+    tracks_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'dw"."leaderboard'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'label_id', 'month', 'key', 'artist_name', 'track_title', 'catalog_number'],
+                name='leaderboard_unique',
+            ),
+        ]
+        indexes = [
+            # Top-N for one label/period is a range read in revenue order
+            models.Index('kind', 'label_id', 'month', models.F('revenue').desc(), name='leaderboard_top'),
+        ]
+
+
+class DwLeaderboardChange(models.Model):
+    """(label, month) slices of RevenueEvent changed since the last leaderboard refresh.
+
+    Filled by a statement trigger on finances_revenueevent; month is NULL for
+    events without a date.
+    """
+    id = models.BigAutoField(primary_key=True)
+    label_id = models.UUIDField()
+    month = models.DateField(null=True)
+
+    class Meta:
+        db_table = 'dw"."leaderboard_change'
+        constraints = [
+            models.UniqueConstraint(fields=['label_id', 'month'], name='leaderboard_change_unique',
+                                    nulls_distinct=False),
+        ]
+
+
+class DwLoadLedger(models.Model):
+    """Current row count and amount total per pipeline table, kept by the load commands.
+
+    Ingest and build commands update their table's row as they write, so the
+    status endpoint reads these rows instead of scanning the tables.
+    """
+    id = models.BigAutoField(primary_key=True)
+    table_name = models.CharField(max_length=64, unique=True)
+    row_count = models.BigIntegerField(default=0)
+    amount_column = models.CharField(max_length=64, blank=True)
+    amount_sum = models.DecimalField(max_digits=24, decimal_places=6, default=0)
+    updated_by = models.CharField(max_length=64, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dw"."load_ledger'
+        ordering = ['table_name']
+
+    def __str__(self) -> str:
+        return f"{self.table_name}: {self.row_count} rows"
+
+
+class DwLoadWatermark(models.Model):
+    """Highest upstream key loaded into dw.fact_revenue per source, kept by build_dw_revenue.
+
+    Bandcamp facts are keyed by raw.bandcamp_event_raw id, distribution facts
+    by SourceFile id; incremental builds load only rows above the watermark.
+    """
+    id = models.BigAutoField(primary_key=True)
+    source = models.CharField(max_length=32, unique=True)
+    watermark = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dw"."load_watermark'
+        ordering = ['source']
+
+    def __str__(self) -> str:
+        return f"{self.source}: {self.watermark}"
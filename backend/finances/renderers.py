@@ -0,0 +1,115 @@
+"""
+Columnar JSON rendering for the finance analytics endpoints
+
+``?format=columnar`` (or ``Accept: application/vnd.columnar+json``) turns
+every list of row objects in a response into a column table:
+
+    {"schema": [{"name": "revenue", "type": "decimal"}, ...],
+     "length": 2,
+     "columns": [["12.50", "3.10"], ...]}
+
+Field names are sent once instead of once per row, and Decimal, date and
+datetime values are encoded by the renderer (Decimal as exact strings) so views
+can hand over raw database values. orjson is used when installed.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+class ColumnTable:
+    """Rows already laid out as columns; views build this directly to skip per-row dicts"""
+
+    def __init__(self, names, columns, types=None):
+        self.names = list(names)
+        self.columns = [list(column) for column in columns]
+        self.types = list(types) if types else [_column_type(column) for column in self.columns]
+
+    @classmethod
+    def from_rows(cls, rows):
+        names = list(rows[0])
+        return cls(names, ([row.get(name) for row in rows] for name in names))
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def as_dict(self) -> dict:
+        columns = [
+            [None if value is None else str(value) for value in column] if kind == 'decimal' else column
+            for column, kind in zip(self.columns, self.types)
+        ]
+        return {
+            'schema': [{'name': name, 'type': kind} for name, kind in zip(self.names, self.types)],
+            'length': len(self),
+            'columns': columns,
+        }
+
+
+def _column_type(values) -> str:
+    for value in values:
+        if value is None:
+            continue
+        # bool before int (bool is an int subclass), datetime before date
+        for kind, name in ((bool, 'boolean'), (int, 'integer'), (float, 'number'), (Decimal, 'decimal'),
+                           (datetime, 'datetime'), (date, 'date'), (str, 'string')):
+            if isinstance(value, kind):
+                return name
+        return 'json'
+    return 'null'
+
+
+def _is_table(value) -> bool:
+    if not isinstance(value, list) or not value or not isinstance(value[0], dict):
+        return False
+    keys = value[0].keys()
+    return all(isinstance(row, dict) and row.keys() == keys for row in value)
+
+
+def to_columnar(data):
+    """Replace every list of same-shaped dicts in a response payload with a column table"""
+    if isinstance(data, ColumnTable):
+        return data.as_dict()
+    if _is_table(data):
+        return ColumnTable.from_rows(data).as_dict()
+    if isinstance(data, dict):
+        return {key: to_columnar(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [to_columnar(value) for value in data]
+    return data
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, ColumnTable):
+        return value.as_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class ColumnarJSONRenderer(BaseRenderer):
+    """Renders analytics payloads in the columnar layout"""
+
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        payload = to_columnar(data)
+        if orjson is not None:
+            return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,218 @@
+"""
+Analytics Filters
+
+Parses the filter query parameters shared by every finance analytics action
+(year, quarter, month range, platform, store, artist, catalog, source) and
+applies them to RevenueEvent, dw.fact_revenue, dw.agg_month_store,
+dw.leaderboard or dw.agg_month_sketch querysets.
+Date filters become plain range predicates so they can use the date indexes.
+"""
+
+import logging
+from datetime import date, datetime
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsFilterError(ValueError):
+    """Raised for malformed filter parameters"""
+    pass
+
+
+class AnalyticsFilters:
+    """Filter selection for the finance analytics endpoints"""
+
+    # Multi-valued text filters; each accepts repeated or comma-separated values
+    LIST_PARAMS = ('platform', 'store', 'artist', 'catalog', 'source')
+
+    # Column names per target: 'events' (RevenueEvent), 'dw' (dw.fact_revenue,
+    # through its dimensions), 'rollup' (dw.agg_month_store), 'leaderboard'
+    # (dw.leaderboard; no platform, store or source columns), 'sketch'
+    # (dw.agg_month_sketch; month and source only)
+    FIELDS = {
+        'events': {
+            'date': 'occurred_at',
+            'platform': 'platform__name',
+            'store': 'store__name',
+            'artist': 'track_artist_name',
+            'catalog': 'catalog_number',
+        },
+        'dw': {
+            'date': 'occurred_at',
+            'platform': 'source_key__platform',
+            'store': 'store_key__store_name',
+            'store_canonical': 'store_key__store_canonical',
+            'artist': 'artist_key__name',
+            'catalog': 'release_key__catalog_number',
+            'source': 'source_key__source',
+        },
+        'rollup': {
+            'date': 'month',
+            'platform': 'platform',
+            'store': 'store',
+            'store_canonical': 'store_canonical',
+            'artist': 'artist_name',
+            'catalog': 'catalog_number',
+            'source': 'source',
+        },
+        'leaderboard': {
+            'date': 'month',
+            'artist': 'artist_name',
+            'catalog': 'catalog_number',
+        },
+        'sketch': {
+            'date': 'month',
+            'source': 'source',
+        },
+    }
+
+    def __init__(self, years=None, quarters=None, month_from=None, month_to=None, **values):
+        self.years = years or []
+        self.quarters = quarters or []
+        self.month_from = month_from
+        self.month_to = month_to
+        self.values = {name: values.get(name) or [] for name in self.LIST_PARAMS}
+
+    @classmethod
+    def from_params(cls, params) -> 'AnalyticsFilters':
+        """
+        Build filters from request query parameters
+
+        Args:
+            params: QueryDict (request.query_params)
+
+        Returns:
+            AnalyticsFilters: Parsed selection (empty when no filter is given)
+
+        Raises:
+            AnalyticsFilterError: If a year, quarter or month is malformed
+        """
+        years = [cls._parse_int('year', value) for value in cls._list(params, 'year')]
+        quarters = [cls._parse_int('quarter', value) for value in cls._list(params, 'quarter')]
+        if any(q < 1 or q > 4 for q in quarters):
+            raise AnalyticsFilterError('quarter must be between 1 and 4')
+
+        month_from = cls._parse_month('month_from', params.get('month_from'))
+        month_to = cls._parse_month('month_to', params.get('month_to'))
+        if month_from and month_to and month_from > month_to:
+            raise AnalyticsFilterError('month_from must not be after month_to')
+
+        values = {name: cls._list(params, name) for name in cls.LIST_PARAMS}
+        return cls(years=years, quarters=quarters, month_from=month_from, month_to=month_to, **values)
+
+    @staticmethod
+    def _list(params, name):
+        items = []
+        for raw in params.getlist(name):
+            items.extend(part.strip() for part in raw.split(',') if part.strip())
+        return items
+
+    @staticmethod
+    def _parse_int(name, value):
+        try:
+            return int(value)
+        except ValueError:
+            raise AnalyticsFilterError(f"Invalid {name} '{value}'")
+
+    @staticmethod
+    def _parse_month(name, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise AnalyticsFilterError(f"Invalid {name} '{value}' (expected YYYY-MM)")
+
+    @staticmethod
+    def _next_month(day: date) -> date:
+        return date(day.year + 1, 1, 1) if day.month == 12 else date(day.year, day.month + 1, 1)
+
+    def is_empty(self) -> bool:
+        return not (
+            self.years or self.quarters or self.month_from or self.month_to
+            or any(self.values.values())
+        )
+
+    def _date_ranges(self):
+        """Half-open [start, end) date ranges for the year/quarter selection"""
+        ranges = []
+        for year in sorted(set(self.years)):
+            if self.quarters:
+                for quarter in sorted(set(self.quarters)):
+                    start = date(year, 3 * quarter - 2, 1)
+                    ranges.append((start, date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)))
+            else:
+                ranges.append((date(year, 1, 1), date(year + 1, 1, 1)))
+        return ranges
+
+    def apply(self, queryset, target: str = 'dw'):
+        """
+        Restrict a queryset to the selection
+
+        Args:
+            queryset: RevenueEvent, DwFactRevenue, DwAggMonthStore, DwLeaderboard or DwAggMonthSketch queryset
+            target: 'events', 'dw', 'rollup', 'leaderboard' or 'sketch' (selects the column mapping)
+
+        Returns:
+            QuerySet: Filtered queryset
+        """
+        if self.is_empty():
+            return queryset
+
+        fields = self.FIELDS[target]
+        date_field = fields['date']
+
+        # RevenueEvent.occurred_at is a timestamp; compare against aware datetimes
+        if target == 'events':
+            tz = timezone.get_current_timezone()
+
+            def bound(day):
+                return timezone.make_aware(datetime(day.year, day.month, day.day), tz)
+        else:
+            def bound(day):
+                return day
+
+        ranges = self._date_ranges()
+        if ranges:
+            queryset = queryset.filter(reduce(or_, (
+                Q(**{f'{date_field}__gte': bound(start), f'{date_field}__lt': bound(end)})
+                for start, end in ranges
+            )))
+        elif self.quarters:
+            queryset = queryset.filter(**{f'{date_field}__quarter__in': self.quarters})
+
+        if self.month_from:
+            queryset = queryset.filter(**{f'{date_field}__gte': bound(self.month_from)})
+        if self.month_to:
+            queryset = queryset.filter(**{f'{date_field}__lt': bound(self._next_month(self.month_to))})
+
+        for name in ('platform', 'artist', 'catalog'):
+            if self.values[name]:
+                queryset = queryset.filter(**{f'{fields[name]}__in': self.values[name]})
+
+        stores = self.values['store']
+        if stores:
+            if target == 'events':
+                # Match raw store names and every raw name mapped to a selected canonical store
+                from finances.models_etl import DwDimStore
+                mapped = DwDimStore.objects.filter(store_canonical__in=stores).values('store_name')
+                queryset = queryset.filter(Q(store__name__in=stores) | Q(store__name__in=mapped))
+            else:
+                queryset = queryset.filter(
+                    Q(**{f"{fields['store']}__in": stores}) | Q(**{f"{fields['store_canonical']}__in": stores})
+                )
+
+        sources = self.values['source']
+        if sources:
+            if target == 'events':
+                # DW sources are the lower-cased platform names (bandcamp, distribution)
+                queryset = queryset.filter(reduce(or_, (Q(platform__name__iexact=s) for s in sources)))
+            else:
+                queryset = queryset.filter(**{f"{fields['source']}__in": [s.lower() for s in sources]})
+
+        return queryset
@@ -0,0 +1,81 @@
+"""
+Concurrent Aggregates
+
+Runs independent analytics queries at the same time. Each task is executed
+with sync_to_async on a dedicated thread pool; Django connections are
+per-thread, so every worker holds its own database connection. With
+persistent connections enabled (POSTGRES_CONN_MAX_AGE) the pool doubles as a
+connection pool.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'FINANCES_AGGREGATE_WORKERS', 4)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='finances-agg')
+    return _executor
+
+
+def _in_worker(func, execute_wrappers):
+    """Wrap a task so it runs under the caller's execute wrappers on the worker's connection"""
+    def run():
+        with ExitStack() as stack:
+            for wrapper in execute_wrappers:
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            try:
+                return func()
+            finally:
+                # Keep the worker's connection for reuse unless it is broken or past CONN_MAX_AGE
+                connection.close_if_unusable_or_obsolete()
+    return run
+
+
+async def gather_aggregates(tasks: dict, execute_wrappers=()) -> dict:
+    """
+    Run independent query callables concurrently
+
+    Args:
+        tasks: Mapping of result name -> zero-argument callable
+        execute_wrappers: Connection execute wrappers to install in each worker
+            (e.g. a QueryCounter active in the calling thread)
+
+    Returns:
+        dict: Result name -> callable return value
+    """
+    executor = _get_executor()
+    names = list(tasks)
+    results = await asyncio.gather(*(
+        sync_to_async(_in_worker(tasks[name], execute_wrappers), thread_sensitive=False, executor=executor)()
+        for name in names
+    ))
+    return dict(zip(names, results))
+
+
+def run_aggregates(tasks: dict, concurrent: bool = False) -> dict:
+    """
+    Evaluate query callables, one after another or concurrently
+
+    Args:
+        tasks: Mapping of result name -> zero-argument callable
+        concurrent: Run the tasks on worker connections at the same time
+
+    Returns:
+        dict: Result name -> callable return value
+    """
+    if not concurrent or len(tasks) < 2:
+        return {name: task() for name, task in tasks.items()}
+    return async_to_sync(gather_aggregates)(tasks, execute_wrappers=list(connection.execute_wrappers))
@@ -0,0 +1,102 @@
+"""
+DW Response Cache
+
+Caches finance analytics responses against the warehouse build generation.
+Every build_dw_revenue run bumps the generation, so cached entries and
+client ETags are invalidated by the build itself rather than by a timeout.
+"""
+
+import functools
+import hashlib
+import logging
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class DwGenerationService:
+    """Reads and bumps the warehouse build generation (dw.generation)"""
+
+    @classmethod
+    def current(cls):
+        """
+        Get the current DW generation
+
+        Returns:
+            tuple: (generation id, built_at datetime or None); generation is 0
+            before the first recorded build
+        """
+        from finances.models_etl import DwGeneration
+
+        row = DwGeneration.objects.order_by('-id').values_list('id', 'built_at').first()
+        return row if row else (0, None)
+
+    @classmethod
+    def bump(cls, mode: str = 'full', fact_rows: int = 0) -> int:
+        """
+        Record a completed build and return the new generation
+
+        Args:
+            mode: Build mode that produced the generation (full, incremental, ...)
+            fact_rows: Number of fact rows written by the build
+        """
+        from finances.models_etl import DwGeneration
+
+        generation = DwGeneration.objects.create(mode=mode, fact_rows=fact_rows)
+        logger.info(f"DW generation bumped to {generation.id} ({mode}, {fact_rows} rows)")
+        return generation.id
+
+
+def _params_digest(action_name: str, request) -> str:
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    # Views may shape data for the negotiated renderer (columnar vs JSON), also when chosen by Accept
+    renderer = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+    return hashlib.sha1(f"{action_name}:{renderer}?{urlencode(params)}".encode('utf-8')).hexdigest()[:16]
+
+
+def dw_cached(view_func):
+    """
+    Cache a viewset action's response data per DW generation.
+
+    The cache key is built from the action name, the query parameters and the
+    current generation. Responses carry a matching ETag and Last-Modified so
+    clients revalidate with conditional requests and receive 304s until the
+    next build.
+    """
+    @functools.wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        generation, built_at = DwGenerationService.current()
+        digest = _params_digest(view_func.__name__, request)
+        etag = quote_etag(f"{generation}-{digest}")
+        last_modified = int(built_at.timestamp()) if built_at else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            response = not_modified
+        else:
+            cache_key = f"finances:dw:{generation}:{digest}"
+            data = cache.get(cache_key)
+            if data is None:
+                response = view_func(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(cache_key, response.data, None)
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    return wrapper
@@ -0,0 +1,182 @@
+"""
+DW Dimension Service
+
+dw.fact_revenue holds integer keys into the dimension tables (dw.dim_source,
+dw.dim_store, dw.dim_artist, dw.dim_track, dw.dim_release) plus the
+measures; its occurred_at is the key of dw.dim_date. Facts are loaded from
+rows in the wide LOAD_COLUMNS shape: the rows' new dimension members are added
+first (sync), then the rows are inserted by key (keyed_select).
+
+Dimension members are never updated or deleted, so keys stay valid across
+builds. Missing text is stored as '' so every member can be looked up by
+plain equality (hash joins).
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DimensionService:
+    """Maintains the DW dimensions and maps wide fact rows to their keys"""
+
+    # Temp table a build stages wide fact rows in (dropped at commit)
+    LOAD_TABLE = 'pg_temp.dw_fact_load'
+
+    # Wide fact row, as produced by build_dw_revenue's source queries
+    LOAD_COLUMNS = (
+        ('occurred_at', 'date'),
+        ('source', 'varchar(32)'),
+        ('platform', 'varchar(100)'),
+        ('store', 'varchar(100)'),
+        ('artist_name', 'varchar(200)'),
+        ('track_title', 'varchar(200)'),
+        ('isrc', 'varchar(32)'),
+        ('catalog_number', 'varchar(64)'),
+        ('upc_ean', 'varchar(32)'),
+        ('quantity', 'integer'),
+        ('revenue_base', 'numeric(18,6)'),
+        ('base_ccy', 'varchar(3)'),
+        ('revenue_brl', 'numeric(18,6)'),
+        ('revenue_usd', 'numeric(18,6)'),
+        ('revenue_eur', 'numeric(18,6)'),
+        ('source_file_id', 'bigint'),
+    )
+
+    FACT_COLUMNS = (
+        'occurred_at', 'source_key', 'store_key', 'artist_key', 'track_key', 'release_key', 'quantity',
+        'revenue_base', 'revenue_brl', 'revenue_usd', 'revenue_eur', 'source_file_id',
+    )
+
+    # Dimension -> (member columns, the load row's expressions for them).
+    # dw.dim_store is kept by StoreDimensionService.
+    MEMBERS = {
+        'dw.dim_source': (('source', 'platform', 'base_ccy'), ('l.source', 'l.platform', 'l.base_ccy')),
+        'dw.dim_artist': (('name',), ("COALESCE(l.artist_name, '')",)),
+        'dw.dim_track': (('title', 'isrc'), ("COALESCE(l.track_title, '')", "COALESCE(l.isrc, '')")),
+        'dw.dim_release': (('catalog_number', 'upc_ean'),
+                           ("COALESCE(l.catalog_number, '')", "COALESCE(l.upc_ean, '')")),
+    }
+
+    @classmethod
+    def load_columns(cls) -> str:
+        return ', '.join(name for name, _ in cls.LOAD_COLUMNS)
+
+    @classmethod
+    def fact_columns(cls) -> str:
+        return ', '.join(cls.FACT_COLUMNS)
+
+    @classmethod
+    def stage(cls, cur, select_sql: str, params=None) -> int:
+        """
+        Replace the contents of LOAD_TABLE with the rows of a wide SELECT
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            select_sql: SELECT producing LOAD_COLUMNS in order
+            params: Statement parameters
+
+        Returns:
+            int: Number of rows staged
+        """
+        columns = ', '.join(f'{name} {kind}' for name, kind in cls.LOAD_COLUMNS)
+        cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {cls.LOAD_TABLE.split('.')[1]} ({columns}) ON COMMIT DROP")
+        cur.execute(f"TRUNCATE {cls.LOAD_TABLE}")
+        cur.execute(f"INSERT INTO {cls.LOAD_TABLE} ({cls.load_columns()}) {select_sql}", params)
+        staged = cur.rowcount
+        cur.execute(f"ANALYZE {cls.LOAD_TABLE}")
+        return staged
+
+    @classmethod
+    def sync(cls, cur, relation: str = None) -> int:
+        """
+        Add the dates and dimension members of a wide relation that are not known yet
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            relation: FROM item with LOAD_COLUMNS aliased l (default: LOAD_TABLE)
+
+        Returns:
+            int: Number of members added across all dimensions
+        """
+        relation = relation or f'{cls.LOAD_TABLE} l'
+        cur.execute(
+            f"""
+            INSERT INTO dw.dim_date (date, month, quarter, year, quarter_of_year)
+            SELECT d, date_trunc('month', d)::date, date_trunc('quarter', d)::date,
+                   EXTRACT(year FROM d), EXTRACT(quarter FROM d)
+            FROM (SELECT DISTINCT l.occurred_at AS d FROM {relation}) dates
+            WHERE d IS NOT NULL
+            ORDER BY d
+            ON CONFLICT (date) DO NOTHING
+            """
+        )
+        added = cur.rowcount
+        for table, (columns, expressions) in cls.MEMBERS.items():
+            # Sorted, so concurrent builds insert new members in the same order
+            cur.execute(
+                f"""
+                INSERT INTO {table} ({', '.join(columns)})
+                SELECT DISTINCT {', '.join(expressions)} FROM {relation}
+                ORDER BY {', '.join(str(i + 1) for i in range(len(columns)))}
+                ON CONFLICT ({', '.join(columns)}) DO NOTHING
+                """
+            )
+            if cur.rowcount:
+                logger.info(f"{table}: {cur.rowcount} new members")
+            added += cur.rowcount
+        return added
+
+    @classmethod
+    def keyed_select(cls, relation: str = None) -> str:
+        """
+        SELECT of FACT_COLUMNS for the rows of a wide relation whose members are synced
+
+        Args:
+            relation: FROM item with LOAD_COLUMNS aliased l (default: LOAD_TABLE)
+
+        Returns:
+            str: SQL without parameters
+        """
+        relation = relation or f'{cls.LOAD_TABLE} l'
+        joins = []
+        keys = {}
+        for alias, (table, (columns, expressions)) in zip(('s', 'a', 't', 'r'), cls.MEMBERS.items()):
+            condition = ' AND '.join(f'{alias}.{column} = {expression}'
+                                     for column, expression in zip(columns, expressions))
+            joins.append(f"JOIN {table} {alias} ON {condition}")
+            keys[table] = f'{alias}.id'
+        return f"""
+            SELECT
+              l.occurred_at, {keys['dw.dim_source']}, st.id, {keys['dw.dim_artist']}, {keys['dw.dim_track']},
+              {keys['dw.dim_release']}, l.quantity, l.revenue_base, l.revenue_brl, l.revenue_usd, l.revenue_eur,
+              l.source_file_id
+            FROM {relation}
+            {' '.join(joins)}
+            LEFT JOIN dw.dim_store st ON st.store_name = l.store
+        """
+
+    @staticmethod
+    def wide_relation(facts: str = 'dw.fact_revenue') -> str:
+        """
+        FROM item presenting facts with their dimension attributes (aliased facts)
+
+        Columns: the measures and source_file_id, occurred_at with its month,
+        quarter and year, source, platform, base_ccy, store, store_canonical,
+        artist_name, track_title, isrc, catalog_number and upc_ean.
+        """
+        return f"""(
+            SELECT
+              f.id, f.occurred_at, d.month, d.quarter, d.year,
+              s.source, s.platform, s.base_ccy, st.store_name AS store,
+              COALESCE(st.store_canonical, '') AS store_canonical,
+              a.name AS artist_name, t.title AS track_title, t.isrc, r.catalog_number, r.upc_ean,
+              f.quantity, f.revenue_base, f.revenue_brl, f.revenue_usd, f.revenue_eur, f.source_file_id
+            FROM {facts} f
+            JOIN dw.dim_date d ON d.date = f.occurred_at
+            JOIN dw.dim_source s ON s.id = f.source_key
+            LEFT JOIN dw.dim_store st ON st.id = f.store_key
+            JOIN dw.dim_artist a ON a.id = f.artist_key
+            JOIN dw.dim_track t ON t.id = f.track_key
+            JOIN dw.dim_release r ON r.id = f.release_key
+        ) facts"""
@@ -0,0 +1,128 @@
+"""
+DW Facet Index
+
+Maintains dw.facet_value, the per-value row counts and revenue behind the
+filter_options endpoint. Facets are derived from the monthly rollup in a
+single GROUPING SETS scan, so the sidebar never touches the fact table.
+"""
+
+import logging
+
+from finances.services.dw_dimensions import DimensionService
+
+logger = logging.getLogger(__name__)
+
+
+class FacetIndexService:
+    """Rebuilds and reads the dw.facet_value index"""
+
+    TABLE = 'dw.facet_value'
+
+    # Facet name -> SQL expression over the rollup (or fact) columns
+    FACETS = {
+        'year': "EXTRACT(year FROM {date_col})::int::text",
+        'quarter': "EXTRACT(quarter FROM {date_col})::int::text",
+        'platform': "platform",
+        'store': "COALESCE(NULLIF(store_canonical, ''), store, '')",
+        'artist': "COALESCE(artist_name, '')",
+        'catalog': "COALESCE(catalog_number, '')",
+        'source': "source",
+    }
+
+    # Facets whose values are integers (sorted numerically, returned as int)
+    NUMERIC_FACETS = ('year', 'quarter')
+
+    @classmethod
+    def _select_sql(cls, relation: str, date_col: str, rows_expr: str) -> str:
+        columns = ',\n'.join(
+            f"{expr.format(date_col=date_col)} AS f_{name}" for name, expr in cls.FACETS.items()
+        )
+        facet_name = ' '.join(
+            f"WHEN GROUPING(f_{name}) = 0 THEN '{name}'" for name in cls.FACETS
+        )
+        facet_value = ', '.join(f"f_{name}" for name in cls.FACETS)
+        grouping_sets = ', '.join(f"(f_{name})" for name in cls.FACETS)
+        return f"""
+            WITH base AS (
+              SELECT {columns},
+                     {rows_expr} AS row_count,
+                     revenue_brl
+              FROM {relation}
+            )
+            SELECT facet, value, rows, revenue_brl
+            FROM (
+              SELECT CASE {facet_name} END AS facet,
+                     COALESCE({facet_value}) AS value,
+                     SUM(row_count)::bigint AS rows,
+                     COALESCE(SUM(revenue_brl), 0) AS revenue_brl
+              FROM base
+              GROUP BY GROUPING SETS ({grouping_sets})
+            ) facets
+            WHERE value IS NOT NULL AND value <> ''
+            """
+
+    @classmethod
+    def refresh(cls, cur) -> int:
+        """
+        Rebuild dw.facet_value from dw.agg_month_store
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+
+        Returns:
+            int: Number of facet values written
+        """
+        # DELETE rather than TRUNCATE: filter_options keeps answering until the build commits
+        cur.execute(f"DELETE FROM {cls.TABLE}")
+        cur.execute(
+            f"INSERT INTO {cls.TABLE} (facet, value, rows, revenue_brl) "
+            + cls._select_sql('dw.agg_month_store', 'month', 'transactions')
+        )
+        written = cur.rowcount
+        logger.info(f"Refreshed {cls.TABLE}: {written} facet values")
+        return written
+
+    @classmethod
+    def load(cls, queryset=None) -> dict:
+        """
+        Read every facet
+
+        Without a queryset the prebuilt index is used, falling back to a live
+        scan of dw.fact_revenue when it has not been built yet. With a
+        queryset (a filtered rollup from the viewset) facets are recounted
+        over the matching rows only.
+
+        Args:
+            queryset: Optional rollup-shaped queryset exposing month/transactions
+
+        Returns:
+            dict: Facet name -> list of (value, rows, revenue_brl), years newest
+            first and every other facet in ascending value order
+        """
+        from django.db import connection
+        from finances.models_etl import DwFacetValue
+
+        rows = []
+        if queryset is None:
+            rows = list(DwFacetValue.objects.values_list('facet', 'value', 'rows', 'revenue_brl'))
+        if not rows:
+            if queryset is None:
+                sql, params = cls._select_sql(DimensionService.wide_relation(), 'occurred_at', '1'), []
+            else:
+                base_sql, params = queryset.values(
+                    'month', 'transactions', 'source', 'platform', 'store', 'store_canonical',
+                    'artist_name', 'catalog_number', 'revenue_brl'
+                ).query.sql_with_params()
+                sql = cls._select_sql(f'({base_sql}) selection', 'month', 'transactions')
+            with connection.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+
+        facets = {name: [] for name in cls.FACETS}
+        for facet, value, count, revenue in rows:
+            if facet in cls.NUMERIC_FACETS:
+                value = int(value)
+            facets[facet].append((value, count, revenue))
+        for name, values in facets.items():
+            values.sort(key=lambda item: item[0], reverse=(name == 'year'))
+        return facets
@@ -0,0 +1,236 @@
+"""
+DW Partition Service
+
+dw.fact_revenue is range-partitioned by occurred_at, one partition per
+quarter (dw.fact_revenue_2024q1, ...). build_dw_revenue creates the
+partitions a load needs before inserting, so date-bounded queries only scan
+the quarters they ask for. A DEFAULT partition (dw.fact_revenue_default)
+takes rows of any quarter that has no partition yet instead of failing the
+insert; their rows move to the quarter's partition when it is created.
+
+A quarter is rebuilt by loading a standalone table and indexing it, then
+attaching it in place of the current partition; the old partition is dropped
+in the same transaction. Dropping it locks the whole fact table, so the
+attach is meant to run last, right before the commit.
+"""
+
+import logging
+import re
+from datetime import date
+
+from finances.services.load_ledger import LoadLedgerService
+
+logger = logging.getLogger(__name__)
+
+
+class FactPartitionError(ValueError):
+    """Raised for malformed quarters or tables that cannot take a partition"""
+    pass
+
+
+class FactPartitionService:
+    """Creates, loads and attaches the quarterly partitions of the fact table"""
+
+    PARTITION_KEY = 'occurred_at'
+    PARTITION_BY = f'RANGE ({PARTITION_KEY})'
+
+    @staticmethod
+    def quarter_start(day: date) -> date:
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+
+    @staticmethod
+    def quarter_end(start: date) -> date:
+        """First day after the quarter"""
+        return date(start.year + 1, 1, 1) if start.month == 10 else date(start.year, start.month + 3, 1)
+
+    @classmethod
+    def quarter_months(cls, start: date) -> list:
+        return [date(start.year, start.month + offset, 1) for offset in range(3)]
+
+    @classmethod
+    def parse_quarter(cls, value: str) -> date:
+        """'2024Q1' or '2024-Q1' -> date(2024, 1, 1)"""
+        match = re.fullmatch(r'(\d{4})-?[Qq]([1-4])', value.strip())
+        if not match:
+            raise FactPartitionError(f"Invalid quarter '{value}' (expected YYYYQn, e.g. 2024Q1)")
+        year, quarter = int(match.group(1)), int(match.group(2))
+        return date(year, 3 * quarter - 2, 1)
+
+    @staticmethod
+    def partition_name(table: str, start: date) -> str:
+        """Schema-qualified partition name, e.g. dw.fact_revenue_2024q1"""
+        return f'{table}_{start.year}q{(start.month - 1) // 3 + 1}'
+
+    @staticmethod
+    def default_name(table: str) -> str:
+        """Schema-qualified name of the DEFAULT partition, e.g. dw.fact_revenue_default"""
+        return f'{table}_default'
+
+    @staticmethod
+    def is_partitioned(cur, table: str) -> bool:
+        cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        row = cur.fetchone()
+        return bool(row and row[0])
+
+    @staticmethod
+    def _partitions(cur, table: str) -> set:
+        cur.execute(
+            """
+            SELECT n.nspname || '.' || c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE i.inhparent = %s::regclass
+            """,
+            [table]
+        )
+        return {name for name, in cur.fetchall()}
+
+    @classmethod
+    def ensure(cls, cur, table: str, quarters) -> int:
+        """
+        Create the partitions of the given quarters that do not exist yet, and the DEFAULT partition
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            table: Partitioned table (the fact table or its shadow)
+            quarters: Dates inside the quarters to cover
+
+        Returns:
+            int: Number of partitions created
+        """
+        existing = cls._partitions(cur, table)
+        default = cls.default_name(table)
+        created = 0
+        if default not in existing:
+            cur.execute(f"CREATE TABLE {default} PARTITION OF {table} DEFAULT")
+            created += 1
+        for start in sorted({cls.quarter_start(day) for day in quarters}):
+            partition = cls.partition_name(table, start)
+            if partition in existing:
+                continue
+            bounds = [start, cls.quarter_end(start)]
+            in_range = f"{cls.PARTITION_KEY} >= %s AND {cls.PARTITION_KEY} < %s"
+            # Rows of the quarter caught by the DEFAULT partition would block the new one; move them
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})", bounds)
+            moving = cur.fetchone()[0]
+            if moving:
+                cur.execute("DROP TABLE IF EXISTS pg_temp.fact_partition_moved")
+                cur.execute(f"CREATE TEMP TABLE fact_partition_moved (LIKE {table}) ON COMMIT DROP")
+                cur.execute(
+                    f"""
+                    WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *)
+                    INSERT INTO pg_temp.fact_partition_moved SELECT * FROM moved
+                    """,
+                    bounds
+                )
+            # New partitions inherit the parent's indexes
+            cur.execute(f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", bounds)
+            if moving:
+                cur.execute(f"INSERT INTO {table} SELECT * FROM pg_temp.fact_partition_moved")
+                logger.info(f"Moved {cur.rowcount} rows from {default} to {partition}")
+            created += 1
+        if created:
+            logger.info(f"Created {created} partitions of {table}")
+        return created
+
+    @classmethod
+    def create_detached(cls, cur, table: str, start: date) -> str:
+        """
+        Create an empty standalone table to load one quarter into before attach()
+
+        It carries the quarter bounds as a CHECK constraint, so attaching it does
+        not rescan the rows.
+
+        Returns:
+            str: Schema-qualified name of the load table
+        """
+        loaded = f'{cls.partition_name(table, start)}_load'
+        cur.execute(f"DROP TABLE IF EXISTS {loaded}")
+        cur.execute(f"CREATE TABLE {loaded} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)")
+        cur.execute(
+            f"ALTER TABLE {loaded} ADD CONSTRAINT {loaded.split('.')[1]}_bounds "
+            f"CHECK ({cls.PARTITION_KEY} >= %s AND {cls.PARTITION_KEY} < %s)",
+            [start, cls.quarter_end(start)]
+        )
+        return loaded
+
+    @classmethod
+    def prepare(cls, cur, table: str, loaded: str) -> int:
+        """
+        Build the parent's indexes on a loaded quarter and analyze it
+
+        ATTACH then adopts the indexes instead of building them under its lock.
+
+        Returns:
+            int: Number of indexes built
+        """
+        cur.execute(
+            """
+            SELECT pg_get_indexdef(x.indexrelid), pg_get_constraintdef(c.oid)
+            FROM pg_index x
+            LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+            WHERE x.indrelid = %s::regclass
+            """,
+            [table]
+        )
+        indexes = cur.fetchall()
+        for definition, constraint_def in indexes:
+            if constraint_def:
+                cur.execute(f"ALTER TABLE {loaded} ADD {constraint_def}")
+            else:
+                # Unnamed: Postgres picks <table>_<columns>_idx
+                cur.execute(re.sub(r' INDEX \S+ ON (ONLY )?\S+ ', f' INDEX ON {loaded} ', definition, count=1))
+        cur.execute(f"ANALYZE {loaded}")
+        return len(indexes)
+
+    @classmethod
+    def attach(cls, cur, table: str, start: date, loaded: str, source: str = '') -> int:
+        """
+        Attach a prepared quarter in place of the current partition
+
+        Dropping the current partition takes an exclusive lock on the fact
+        table until the transaction ends, so call this after prepare() and
+        after everything else the transaction does. The rows of the replaced
+        partition, and any rows of the quarter the DEFAULT partition held, are
+        subtracted from the load ledger; the caller records the loaded rows as
+        it inserts them.
+
+        Returns:
+            int: Number of rows replaced
+        """
+        schema = table.split('.')[0]
+        loaded_name = loaded.split('.')[1]
+
+        partition = cls.partition_name(table, start)
+        partition_name = partition.split('.')[1]
+        partitions = cls._partitions(cur, table)
+        replaced = 0
+        if partition in partitions:
+            replaced = LoadLedgerService.detach(cur, table, partition, source=source)
+            cur.execute(f"DROP TABLE {partition}")
+        default = cls.default_name(table)
+        if default in partitions:
+            replaced += LoadLedgerService.delete(
+                cur, table,
+                f"DELETE FROM {default} WHERE {cls.PARTITION_KEY} >= %s AND {cls.PARTITION_KEY} < %s",
+                [start, cls.quarter_end(start)], source=source
+            )
+        cur.execute(
+            f"ALTER TABLE {table} ATTACH PARTITION {loaded} FOR VALUES FROM (%s) TO (%s)",
+            [start, cls.quarter_end(start)]
+        )
+        cur.execute(f"ALTER TABLE {loaded} DROP CONSTRAINT {loaded_name}_bounds")
+        cur.execute(f"ALTER TABLE {loaded} RENAME TO {partition_name}")
+
+        # Give the adopted indexes the names the replaced partition's indexes had
+        cur.execute(
+            "SELECT c.relname FROM pg_index x JOIN pg_class c ON c.oid = x.indexrelid WHERE x.indrelid = %s::regclass",
+            [partition]
+        )
+        for index, in cur.fetchall():
+            if index.startswith(loaded_name):
+                cur.execute(f"ALTER INDEX {schema}.{index} RENAME TO {partition_name}{index[len(loaded_name):]}")
+
+        logger.info(f"Attached {partition} ({replaced} rows replaced)")
+        return replaced
@@ -0,0 +1,95 @@
+"""
+DW Rollup Service
+
+Maintains the monthly rollup tables derived from dw.fact_revenue so the
+finance dashboard can aggregate pre-summed rows instead of rescanning facts.
+"""
+
+import logging
+
+from dateutil.relativedelta import relativedelta
+
+logger = logging.getLogger(__name__)
+
+
+class MonthlyRollupService:
+    """Rebuilds dw.agg_month_store from dw.fact_revenue"""
+
+    TABLE = 'dw.agg_month_store'
+
+    @classmethod
+    def refresh(cls, cur, months=None, facts: str = 'dw.fact_revenue') -> int:
+        """
+        Rebuild the rollup for the given months, or for all history
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            months: Optional iterable of first-of-month dates to refresh
+            facts: Fact relation to aggregate (a full build passes its shadow table)
+
+        Returns:
+            int: Number of rollup rows written
+        """
+        params = []
+        month_filter = ''
+        if months is None:
+            # DELETE rather than TRUNCATE: readers keep the old rows until the build commits
+            cur.execute(f"DELETE FROM {cls.TABLE}")
+        else:
+            months = sorted(set(months))
+            if not months:
+                return 0
+            cur.execute(f"DELETE FROM {cls.TABLE} WHERE month = ANY(%s)", [months])
+            # The range bounds let a partitioned fact table prune to the affected quarters
+            month_filter = ("WHERE occurred_at >= %s AND occurred_at < %s "
+                            "AND date_trunc('month', occurred_at)::date = ANY(%s)")
+            params.extend([months[0], months[-1] + relativedelta(months=1), months])
+
+        # Facts are summed per month and dimension key first (integer grouping), then
+        # the few resulting rows pick up their text from the dimensions
+        cur.execute(
+            f"""
+            INSERT INTO {cls.TABLE} (
+              month, source, platform, store, store_canonical, artist_name, catalog_number,
+              quantity, transactions, revenue_base, revenue_brl, revenue_usd, revenue_eur
+            )
+            SELECT
+              k.month,
+              s.source,
+              s.platform,
+              COALESCE(st.store_name, ''),
+              COALESCE(st.store_canonical, ''),
+              a.name,
+              r.catalog_number,
+              SUM(k.quantity),
+              SUM(k.transactions),
+              SUM(k.revenue_base),
+              SUM(k.revenue_brl),
+              SUM(k.revenue_usd),
+              SUM(k.revenue_eur)
+            FROM (
+              SELECT
+                date_trunc('month', occurred_at)::date AS month,
+                source_key, store_key, artist_key, release_key,
+                COALESCE(SUM(quantity), 0) AS quantity,
+                COUNT(*) AS transactions,
+                COALESCE(SUM(revenue_base), 0) AS revenue_base,
+                COALESCE(SUM(revenue_brl), 0) AS revenue_brl,
+                COALESCE(SUM(revenue_usd), 0) AS revenue_usd,
+                COALESCE(SUM(revenue_eur), 0) AS revenue_eur
+              FROM {facts}
+              {month_filter}
+              GROUP BY 1, 2, 3, 4, 5
+            ) k
+            JOIN dw.dim_source s ON s.id = k.source_key
+            LEFT JOIN dw.dim_store st ON st.id = k.store_key
+            JOIN dw.dim_artist a ON a.id = k.artist_key
+            JOIN dw.dim_release r ON r.id = k.release_key
+            -- Releases sharing a catalog number (different UPCs) fold into one row
+            GROUP BY 1, 2, 3, 4, 5, 6, 7
+            """,
+            params
+        )
+        written = cur.rowcount
+        logger.info(f"Refreshed {cls.TABLE}: {written} rows")
+        return written
@@ -0,0 +1,167 @@
+"""
+DW Shadow Table Service
+
+Full rebuilds of a DW table load into a shadow copy next to the live table,
+index and analyze it there, and swap it in at the end of the build
+transaction. Readers keep querying the complete previous table during the
+load; the swap only holds an exclusive lock for the renames.
+
+Every relation of the shadow (its partitions and indexes) is named with the
+shadow table's name as prefix, so the swap can rename them all back to the
+live table's prefix.
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowTableError(Exception):
+    """Raised when a shadow table cannot be prepared or swapped in"""
+    pass
+
+
+class ShadowTableService:
+    """Creates, indexes and swaps in shadow copies of DW tables"""
+
+    SUFFIX = '_shadow'
+
+    @classmethod
+    def shadow_name(cls, table: str) -> str:
+        return f'{table}{cls.SUFFIX}'
+
+    @classmethod
+    def create(cls, cur, table: str, partition_by: str = None) -> str:
+        """
+        Create an empty shadow of a table: same columns, defaults and checks, no indexes yet
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            table: Schema-qualified live table
+            partition_by: Optional partitioning of the shadow, e.g. 'RANGE (occurred_at)'
+                (the live table's partitioning is not copied)
+
+        Returns:
+            str: Schema-qualified shadow table name
+        """
+        shadow = cls.shadow_name(table)
+        # A shadow left by an aborted build is discarded
+        cur.execute(f"DROP TABLE IF EXISTS {shadow}")
+        partitioning = f" PARTITION BY {partition_by}" if partition_by else ''
+        cur.execute(
+            f"CREATE TABLE {shadow} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)"
+            f"{partitioning}"
+        )
+        return shadow
+
+    @classmethod
+    def _indexes(cls, cur, table: str) -> list:
+        """(index name, index definition, constraint name, constraint type, constraint definition, key columns)"""
+        cur.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(x.indexrelid), c.conname, c.contype, pg_get_constraintdef(c.oid),
+                   ARRAY(SELECT a.attname
+                         FROM unnest(c.conkey) WITH ORDINALITY AS k(attnum, n)
+                         JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                         ORDER BY k.n)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+            WHERE x.indrelid = %s::regclass
+            ORDER BY i.relname
+            """,
+            [table]
+        )
+        return cur.fetchall()
+
+    @staticmethod
+    def _partition_columns(cur, table: str) -> list:
+        cur.execute(
+            """
+            SELECT a.attname
+            FROM pg_partitioned_table p
+            JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = ANY(p.partattrs::int2[])
+            WHERE p.partrelid = %s::regclass
+            """,
+            [table]
+        )
+        return [name for name, in cur.fetchall()]
+
+    @classmethod
+    def build_indexes(cls, cur, table: str, shadow: str) -> int:
+        """
+        Recreate the live table's keys and indexes on the loaded shadow, then analyze it
+
+        On a partitioned shadow the indexes cascade to every partition, and
+        primary/unique keys are widened with the partition key, which
+        Postgres requires there.
+
+        Returns:
+            int: Number of indexes built
+        """
+        name, shadow_name = table.split('.')[1], shadow.split('.')[1]
+        partition_columns = cls._partition_columns(cur, shadow)
+        indexes = cls._indexes(cur, table)
+        for index, definition, constraint, contype, constraint_def, columns in indexes:
+            if not index.startswith(name):
+                raise ShadowTableError(f'Cannot copy index {index}: its name does not start with {name}')
+            shadow_index = f'{shadow_name}{index[len(name):]}'
+            if constraint:
+                missing = [column for column in partition_columns if column not in columns]
+                if missing and contype in ('p', 'u'):
+                    kind = 'PRIMARY KEY' if contype == 'p' else 'UNIQUE'
+                    constraint_def = f"{kind} ({', '.join(columns + missing)})"
+                cur.execute(f"ALTER TABLE {shadow} ADD CONSTRAINT {shadow_index} {constraint_def}")
+                continue
+            definition, count = re.subn(
+                r' INDEX \S+ ON (ONLY )?\S+ ', f' INDEX {shadow_index} ON {shadow} ', definition, count=1
+            )
+            if not count:
+                raise ShadowTableError(f'Cannot copy index {index}: unexpected definition {definition}')
+            cur.execute(definition)
+        cur.execute(f"ANALYZE {shadow}")
+        logger.info(f"Built {len(indexes)} indexes on {shadow}")
+        return len(indexes)
+
+    @classmethod
+    def swap(cls, cur, table: str, shadow: str):
+        """
+        Replace the live table with the shadow (takes effect when the transaction commits)
+
+        Sequences owned by the live table move to the shadow first, so ids keep
+        increasing across rebuilds.
+        """
+        schema, name = table.split('.')
+        shadow_name = shadow.split('.')[1]
+
+        cur.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cur.execute(
+            """
+            SELECT s.relname, a.attname
+            FROM pg_depend d
+            JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+            JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+            WHERE d.refobjid = %s::regclass AND d.deptype = 'a'
+            """,
+            [table]
+        )
+        for sequence, column in cur.fetchall():
+            cur.execute(f"ALTER SEQUENCE {schema}.{sequence} OWNED BY {shadow}.{column}")
+
+        # Drops the live partitions and indexes too, freeing their names
+        cur.execute(f"DROP TABLE {table}")
+        cur.execute(
+            """
+            SELECT c.relname, c.relkind IN ('i', 'I')
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s AND starts_with(c.relname, %s) AND c.relkind IN ('r', 'p', 'i', 'I')
+            """,
+            [schema, shadow_name]
+        )
+        for relation, is_index in cur.fetchall():
+            # Renaming a key's index renames the constraint as well
+            kind = 'INDEX' if is_index else 'TABLE'
+            cur.execute(f"ALTER {kind} {schema}.{relation} RENAME TO {name}{relation[len(shadow_name):]}")
+        logger.info(f"Swapped {shadow} in as {table}")
@@ -0,0 +1,242 @@
+"""
+DW Sketch Service
+
+Maintains dw.agg_month_sketch, HyperLogLog sketches of the distinct artists,
+tracks and catalogs per month and source, and answers unique-count questions
+from them instead of COUNT(DISTINCT ...) over the facts.
+
+Sketches are built in plain SQL (no hll extension needed): every value is
+hashed with hashtextextended(); the low PRECISION bits pick a register and the
+position of the first 1-bit in the remaining bits is the register value. A
+range of months is answered by merging the month sketches (register-wise
+maximum) and estimating the cardinality of the merge; the standard error is
+about 1.04 / sqrt(2 ** PRECISION), ~1.6%. Small counts use linear counting
+and are near-exact.
+"""
+
+import logging
+import math
+from functools import reduce
+
+from dateutil.relativedelta import relativedelta
+
+from finances.models_etl import DwAggMonthSketch
+
+logger = logging.getLogger(__name__)
+
+
+class DistinctSketchError(Exception):
+    """Raised for unknown sketch datasets or kinds"""
+    pass
+
+
+class DistinctSketchService:
+    """Rebuilds dw.agg_month_sketch and estimates distinct counts from it"""
+
+    TABLE = 'dw.agg_month_sketch'
+
+    PRECISION = 12
+    REGISTERS = 1 << PRECISION
+
+    # Dataset -> relation, date and source expressions and the sketched columns
+    # per kind. 'dw' mirrors monthly_overview (blank values count as a value),
+    # 'events' mirrors kpi_summary (blank values are skipped).
+    DATASETS = {
+        'dw': {
+            'relation': ('{facts} f JOIN dw.dim_source s ON s.id = f.source_key '
+                         'JOIN dw.dim_artist a ON a.id = f.artist_key '
+                         'JOIN dw.dim_track t ON t.id = f.track_key '
+                         'JOIN dw.dim_release r ON r.id = f.release_key'),
+            'date': 'f.occurred_at',
+            'source': 's.source',
+            'kinds': {'artist': 'a.name', 'track': 't.title', 'catalog': 'r.catalog_number'},
+            'skip_blank': False,
+        },
+        'events': {
+            'relation': 'finances_revenueevent e JOIN finances_platform p ON p.id = e.platform_id',
+            'date': 'e.occurred_at',
+            'source': 'lower(p.name)',
+            'kinds': {'artist': 'e.track_artist_name', 'track': 'e.track_title'},
+            'skip_blank': True,
+        },
+    }
+
+    # Filters the sketches cannot answer (they are kept per month and source only)
+    UNSUPPORTED_FILTERS = ('platform', 'store', 'artist', 'catalog')
+
+    _ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+    # Every register byte with its top bit set, for the word-parallel merge
+    _HIGH_BITS = int.from_bytes(b'\x80' * REGISTERS, 'big')
+    _LOW_BITS = int.from_bytes(b'\x01' * REGISTERS, 'big')
+
+    @classmethod
+    def _dataset(cls, dataset: str) -> dict:
+        try:
+            return cls.DATASETS[dataset]
+        except KeyError:
+            raise DistinctSketchError(f'Unknown sketch dataset {dataset}')
+
+    @classmethod
+    def refresh(cls, cur, months=None, facts: str = 'dw.fact_revenue', datasets=None) -> int:
+        """
+        Rebuild the sketches of the given datasets for the given months, or for all history
+
+        The 'dw' sketches are refreshed by build_dw_revenue for the months it
+        loaded; the 'events' sketches by LeaderboardService.refresh for the
+        months the RevenueEvent changes touched.
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            months: Optional iterable of first-of-month dates to refresh
+            facts: Fact relation behind the 'dw' dataset (a full build passes its shadow table)
+            datasets: Datasets to refresh (default: all)
+
+        Returns:
+            int: Number of sketch rows written
+        """
+        datasets = list(datasets or cls.DATASETS)
+        for dataset in datasets:
+            cls._dataset(dataset)
+        if months is None:
+            # DELETE rather than TRUNCATE: readers keep the old sketches until the build commits
+            cur.execute(f"DELETE FROM {cls.TABLE} WHERE dataset = ANY(%s)", [datasets])
+        else:
+            months = sorted(set(months))
+            if not months:
+                return 0
+            cur.execute(f"DELETE FROM {cls.TABLE} WHERE dataset = ANY(%s) AND month = ANY(%s)", [datasets, months])
+        written = sum(cls._build(cur, dataset, months, facts) for dataset in datasets)
+        logger.info(f"Refreshed {cls.TABLE}: {written} sketches")
+        return written
+
+    @classmethod
+    def _build(cls, cur, dataset: str, months, facts: str) -> int:
+        config = cls._dataset(dataset)
+        date = config['date']
+        values = ', '.join(f"('{kind}', {column})" for kind, column in config['kinds'].items())
+        conditions = ['v.value IS NOT NULL']
+        if config['skip_blank']:
+            conditions.append("v.value <> ''")
+        params = []
+        if months is not None:
+            # The range bounds let a partitioned fact table prune to the affected quarters
+            conditions.append(f"{date} >= %s AND {date} < %s AND date_trunc('month', {date})::date = ANY(%s)")
+            params.extend([months[0], months[-1] + relativedelta(months=1), months])
+        # Bits left after the register index; rank = position of the first 1-bit
+        width = 64 - cls.PRECISION
+        cur.execute(
+            f"""
+            WITH hashed AS (
+              SELECT date_trunc('month', {date})::date AS month, {config['source']} AS source,
+                     v.kind, hashtextextended(v.value, 0) AS h
+              FROM {config['relation'].format(facts=facts)}
+              CROSS JOIN LATERAL (VALUES {values}) AS v(kind, value)
+              WHERE {' AND '.join(conditions)}
+            ),
+            ranked AS (
+              SELECT month, source, kind, (h & {cls.REGISTERS - 1})::int AS register,
+                     MAX(COALESCE(NULLIF(position('1' IN ((h >> {cls.PRECISION})::bit({width}))::text), 0),
+                                  {width + 1})) AS rank
+              FROM hashed
+              GROUP BY 1, 2, 3, 4
+            ),
+            sparse AS (
+              SELECT month, source, kind, array_agg(register) AS registers, array_agg(rank) AS ranks
+              FROM ranked
+              GROUP BY 1, 2, 3
+            )
+            INSERT INTO {cls.TABLE} (dataset, month, source, kind, registers)
+            SELECT %s, s.month, s.source, s.kind, (
+                     -- Dense registers: one byte per register, 0 where no value landed
+                     SELECT decode(string_agg(lpad(to_hex(COALESCE(x.rank, 0)), 2, '0'), '' ORDER BY g.register), 'hex')
+                     FROM generate_series(0, {cls.REGISTERS - 1}) AS g(register)
+                     LEFT JOIN unnest(s.registers, s.ranks) AS x(register, rank) ON x.register = g.register
+                   )
+            FROM sparse s
+            """,
+            params + [dataset]
+        )
+        return cur.rowcount
+
+    @classmethod
+    def _max(cls, a: int, b: int) -> int:
+        # Registers are below 0x80, so (a | 0x80..) - b never borrows across
+        # bytes and its top bit per byte says a >= b; widen that to a byte mask
+        ge = (((a | cls._HIGH_BITS) - b) & cls._HIGH_BITS) >> 7
+        mask = ge * 0xFF
+        return (a & mask) | (b & ~mask & (cls._LOW_BITS * 0xFF))
+
+    @classmethod
+    def merge(cls, sketches) -> bytes:
+        """Union of sketches: the register-wise maximum"""
+        merged = reduce(cls._max, (int.from_bytes(sketch, 'big') for sketch in sketches))
+        return merged.to_bytes(cls.REGISTERS, 'big')
+
+    @classmethod
+    def estimate(cls, registers: bytes) -> int:
+        """Estimated number of distinct values in a sketch"""
+        m = cls.REGISTERS
+        # Register histogram up to the highest rank present (rarely above ~20)
+        histogram = [registers.count(rank) for rank in range(max(registers) + 1)]
+        zeros = histogram[0]
+        raw = cls._ALPHA * m * m / sum(count * 2.0 ** -rank for rank, count in enumerate(histogram) if count)
+        if raw <= 2.5 * m and zeros:
+            # Small range: linear counting over the empty registers
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    @classmethod
+    def supports(cls, dataset: str, filters) -> bool:
+        """Whether the sketches of a dataset can answer a request with these filters"""
+        cls._dataset(dataset)
+        if any(filters.values[name] for name in cls.UNSUPPORTED_FILTERS):
+            return False
+        return DwAggMonthSketch.objects.filter(dataset=dataset).exists()
+
+    @classmethod
+    def _rows(cls, dataset: str, filters, kinds):
+        unknown = set(kinds) - set(cls._dataset(dataset)['kinds'])
+        if unknown:
+            raise DistinctSketchError(f"Unknown sketch kind(s) for {dataset}: {', '.join(sorted(unknown))}")
+        queryset = DwAggMonthSketch.objects.filter(dataset=dataset, kind__in=kinds)
+        return filters.apply(queryset, 'sketch').values_list('month', 'kind', 'registers')
+
+    @classmethod
+    def totals(cls, dataset: str, filters, kinds) -> dict:
+        """
+        Distinct counts over the whole filtered period
+
+        Args:
+            dataset: 'dw' or 'events'
+            filters: AnalyticsFilters of the request (see supports())
+            kinds: Kinds to count ('artist', 'track', 'catalog')
+
+        Returns:
+            dict: kind -> estimated distinct count
+        """
+        grouped = {kind: [] for kind in kinds}
+        for _, kind, registers in cls._rows(dataset, filters, kinds):
+            grouped[kind].append(bytes(registers))
+        return {kind: cls.estimate(cls.merge(sketches)) if sketches else 0 for kind, sketches in grouped.items()}
+
+    @classmethod
+    def monthly(cls, dataset: str, filters, kinds) -> dict:
+        """
+        Distinct counts per month (sources of a month merged)
+
+        Args:
+            dataset: 'dw' or 'events'
+            filters: AnalyticsFilters of the request (see supports())
+            kinds: Kinds to count ('artist', 'track', 'catalog')
+
+        Returns:
+            dict: month -> {kind: estimated distinct count}
+        """
+        grouped = {}
+        for month, kind, registers in cls._rows(dataset, filters, kinds):
+            if month is not None:
+                grouped.setdefault(month, {}).setdefault(kind, []).append(bytes(registers))
+        return {
+            month: {kind: cls.estimate(cls.merge(by_kind[kind])) if kind in by_kind else 0 for kind in kinds}
+            for month, by_kind in grouped.items()
+        }
@@ -0,0 +1,49 @@
+"""
+DW Watermark Service
+
+Keeps dw.load_watermark, the highest upstream key each source has loaded
+into dw.fact_revenue, so build_dw_revenue can load only what arrived since
+the previous build.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DwWatermarkService:
+    """Reads and advances per-source load watermarks"""
+
+    TABLE = 'dw.load_watermark'
+
+    @classmethod
+    def get(cls, cur, source: str):
+        """
+        Current watermark of a source
+
+        Returns:
+            int or None: Highest key loaded, None when the source was never loaded
+        """
+        cur.execute(f"SELECT watermark FROM {cls.TABLE} WHERE source = %s", [source])
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def set(cls, cur, source: str, watermark: int):
+        """Record the highest key loaded for a source (runs inside the caller's transaction)"""
+        cur.execute(
+            f"""
+            INSERT INTO {cls.TABLE} (source, watermark, updated_at)
+            VALUES (%s, %s, now())
+            ON CONFLICT (source) DO UPDATE SET
+              watermark = EXCLUDED.watermark,
+              updated_at = EXCLUDED.updated_at
+            """,
+            [source, watermark]
+        )
+        logger.info(f"Load watermark {source}: {watermark}")
+
+    @classmethod
+    def clear(cls, cur):
+        """Forget every watermark (the fact table is being rebuilt)"""
+        cur.execute(f"DELETE FROM {cls.TABLE}")
@@ -0,0 +1,193 @@
+"""
+Fact Export Service
+
+Streams dw.fact_revenue or RevenueEvent rows as CSV, NDJSON or Parquet.
+Rows are read through a server-side cursor in fixed-size chunks, so memory
+stays constant regardless of how many rows are exported.
+"""
+
+import csv
+import io
+import json
+import logging
+import tempfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class FactExportError(Exception):
+    """Raised for unsupported export requests"""
+    pass
+
+
+class FactExporter:
+    """Serializes a queryset into one of the supported export formats"""
+
+    FORMATS = {
+        'csv': ('text/csv', 'csv'),
+        'ndjson': ('application/x-ndjson', 'ndjson'),
+        'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    }
+
+    # (column name, ORM lookup, parquet type name)
+    DATASETS = {
+        'dw': [
+            ('id', 'id', 'int'),
+            ('occurred_at', 'occurred_at', 'date'),
+            ('source', 'source', 'str'),
+            ('platform', 'platform', 'str'),
+            ('store', 'store', 'str'),
+            ('store_canonical', 'store_canonical', 'str'),
+            ('artist_name', 'artist_name', 'str'),
+            ('track_title', 'track_title', 'str'),
+            ('isrc', 'isrc', 'str'),
+            ('catalog_number', 'catalog_number', 'str'),
+            ('upc_ean', 'upc_ean', 'str'),
+            ('quantity', 'quantity', 'int'),
+            ('revenue_base', 'revenue_base', 'decimal'),
+            ('base_ccy', 'base_ccy', 'str'),
+            ('revenue_brl', 'revenue_brl', 'decimal'),
+            ('revenue_usd', 'revenue_usd', 'decimal'),
+            ('revenue_eur', 'revenue_eur', 'decimal'),
+        ],
+        'events': [
+            ('id', 'id', 'int'),
+            ('occurred_at', 'occurred_at', 'timestamp'),
+            ('platform', 'platform__name', 'str'),
+            ('store', 'store__name', 'str'),
+            ('currency', 'currency', 'str'),
+            ('product_type', 'product_type', 'str'),
+            ('quantity', 'quantity', 'int'),
+            ('gross_amount', 'gross_amount', 'decimal'),
+            ('net_amount', 'net_amount', 'decimal'),
+            ('base_ccy', 'base_ccy', 'str'),
+            ('net_amount_base', 'net_amount_base', 'decimal'),
+            ('isrc', 'isrc', 'str'),
+            ('upc_ean', 'upc_ean', 'str'),
+            ('track_artist_name', 'track_artist_name', 'str'),
+            ('track_title', 'track_title', 'str'),
+            ('catalog_number', 'catalog_number', 'str'),
+            ('source_file_id', 'source_file_id', 'int'),
+        ],
+    }
+
+    CHUNK_SIZE = 5000
+
+    def __init__(self, queryset, dataset: str = 'dw', export_format: str = 'csv', chunk_size: int = None):
+        if dataset not in self.DATASETS:
+            raise FactExportError(f"Unknown dataset '{dataset}' (expected one of {', '.join(self.DATASETS)})")
+        if export_format not in self.FORMATS:
+            raise FactExportError(f"Unknown format '{export_format}' (expected one of {', '.join(self.FORMATS)})")
+        self.queryset = queryset
+        self.dataset = dataset
+        self.export_format = export_format
+        if export_format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise FactExportError('Parquet export requires pyarrow')
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.columns = self.DATASETS[dataset]
+        self.rows_written = 0
+
+    @property
+    def content_type(self) -> str:
+        return self.FORMATS[self.export_format][0]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.dataset}_revenue.{self.FORMATS[self.export_format][1]}"
+
+    def iter_rows(self):
+        """Yield value tuples from a server-side cursor"""
+        lookups = [lookup for _, lookup, _ in self.columns]
+        return self.queryset.order_by('id').values_list(*lookups).iterator(chunk_size=self.chunk_size)
+
+    def iter_chunks(self):
+        """Yield lists of at most chunk_size rows"""
+        chunk = []
+        for row in self.iter_rows():
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def stream(self):
+        """Yield the export as byte strings, one chunk of rows at a time"""
+        if self.export_format == 'csv':
+            return self._stream_csv()
+        if self.export_format == 'ndjson':
+            return self._stream_ndjson()
+        return self._stream_parquet()
+
+    def write(self, fh) -> int:
+        """
+        Write the full export to a binary file object
+
+        Returns:
+            int: Number of rows written
+        """
+        for block in self.stream():
+            fh.write(block)
+        return self.rows_written
+
+    def _stream_csv(self):
+        self.rows_written = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _, _ in self.columns])
+        for chunk in self.iter_chunks():
+            writer.writerows(chunk)
+            self.rows_written += len(chunk)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def _stream_ndjson(self):
+        self.rows_written = 0
+        names = [name for name, _, _ in self.columns]
+        for chunk in self.iter_chunks():
+            lines = [json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) for row in chunk]
+            self.rows_written += len(chunk)
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def _stream_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            'int': pa.int64(),
+            'str': pa.string(),
+            'date': pa.date32(),
+            'timestamp': pa.timestamp('us', tz='UTC'),
+            'decimal': pa.decimal128(18, 6),
+        }
+        schema = pa.schema([(name, types[kind]) for name, _, kind in self.columns])
+        names = [name for name, _, _ in self.columns]
+
+        self.rows_written = 0
+        # Parquet needs its footer written last, so row groups are spooled to a
+        # temporary file (on disk past 32MB) and streamed back once complete
+        with tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024) as spool:
+            with pq.ParquetWriter(spool, schema, compression='zstd') as writer:
+                for chunk in self.iter_chunks():
+                    columns = list(zip(*chunk))
+                    table = pa.Table.from_arrays(
+                        [pa.array(col, type=schema.field(name).type) for name, col in zip(names, columns)],
+                        schema=schema
+                    )
+                    writer.write_table(table)
+                    self.rows_written += len(chunk)
+            spool.seek(0)
+            while True:
+                block = spool.read(1024 * 1024)
+                if not block:
+                    break
+                yield block
+        logger.info(f"Exported {self.rows_written} {self.dataset} rows as parquet")
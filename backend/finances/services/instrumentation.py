@@ -0,0 +1,65 @@
+"""
+Query Instrumentation
+
+Counts the SQL statements a block of code issues and the time spent in the
+database, using Django's connection execute wrappers (works with DEBUG off).
+"""
+
+import functools
+import logging
+import threading
+import time
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Context manager recording query count, DB time and per-statement timings"""
+
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.db_time = 0.0
+        self.keep_statements = keep_statements
+        self.statements = []
+        # Also installed on worker connections by run_aggregates, so updates are locked
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.count += 1
+                self.db_time += elapsed
+                if self.keep_statements:
+                    self.statements.append((elapsed, sql))
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrapper.__exit__(*exc_info)
+
+
+def count_queries(view_func):
+    """
+    Report the number of SQL queries and DB time of a viewset action.
+
+    Values are logged and returned as X-DB-Query-Count / X-DB-Time-Ms headers.
+    """
+    @functools.wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        with QueryCounter() as counter:
+            response = view_func(self, request, *args, **kwargs)
+        response['X-DB-Query-Count'] = str(counter.count)
+        response['X-DB-Time-Ms'] = f"{counter.db_time * 1000:.1f}"
+        logger.info(f"{view_func.__name__}: {counter.count} queries, {counter.db_time * 1000:.1f}ms in DB")
+        return response
+
+    return wrapper
@@ -0,0 +1,289 @@
+"""
+Leaderboard Service
+
+Maintains dw.leaderboard, the precomputed artist and track revenue rankings
+read by revenue_by_artist and revenue_by_track, and answers top-N queries
+from it.
+
+A statement trigger on finances_revenueevent records every (label, month)
+slice an INSERT/UPDATE/DELETE touches in dw.leaderboard_change; refresh()
+rebuilds only those slices from RevenueEvent (an index range read on
+label/occurred_at) and re-derives the all-time and all-label rows from the
+board itself. The 'events' unique-count sketches of the refreshed months are
+rebuilt along with them. Rows for all labels and for all time use the
+ALL_LABELS and ALL_TIME sentinels.
+"""
+
+import logging
+import uuid
+from datetime import date
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+from finances.models_etl import DwLeaderboard
+from finances.services.dw_sketches import DistinctSketchService
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardService:
+    """Refreshes and queries dw.leaderboard"""
+
+    TABLE = 'dw.leaderboard'
+    CHANGES = 'dw.leaderboard_change'
+
+    # Sentinels for the all-label and all-time rows (NULL would break the
+    # ordered index scan: IS NULL is not an equality the planner sorts on)
+    ALL_LABELS = uuid.UUID(int=0)
+    ALL_TIME = date(1, 1, 1)
+
+    # Filters the board cannot answer; those requests use the live event query
+    UNSUPPORTED_FILTERS = ('platform', 'store', 'source')
+
+    @classmethod
+    def refresh(cls, cur, full: bool = False) -> int:
+        """
+        Rebuild the leaderboard slices changed since the last refresh
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            full: Rebuild every slice; also done when the board is empty
+
+        Returns:
+            int: Number of (label, month) slices refreshed
+        """
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {cls.TABLE})")
+        full = full or not cur.fetchone()[0]
+        if full:
+            cur.execute(f"TRUNCATE TABLE {cls.TABLE}, {cls.CHANGES}")
+            cur.execute(
+                "SELECT DISTINCT label_id, date_trunc('month', occurred_at)::date FROM finances_revenueevent"
+            )
+        else:
+            # Claim the pending changes; triggers of concurrent writers add new rows
+            cur.execute(f"DELETE FROM {cls.CHANGES} RETURNING label_id, month")
+        slices = set(cur.fetchall())
+        if not slices:
+            return 0
+
+        labels = sorted({label_id for label_id, _ in slices})
+        months = sorted({month for _, month in slices if month is not None})
+        # Parallel label/month arrays of the dated slices, expanded with unnest()
+        dated = [
+            [label_id for label_id, month in slices if month is not None],
+            [month for _, month in slices if month is not None],
+        ]
+        all_labels = str(cls.ALL_LABELS)
+
+        # Per label and month, straight from the events
+        cur.execute(
+            f"""
+            DELETE FROM {cls.TABLE} l
+            USING unnest(%s::uuid[], %s::date[]) AS s(label_id, month)
+            WHERE l.label_id = s.label_id AND l.month = s.month
+            """,
+            dated
+        )
+        cur.execute(
+            f"""
+            INSERT INTO {cls.TABLE} (
+              kind, label_id, month, key, artist_name, track_title, catalog_number,
+              revenue, transactions, tracks_count
+            )
+            SELECT 'track', e.label_id, s.month, e.isrc, e.track_artist_name, e.track_title,
+                   e.catalog_number, COALESCE(SUM(e.net_amount_base), 0), COUNT(*), 1
+            FROM unnest(%s::uuid[], %s::date[]) AS s(label_id, month)
+            JOIN finances_revenueevent e
+              ON e.label_id = s.label_id
+             AND e.occurred_at >= s.month AND e.occurred_at < s.month + interval '1 month'
+            GROUP BY 1, 2, 3, 4, 5, 6, 7
+            """,
+            dated
+        )
+        cls._derive_artists(
+            cur, "(label_id, month) IN (SELECT * FROM unnest(%s::uuid[], %s::date[]))", dated
+        )
+
+        # All-time rows per label: the month rows plus events without a date
+        cur.execute(
+            f"DELETE FROM {cls.TABLE} WHERE label_id = ANY(%s::uuid[]) AND month = %s",
+            [labels, cls.ALL_TIME]
+        )
+        cur.execute(
+            f"""
+            INSERT INTO {cls.TABLE} (
+              kind, label_id, month, key, artist_name, track_title, catalog_number,
+              revenue, transactions, tracks_count
+            )
+            SELECT 'track', label_id, %s, key, artist_name, track_title, catalog_number,
+                   SUM(revenue), SUM(transactions), 1
+            FROM (
+              SELECT label_id, key, artist_name, track_title, catalog_number, revenue, transactions
+              FROM {cls.TABLE}
+              WHERE kind = 'track' AND label_id = ANY(%s::uuid[]) AND month <> %s
+              UNION ALL
+              SELECT label_id, isrc, track_artist_name, track_title, catalog_number, net_amount_base, 1
+              FROM finances_revenueevent
+              WHERE label_id = ANY(%s::uuid[]) AND occurred_at IS NULL
+            ) t
+            GROUP BY 1, 2, 3, 4, 5, 6, 7
+            """,
+            [cls.ALL_TIME, labels, cls.ALL_TIME, labels]
+        )
+        cls._derive_artists(cur, "label_id = ANY(%s::uuid[]) AND month = %s", [labels, cls.ALL_TIME])
+
+        # All-label rows for the touched months and all time, summed over labels
+        scope = "(month = ANY(%s::date[]) OR month = %s)"
+        cur.execute(
+            f"DELETE FROM {cls.TABLE} WHERE label_id = %s AND {scope}",
+            [all_labels, months, cls.ALL_TIME]
+        )
+        cur.execute(
+            f"""
+            INSERT INTO {cls.TABLE} (
+              kind, label_id, month, key, artist_name, track_title, catalog_number,
+              revenue, transactions, tracks_count
+            )
+            SELECT 'track', %s::uuid, month, key, artist_name, track_title, catalog_number,
+                   SUM(revenue), SUM(transactions), 1
+            FROM {cls.TABLE}
+            WHERE kind = 'track' AND label_id <> %s AND {scope}
+            GROUP BY 1, 2, 3, 4, 5, 6, 7
+            """,
+            [all_labels, all_labels, months, cls.ALL_TIME]
+        )
+        cls._derive_artists(cur, f"label_id = %s AND {scope}", [all_labels, months, cls.ALL_TIME])
+
+        # The unique-count sketches of the events cover the same months
+        DistinctSketchService.refresh(cur, None if full else months, datasets=['events'])
+
+        logger.info(f"Refreshed {cls.TABLE}: {len(slices)} label/month slices")
+        return len(slices)
+
+    @classmethod
+    def _derive_artists(cls, cur, where: str, params: list):
+        """Replace the artist rows of the selected slices with sums of their track rows"""
+        cur.execute(f"DELETE FROM {cls.TABLE} WHERE kind = 'artist' AND {where}", params)
+        cur.execute(
+            f"""
+            INSERT INTO {cls.TABLE} (
+              kind, label_id, month, key, artist_name, track_title, catalog_number,
+              revenue, transactions, tracks_count
+            )
+            SELECT 'artist', label_id, month, artist_name, artist_name, '', '',
+                   SUM(revenue), SUM(transactions), COUNT(DISTINCT key)
+            FROM {cls.TABLE}
+            WHERE kind = 'track' AND {where}
+            GROUP BY label_id, month, artist_name
+            """,
+            params
+        )
+
+    @classmethod
+    def supports(cls, filters) -> bool:
+        """Whether the board can answer a request with these filters"""
+        if any(filters.values[name] for name in cls.UNSUPPORTED_FILTERS):
+            return False
+        return DwLeaderboard.objects.exists()
+
+    @staticmethod
+    def _has_dates(filters) -> bool:
+        return bool(filters.years or filters.quarters or filters.month_from or filters.month_to)
+
+    @classmethod
+    def _single_period(cls, filters) -> bool:
+        """No date filter (all time) or exactly one month, i.e. one precomputed period"""
+        if not cls._has_dates(filters):
+            return True
+        return (not filters.years and not filters.quarters
+                and filters.month_from is not None and filters.month_from == filters.month_to)
+
+    @classmethod
+    def _rows(cls, kind, filters, label_id):
+        queryset = DwLeaderboard.objects.filter(kind=kind, label_id=label_id or cls.ALL_LABELS)
+        if cls._has_dates(filters):
+            queryset = queryset.exclude(month=cls.ALL_TIME)
+        else:
+            queryset = queryset.filter(month=cls.ALL_TIME)
+        return filters.apply(queryset, 'leaderboard')
+
+    @classmethod
+    def top_artists(cls, filters, limit: int, label_id=None):
+        """
+        Top artists by revenue
+
+        Args:
+            filters: AnalyticsFilters of the request (see supports())
+            limit: Number of artists to return
+            label_id: Restrict to one label (None = all labels)
+
+        Returns:
+            tuple: (rows with artist_name/revenue/tracks_count/transactions, total revenue)
+        """
+        if cls._single_period(filters) and not filters.values['catalog']:
+            # Precomputed artist rows: index range read in revenue order
+            queryset = cls._rows('artist', filters, label_id)
+            artists = queryset.annotate(
+                amount=F('revenue'), tracks=F('tracks_count'), rows=F('transactions'),
+            )
+        else:
+            # Several months or a catalog filter: sum the (much smaller) track rows
+            queryset = cls._rows('track', filters, label_id)
+            artists = queryset.values('artist_name').annotate(
+                amount=Sum('revenue'), tracks=Count('key', distinct=True), rows=Sum('transactions'),
+            )
+        artists = artists.exclude(artist_name='').values(
+            'artist_name', 'amount', 'tracks', 'rows'
+        ).order_by('-amount')[:limit]
+        total = queryset.aggregate(total=Sum('revenue'))['total']
+        return [
+            {
+                'track_artist_name': row['artist_name'],
+                'revenue': row['amount'],
+                'tracks_count': row['tracks'],
+                'transactions': row['rows'],
+            }
+            for row in artists
+        ], total
+
+    @classmethod
+    def top_tracks(cls, filters, limit: int, label_id=None):
+        """
+        Top tracks by revenue (rows without an ISRC and exchange adjustments excluded)
+
+        Args:
+            filters: AnalyticsFilters of the request (see supports())
+            limit: Number of tracks to return
+            label_id: Restrict to one label (None = all labels)
+
+        Returns:
+            tuple: (rows with isrc/artist/title/catalog/revenue/streams/avg_per_stream, total revenue)
+        """
+        queryset = cls._rows('track', filters, label_id)
+        tracks = queryset.exclude(key='').exclude(key__icontains='Exchange')
+        if cls._single_period(filters):
+            tracks = tracks.annotate(amount=F('revenue'), streams=F('transactions'))
+        else:
+            tracks = tracks.values('key', 'artist_name', 'track_title', 'catalog_number').annotate(
+                amount=Sum('revenue'), streams=Sum('transactions'),
+            )
+        tracks = tracks.annotate(
+            avg_per_stream=ExpressionWrapper(
+                F('amount') / F('streams'), output_field=DecimalField(max_digits=30, decimal_places=20)
+            )
+        ).values(
+            'key', 'artist_name', 'track_title', 'catalog_number', 'amount', 'streams', 'avg_per_stream'
+        ).order_by('-amount')[:limit]
+        total = queryset.aggregate(total=Sum('revenue'))['total']
+        return [
+            {
+                'isrc': row['key'],
+                'track_artist_name': row['artist_name'],
+                'track_title': row['track_title'],
+                'catalog_number': row['catalog_number'],
+                'revenue': row['amount'],
+                'streams': row['streams'],
+                'avg_per_stream': row['avg_per_stream'],
+            }
+            for row in tracks
+        ], total
@@ -0,0 +1,229 @@
+"""
+Load Ledger Service
+
+Keeps dw.load_ledger, the running row count and amount total of every raw,
+staging and DW table, up to date as the ingest and build commands write.
+The status endpoint reads the ledger instead of running count(*)/sum() over
+the tables; tables without a ledger row fall back to the planner's row
+estimate (pg_class.reltuples), which is also free to read.
+"""
+
+import logging
+from contextlib import contextmanager
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class LoadLedgerError(Exception):
+    """Raised for tables the ledger does not track"""
+    pass
+
+
+class LoadLedgerService:
+    """Records and reads per-table row counts and amount totals"""
+
+    TABLE = 'dw.load_ledger'
+
+    # Tracked table -> amount column summed into the ledger
+    TABLES = {
+        'raw.bandcamp_event_raw': 'amount_received',
+        'raw.zebralution_event_raw': 'revenue_eur',
+        'raw.labelworx_event_raw': 'royalty',
+        'staging.distribution_event': 'net_amount_eur',
+        'dw.fact_revenue': 'revenue_base',
+    }
+
+    @classmethod
+    def _amount_column(cls, table: str) -> str:
+        try:
+            return cls.TABLES[table]
+        except KeyError:
+            raise LoadLedgerError(f'{table} is not tracked by the load ledger')
+
+    @classmethod
+    def _write(cls, cur, table: str, rows: int, amount, source: str, replace: bool):
+        column = cls._amount_column(table)
+        if not replace:
+            cur.execute(f"SELECT 1 FROM {cls.TABLE} WHERE table_name = %s", [table])
+            if cur.fetchone() is None:
+                # Table was loaded before it had a ledger row: seed it with one exact count
+                cls.measure(cur, table, source)
+                return
+        if replace:
+            update = "row_count = EXCLUDED.row_count, amount_sum = EXCLUDED.amount_sum"
+        else:
+            update = (f"row_count = {cls.TABLE}.row_count + EXCLUDED.row_count, "
+                      f"amount_sum = {cls.TABLE}.amount_sum + EXCLUDED.amount_sum")
+        cur.execute(
+            f"""
+            INSERT INTO {cls.TABLE} (table_name, row_count, amount_column, amount_sum, updated_by, updated_at)
+            VALUES (%s, %s, %s, %s, %s, now())
+            ON CONFLICT (table_name) DO UPDATE SET
+              {update},
+              amount_column = EXCLUDED.amount_column,
+              updated_by = EXCLUDED.updated_by,
+              updated_at = EXCLUDED.updated_at
+            """,
+            [table, rows, column, amount or 0, source]
+        )
+
+    @classmethod
+    def insert(cls, cur, table: str, sql: str, params=None, source: str = '', replace: bool = False) -> int:
+        """
+        Run an INSERT ... SELECT into a tracked table and record what it wrote
+
+        The count and amount are taken from the statement's RETURNING rows, so
+        nothing is re-read from the table.
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            table: Tracked table the statement inserts into
+            sql: INSERT statement without a RETURNING clause
+            params: Statement parameters
+            source: Command recorded as the writer
+            replace: The table was emptied first; store totals instead of adding
+
+        Returns:
+            int: Number of rows inserted
+        """
+        column = cls._amount_column(table)
+        cur.execute(
+            f"""
+            WITH written AS ({sql} RETURNING {column})
+            SELECT COUNT(*), COALESCE(SUM({column}), 0) FROM written
+            """,
+            params
+        )
+        rows, amount = cur.fetchone()
+        cls._write(cur, table, rows, amount, source, replace)
+        return rows
+
+    @classmethod
+    def delete(cls, cur, table: str, sql: str, params=None, source: str = '') -> int:
+        """
+        Run a DELETE on a tracked table and subtract what it removed (see insert())
+
+        Returns:
+            int: Number of rows deleted
+        """
+        column = cls._amount_column(table)
+        cur.execute(
+            f"""
+            WITH removed AS ({sql} RETURNING {column})
+            SELECT COUNT(*), COALESCE(SUM({column}), 0) FROM removed
+            """,
+            params
+        )
+        rows, amount = cur.fetchone()
+        cls._write(cur, table, -rows, -amount, source, replace=False)
+        return rows
+
+    @classmethod
+    def detach(cls, cur, table: str, partition: str, source: str = '') -> int:
+        """
+        Subtract the rows of a partition that is about to be dropped from its table
+
+        Returns:
+            int: Number of rows in the partition
+        """
+        column = cls._amount_column(table)
+        cur.execute(f"SELECT COUNT(*), COALESCE(SUM({column}), 0) FROM {partition}")
+        rows, amount = cur.fetchone()
+        cls._write(cur, table, -rows, -amount, source, replace=False)
+        return rows
+
+    @classmethod
+    def add(cls, cur, table: str, rows: int, amount, source: str = ''):
+        """Add rows written without going through insert() (e.g. on other connections)"""
+        cls._write(cur, table, rows, amount, source, replace=False)
+
+    @classmethod
+    def reset(cls, cur, table: str, source: str = ''):
+        """Record that a table was truncated"""
+        cls._write(cur, table, 0, 0, source, replace=True)
+
+    @classmethod
+    def measure(cls, cur, table: str, source: str = '') -> int:
+        """
+        Recount a table exactly and store the result (full scan; for bulk loaders and repairs)
+
+        Returns:
+            int: Row count
+        """
+        column = cls._amount_column(table)
+        cur.execute(f"SELECT COUNT(*), COALESCE(SUM({column}), 0) FROM {table}")
+        rows, amount = cur.fetchone()
+        cls._write(cur, table, rows, amount, source, replace=True)
+        return rows
+
+    @classmethod
+    @contextmanager
+    def appending(cls, table: str, source: str = ''):
+        """
+        Record rows appended to a table by ORM writes inside the block
+
+        Only rows with an id above the table's highest id at entry are read
+        back, an index range read on the primary key.
+        """
+        column = cls._amount_column(table)
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            start_id = cur.fetchone()[0]
+        try:
+            yield
+        finally:
+            # Also on failure: rows written before the error stay committed
+            with connection.cursor() as cur:
+                cur.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM({column}), 0) FROM {table} WHERE id > %s", [start_id]
+                )
+                rows, amount = cur.fetchone()
+                cls._write(cur, table, rows, amount, source, replace=False)
+            logger.info(f"Load ledger: {table} +{rows} rows")
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """
+        Row counts and amount totals for every tracked table
+
+        Returns:
+            dict: table -> {rows, amount, updated_at, estimated}; tables without
+            a ledger row report the planner estimate and no amount
+        """
+        tables = list(cls.TABLES)
+        with connection.cursor() as cur:
+            cur.execute(
+                f"SELECT table_name, row_count, amount_sum, updated_at FROM {cls.TABLE} "
+                f"WHERE table_name = ANY(%s)",
+                [tables]
+            )
+            result = {
+                table: {'rows': rows, 'amount': amount, 'updated_at': updated_at, 'estimated': False}
+                for table, rows, amount, updated_at in cur.fetchall()
+            }
+            missing = [table for table in tables if table not in result]
+            if missing:
+                # A partitioned table holds no rows itself: add up its leaf partitions.
+                # reltuples is -1 until the first VACUUM/ANALYZE; use the stats collector then.
+                cur.execute(
+                    """
+                    SELECT t.name,
+                           SUM(CASE WHEN c.reltuples >= 0 THEN c.reltuples ELSE COALESCE(s.n_live_tup, 0) END)
+                    FROM unnest(%s::text[]) AS t(name)
+                    LEFT JOIN pg_class r ON r.oid = to_regclass(t.name)
+                    LEFT JOIN LATERAL (
+                      SELECT p.relid FROM pg_partition_tree(r.oid) p WHERE r.relkind = 'p' AND p.isleaf
+                      UNION ALL
+                      SELECT r.oid WHERE r.relkind <> 'p'
+                    ) leaf ON TRUE
+                    LEFT JOIN pg_class c ON c.oid = leaf.relid
+                    LEFT JOIN pg_stat_all_tables s ON s.relid = c.oid
+                    GROUP BY t.name
+                    """,
+                    [missing]
+                )
+                for table, estimate in cur.fetchall():
+                    result[table] = {'rows': int(estimate or 0), 'amount': None, 'updated_at': None, 'estimated': True}
+        return result
@@ -0,0 +1,274 @@
+"""
+Finance Pipeline Service
+
+Runs the refresh chain finances_ingest -> finances_normalize ->
+build_staging_distribution -> build_dw_revenue (plus the optional Bandcamp
+API ingest, which feeds the DW build alongside the distribution chain) as a
+DAG of stages.
+
+Before a stage runs, its inputs are fingerprinted: content hashes of the
+label's source files, the registered SourceFiles, the staging change log and
+the raw/staging watermarks and ledger totals. A stage whose fingerprint
+matches the one recorded by its last completed run is skipped. Stages whose
+dependencies are done run concurrently, each on its own thread and database
+connection. Status, fingerprint and timings of every stage are recorded in
+ImportBatch.stages.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from finances.models import ImportBatch, SourceFile
+from finances.services.load_ledger import LoadLedgerService
+from finances.services.staging_sync import StagingSyncService
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+class PipelineError(Exception):
+    """Raised when a pipeline stage fails"""
+    pass
+
+
+class PipelineOrchestrator:
+    """Runs the finance refresh stages whose inputs changed since their last run"""
+
+    # Stage -> management command, stages it runs after, and whether its
+    # inputs belong to one label (fingerprints are then compared per label)
+    STAGES = {
+        'ingest': {'command': 'finances_ingest', 'after': (), 'per_label': True},
+        'normalize': {'command': 'finances_normalize', 'after': ('ingest',), 'per_label': True},
+        'staging': {'command': 'build_staging_distribution', 'after': ('normalize',), 'per_label': False},
+        'bandcamp_api': {'command': 'ingest_bandcamp_api', 'after': (), 'per_label': False},
+        'dw': {'command': 'build_dw_revenue', 'after': ('staging', 'bandcamp_api'), 'per_label': False},
+    }
+
+    # Re-read window before the latest raw Bandcamp sale on each API ingest
+    BANDCAMP_API_OVERLAP = timedelta(days=7)
+
+    # Tables build_dw_revenue loads from
+    DW_INPUTS = ('raw.bandcamp_event_raw', StagingSyncService.TABLE)
+
+    def __init__(self, label, source_path: Path = None, force: bool = False,
+                 bandcamp_api: bool = False, workers: int = 2):
+        """
+        Args:
+            label: Label whose sources are ingested and normalized
+            source_path: Label source directory (default: finance/sources/<label slug>)
+            force: Run every stage regardless of its fingerprint
+            bandcamp_api: Include the Bandcamp API ingest (always runs, from the latest raw sale: its input is remote)
+            workers: Maximum number of stages running at once
+        """
+        self.label = label
+        self.source_path = Path(source_path) if source_path else self.default_source_path(label)
+        self.force = force
+        self.workers = max(1, workers)
+        self.enabled = [name for name in self.STAGES if bandcamp_api or name != 'bandcamp_api']
+
+    @staticmethod
+    def default_source_path(label) -> Path:
+        # Same slug finances_ingest derives from the label name
+        slug = label.name.lower().replace(' ', '-').replace('records', '').strip('-')
+        return REPO_ROOT / 'finance' / 'sources' / slug
+
+    @staticmethod
+    def _digest(value) -> str:
+        return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _file_sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _fingerprint_ingest(self):
+        """Content hashes of the label's statements, without what ingest writes itself"""
+        files = []
+        if self.source_path.exists():
+            for path in sorted(self.source_path.rglob('*')):
+                relative = path.relative_to(self.source_path)
+                if not path.is_file() or 'canonical' in relative.parts or path.name.startswith('.'):
+                    continue
+                # Ingest converts xlsx statements to <stem>__converted.csv; without the
+                # xlsx the converted file is the statement itself
+                if (path.name.endswith('__converted.csv')
+                        and path.with_name(path.name[:-len('__converted.csv')] + '.xlsx').exists()):
+                    continue
+                files.append((str(relative), self._file_sha256(path)))
+        return {'path': str(self.source_path), 'files': files}
+
+    def _fingerprint_normalize(self):
+        """The label's registered source files"""
+        return list(SourceFile.objects.filter(label=self.label).order_by('id').values_list('id', 'path', 'sha256'))
+
+    def _fingerprint_staging(self):
+        """Last logged RevenueEvent change, and whether staging needs a full copy"""
+        with connection.cursor() as cur:
+            cur.execute(
+                "SELECT pg_sequence_last_value(pg_get_serial_sequence(%s, 'id'))",
+                [StagingSyncService.CHANGES]
+            )
+            last_change = cur.fetchone()[0]
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", [StagingSyncService.TABLE])
+            needs_full = not cur.fetchone()[0] or StagingSyncService.needs_full(cur)
+        return {'last_change': last_change, 'needs_full': needs_full}
+
+    def _fingerprint_dw(self):
+        """Watermarks (MAX(id)) and ledger totals of the tables the DW is built from"""
+        ledger = LoadLedgerService.snapshot()
+        inputs = {}
+        with connection.cursor() as cur:
+            for table in self.DW_INPUTS:
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+                if not cur.fetchone()[0]:
+                    inputs[table] = None
+                    continue
+                cur.execute(f"SELECT MAX(id) FROM {table}")
+                inputs[table] = {'max_id': cur.fetchone()[0], 'rows': ledger[table]['rows'],
+                                 'amount': ledger[table]['amount']}
+        return inputs
+
+    def fingerprint(self, name: str):
+        """
+        Fingerprint of a stage's current inputs
+
+        Returns:
+            str: Hex digest, or None for stages whose inputs cannot be fingerprinted
+        """
+        method = getattr(self, f'_fingerprint_{name}', None)
+        return self._digest(method()) if method else None
+
+    def previous_fingerprint(self, name: str):
+        """Fingerprint recorded by the stage's last completed run"""
+        batches = ImportBatch.objects.filter(**{f'stages__{name}__status': 'completed'})
+        if self.STAGES[name]['per_label']:
+            batches = batches.filter(label=self.label)
+        batch = batches.order_by('-id').first()
+        return batch.stages[name].get('fingerprint') if batch else None
+
+    def _command_options(self, name: str, batch) -> dict:
+        if name == 'ingest':
+            return {'label': self.label.name, 'path': str(self.source_path)}
+        if name == 'normalize':
+            return {'label': self.label.name, 'batch_id': batch.id}
+        if name == 'bandcamp_api':
+            start = self.bandcamp_api_start()
+            return {'start': start.isoformat()} if start else {}
+        return {}
+
+    def bandcamp_api_start(self):
+        """
+        First day the Bandcamp API ingest fetches: the latest raw sale minus BANDCAMP_API_OVERLAP
+
+        The ingest skips sales it already holds, so the overlap only re-reads
+        them (and picks up sales Bandcamp reports late).
+
+        Returns:
+            date: Start date, or None (no raw sales yet: the command's full history default)
+        """
+        with connection.cursor() as cur:
+            cur.execute("SELECT to_regclass('raw.bandcamp_event_raw') IS NOT NULL")
+            if not cur.fetchone()[0]:
+                return None
+            cur.execute("SELECT MAX(occurred_at) FROM raw.bandcamp_event_raw")
+            latest = cur.fetchone()[0]
+        return (latest - self.BANDCAMP_API_OVERLAP).date() if latest else None
+
+    def _run_stage(self, name: str, batch) -> dict:
+        """Fingerprint one stage and run it unless unchanged (on this thread's own connection)"""
+        started_at = timezone.now()
+        started = time.monotonic()
+        result = {'started_at': started_at.isoformat()}
+        output = io.StringIO()
+        try:
+            fingerprint = self.fingerprint(name)
+            result['fingerprint'] = fingerprint
+            result['fingerprint_seconds'] = round(time.monotonic() - started, 3)
+            if not self.force and fingerprint is not None and fingerprint == self.previous_fingerprint(name):
+                result['status'] = 'skipped'
+            else:
+                call_command(self.STAGES[name]['command'], stdout=output, stderr=output,
+                             **self._command_options(name, batch))
+                result['status'] = 'completed'
+        except Exception as e:
+            logger.exception(f"Pipeline stage {name} failed")
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        finally:
+            # Worker threads open their own connection; do not leave it behind
+            connection.close()
+        result['seconds'] = round(time.monotonic() - started, 3)
+        result['finished_at'] = timezone.now().isoformat()
+        result['output'] = output.getvalue()
+        return result
+
+    def run(self, log=None):
+        """
+        Run the enabled stages in dependency order, concurrently where possible
+
+        A stage whose dependency failed is recorded as blocked and not run.
+
+        Args:
+            log: Optional callable receiving (stage, result) as each stage ends
+
+        Returns:
+            ImportBatch: The batch with every stage's result in stages
+
+        Raises:
+            PipelineError: If a stage failed (after the batch is recorded)
+        """
+        batch = ImportBatch.objects.create(label=self.label, status='running')
+        pending = list(self.enabled)
+        running = {}
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='finances-pipeline') as pool:
+            while pending or running:
+                for name in list(pending):
+                    after = [dep for dep in self.STAGES[name]['after'] if dep in self.enabled]
+                    states = [batch.stages.get(dep, {}).get('status') for dep in after]
+                    if any(state in ('failed', 'blocked') for state in states):
+                        pending.remove(name)
+                        batch.stages[name] = {'status': 'blocked'}
+                        batch.save(update_fields=['stages'])
+                        if log:
+                            log(name, batch.stages[name])
+                    elif all(states) and len(running) < self.workers:
+                        pending.remove(name)
+                        running[pool.submit(self._run_stage, name, batch)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result = future.result()
+                    output = result.pop('output')
+                    batch.stages[name] = result
+                    batch.save(update_fields=['stages'])
+                    logger.info(f"Pipeline stage {name}: {result['status']} in {result['seconds']:.2f}s")
+                    if log:
+                        log(name, dict(result, output=output))
+
+        failed = [name for name, result in batch.stages.items() if result['status'] == 'failed']
+        batch.status = 'failed' if failed else 'completed'
+        batch.finished_at = timezone.now()
+        batch.save(update_fields=['status', 'finished_at'])
+        logger.info(f"Pipeline batch #{batch.id} {batch.status} in {time.monotonic() - started:.2f}s")
+        if failed:
+            raise PipelineError(f"Stages failed: {', '.join(failed)} (import batch #{batch.id})")
+        return batch
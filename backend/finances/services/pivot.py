@@ -0,0 +1,157 @@
+"""
+Pivot Query
+
+One aggregation for every dashboard breakdown: the caller picks dimensions
+(month, quarter, year, source, platform, store, artist, catalog, isrc) and
+measures (revenue per currency, quantity, transactions) and gets the detail
+cells plus their subtotals from a single GROUP BY ROLLUP / CUBE statement, so
+every total is computed from the same rows.
+
+Dimensions available in dw.agg_month_store are answered from the rollup;
+isrc needs the fact table.
+"""
+
+import logging
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class PivotError(ValueError):
+    """Raised for unsupported pivot requests"""
+    pass
+
+
+class PivotQuery:
+    """Grouped measures with ROLLUP/CUBE subtotals over the DW facts or rollup"""
+
+    # dimension -> SQL over the base rows; {date} is the month (rollup) or day (facts) column
+    DIMENSIONS = {
+        'month': "date_trunc('month', {date})::date",
+        'quarter': "date_trunc('quarter', {date})::date",
+        'year': "EXTRACT(YEAR FROM {date})::int",
+        'source': "source",
+        'platform': "platform",
+        # Bandcamp is one store; distribution rows use the canonical store name
+        'store': "CASE WHEN platform = 'Bandcamp' THEN platform "
+                 "ELSE COALESCE(NULLIF(store_canonical, ''), store, '') END",
+        'artist': "COALESCE(artist_name, '')",
+        'catalog': "COALESCE(catalog_number, '')",
+        'isrc': "COALESCE(isrc, '')",
+    }
+
+    # Dimensions the monthly rollup does not carry
+    FACT_ONLY = ('isrc',)
+
+    # measure -> (aggregate over facts, aggregate over the rollup)
+    MEASURES = {
+        'revenue_brl': ('SUM(revenue_brl)', 'SUM(revenue_brl)'),
+        'revenue_usd': ('SUM(revenue_usd)', 'SUM(revenue_usd)'),
+        'revenue_eur': ('SUM(revenue_eur)', 'SUM(revenue_eur)'),
+        'revenue_base': ('SUM(revenue_base)', 'SUM(revenue_base)'),
+        'quantity': ('SUM(quantity)::bigint', 'SUM(quantity)::bigint'),
+        'transactions': ('COUNT(*)', 'SUM(transactions)::bigint'),
+    }
+
+    # totals -> GROUP BY form; rollup = hierarchical subtotals in dimension order
+    TOTALS = {
+        'rollup': 'ROLLUP ({})',
+        'cube': 'CUBE ({})',
+        'none': '{}',
+    }
+
+    MAX_DIMENSIONS = 4
+    MAX_ROWS = 20000
+
+    def __init__(self, dimensions, measures, totals: str = 'rollup'):
+        if not dimensions:
+            raise PivotError('At least one dimension is required')
+        if len(dimensions) > self.MAX_DIMENSIONS:
+            raise PivotError(f'At most {self.MAX_DIMENSIONS} dimensions are supported')
+        if len(set(dimensions)) != len(dimensions):
+            raise PivotError('Dimensions must not repeat')
+        unknown = [name for name in dimensions if name not in self.DIMENSIONS]
+        if unknown:
+            raise PivotError(
+                f"Unknown dimension(s) {', '.join(unknown)} (expected any of {', '.join(self.DIMENSIONS)})"
+            )
+        if not measures:
+            raise PivotError('At least one measure is required')
+        unknown = [name for name in measures if name not in self.MEASURES]
+        if unknown:
+            raise PivotError(
+                f"Unknown measure(s) {', '.join(unknown)} (expected any of {', '.join(self.MEASURES)})"
+            )
+        if totals not in self.TOTALS:
+            raise PivotError(f"Unknown totals '{totals}' (expected one of {', '.join(self.TOTALS)})")
+        self.dimensions = list(dimensions)
+        self.measures = list(dict.fromkeys(measures))
+        self.totals = totals
+
+    @property
+    def needs_facts(self) -> bool:
+        """Whether a dimension is missing from the monthly rollup"""
+        return any(name in self.FACT_ONLY for name in self.dimensions)
+
+    def build(self, queryset, rollup: bool):
+        """
+        Run the pivot statement
+
+        Args:
+            queryset: Filtered DwAggMonthStore (rollup=True) or DwFactRevenue.objects.with_attributes() queryset
+            rollup: Whether the queryset is the monthly rollup
+
+        Returns:
+            list: Row dicts with one key per dimension and measure, plus
+            'subtotal', the dimensions summed away in that row ([] for detail cells)
+
+        Raises:
+            PivotError: If the result exceeds MAX_ROWS
+        """
+        date_column = 'month' if rollup else 'occurred_at'
+        columns = [date_column, 'source', 'platform', 'store', 'store_canonical', 'artist_name',
+                   'catalog_number', 'quantity', 'revenue_brl', 'revenue_usd', 'revenue_eur', 'revenue_base']
+        columns.append('transactions' if rollup else 'isrc')
+        base_sql, base_params = queryset.values(*columns).query.sql_with_params()
+
+        keys = [self.DIMENSIONS[name].format(date=date_column) for name in self.dimensions]
+        aggregates = [self.MEASURES[name][1 if rollup else 0] for name in self.measures]
+        group_by = self.TOTALS[self.totals].format(', '.join(keys))
+        # Within each group the detail rows come first, then the subtotal
+        order_by = ', '.join(f'GROUPING({key}), {key}' for key in keys)
+
+        with connection.cursor() as cur:
+            cur.execute(
+                f"""
+                WITH base AS ({base_sql})
+                SELECT {', '.join(keys)}, {', '.join(aggregates)},
+                       GROUPING({', '.join(keys)}) AS subtotal_mask
+                FROM base
+                GROUP BY {group_by}
+                ORDER BY {order_by}
+                LIMIT %s
+                """,
+                [*base_params, self.MAX_ROWS + 1]
+            )
+            rows = cur.fetchall()
+
+        if len(rows) > self.MAX_ROWS:
+            raise PivotError(
+                f'The pivot has more than {self.MAX_ROWS} rows; use fewer dimensions or narrower filters'
+            )
+
+        names = self.dimensions + self.measures
+        width = len(self.dimensions)
+        result = []
+        for row in rows:
+            # GROUPING() sets one bit per summed-away dimension, the first dimension highest
+            mask = row[-1]
+            entry = dict(zip(names, row[:-1]))
+            entry['subtotal'] = [
+                name for i, name in enumerate(self.dimensions) if mask & (1 << (width - 1 - i))
+            ]
+            result.append(entry)
+
+        logger.debug(f"Pivot {self.dimensions} ({self.totals}): {len(result)} rows")
+        return result
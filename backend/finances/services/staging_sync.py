@@ -0,0 +1,193 @@
+"""
+Staging Sync Service
+
+Keeps staging.distribution_event in step with the Distribution rows of
+finances_revenueevent. Every staging row carries the id of the event it was
+copied from (revenue_event_id). Triggers on finances_revenueevent log the ids
+of inserted, updated and deleted Distribution events in
+staging.distribution_change, so a sync deletes and re-copies only those
+events instead of rebuilding the table. The SourceFiles of the re-copied rows
+are recorded in staging.source_file_change for build_dw_revenue, which
+replaces the facts of those files.
+
+A full copy is made on request, on an empty staging table, and on rows that
+predate the event mapping.
+"""
+
+import logging
+
+from finances.services.load_ledger import LoadLedgerService
+
+logger = logging.getLogger(__name__)
+
+
+class StagingSyncService:
+    """Copies changed Distribution events into staging.distribution_event"""
+
+    TABLE = 'staging.distribution_event'
+    CHANGES = 'staging.distribution_change'
+    # SourceFiles whose rows changed, claimed by build_dw_revenue
+    SOURCE_FILE_CHANGES = 'staging.source_file_change'
+    # Temp table holding the event ids claimed by one sync (dropped at commit)
+    CLAIMED = 'pg_temp.distribution_claimed'
+
+    DDL = """
+        CREATE SCHEMA IF NOT EXISTS staging;
+        CREATE TABLE IF NOT EXISTS staging.distribution_event (
+          id BIGSERIAL PRIMARY KEY,
+          occurred_at timestamp NULL,
+          platform text NOT NULL,
+          store text NULL,
+          track_artist_name text NULL,
+          track_title text NULL,
+          isrc text NULL,
+          upc_ean text NULL,
+          catalog_number text NULL,
+          quantity integer DEFAULT 0,
+          gross_amount_eur numeric(18,6) DEFAULT 0,
+          net_amount_eur numeric(18,6) DEFAULT 0,
+          source_file_id bigint NULL,
+          revenue_event_id bigint NULL
+        );
+        -- Tables created before the SourceFile and event columns existed
+        ALTER TABLE staging.distribution_event ADD COLUMN IF NOT EXISTS source_file_id bigint NULL;
+        ALTER TABLE staging.distribution_event ADD COLUMN IF NOT EXISTS revenue_event_id bigint NULL;
+        CREATE INDEX IF NOT EXISTS distribution_event_source_file_idx
+          ON staging.distribution_event (source_file_id);
+        CREATE UNIQUE INDEX IF NOT EXISTS distribution_event_revenue_event_idx
+          ON staging.distribution_event (revenue_event_id);
+    """
+
+    # Normalized events copied into staging (taken from finances_revenueevent to guarantee correct dates)
+    COPY_EVENTS = """
+        INSERT INTO staging.distribution_event (
+          occurred_at, platform, store, track_artist_name, track_title, isrc, upc_ean, catalog_number,
+          quantity, gross_amount_eur, net_amount_eur, source_file_id, revenue_event_id
+        )
+        SELECT
+          rev.occurred_at,
+          'Distribution',
+          s.name,
+          rev.track_artist_name,
+          rev.track_title,
+          rev.isrc,
+          rev.upc_ean,
+          rev.catalog_number,
+          rev.quantity,
+          rev.gross_amount,
+          rev.net_amount_base,
+          rev.source_file_id,
+          rev.id
+        FROM finances_revenueevent rev
+        {claimed}
+        JOIN finances_platform p ON rev.platform_id = p.id
+        LEFT JOIN finances_store s ON rev.store_id = s.id
+        WHERE p.name = 'Distribution'
+    """
+
+    @classmethod
+    def ensure_table(cls, cur):
+        """Create staging.distribution_event, or add the columns it is missing"""
+        cur.execute(cls.DDL)
+
+    @classmethod
+    def needs_full(cls, cur) -> bool:
+        """Whether staging is empty or holds rows without their event id"""
+        cur.execute(
+            f"SELECT NOT EXISTS (SELECT 1 FROM {cls.TABLE}) "
+            f"OR EXISTS (SELECT 1 FROM {cls.TABLE} WHERE revenue_event_id IS NULL)"
+        )
+        return cur.fetchone()[0]
+
+    @classmethod
+    def sync(cls, cur, full: bool = False, source: str = 'build_staging_distribution') -> dict:
+        """
+        Bring staging up to date with the Distribution events
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            full: Re-copy every event; also done when needs_full()
+            source: Command recorded as the writer in the load ledger
+
+        Returns:
+            dict: {'mode': 'full' or 'incremental', 'changed': event ids claimed,
+            'deleted': staging rows removed, 'inserted': rows copied, 'source_files':
+            SourceFile ids of the removed and copied rows}; changed, deleted and
+            source_files are None for a full copy
+        """
+        cls.ensure_table(cur)
+        full = full or cls.needs_full(cur)
+
+        if full:
+            # Changes logged so far are covered by the copy. Claim them first: events
+            # committed after the claim are logged again and re-copied next time.
+            cur.execute(f"DELETE FROM {cls.CHANGES}")
+            cur.execute(f"TRUNCATE TABLE {cls.TABLE}")
+            inserted = LoadLedgerService.insert(
+                cur, cls.TABLE, cls.COPY_EVENTS.format(claimed=''), source=source, replace=True
+            )
+            logger.info(f"Copied {inserted} events into {cls.TABLE}")
+            return {'mode': 'full', 'changed': None, 'deleted': None, 'inserted': inserted, 'source_files': None}
+
+        cur.execute(f"CREATE TEMP TABLE {cls.CLAIMED.split('.')[1]} (event_id bigint PRIMARY KEY) ON COMMIT DROP")
+        cur.execute(
+            f"""
+            WITH claimed AS (DELETE FROM {cls.CHANGES} RETURNING event_id)
+            INSERT INTO {cls.CLAIMED} SELECT event_id FROM claimed
+            """
+        )
+        changed = cur.rowcount
+        if not changed:
+            return {'mode': 'incremental', 'changed': 0, 'deleted': 0, 'inserted': 0, 'source_files': []}
+
+        # Updated events are deleted and copied again; deleted ones (or ones moved
+        # off Distribution) are not found by the copy
+        source_files = cls._claimed_source_files(cur)
+        deleted = LoadLedgerService.delete(
+            cur, cls.TABLE,
+            f"DELETE FROM {cls.TABLE} se USING {cls.CLAIMED} c WHERE se.revenue_event_id = c.event_id",
+            source=source
+        )
+        inserted = LoadLedgerService.insert(
+            cur, cls.TABLE,
+            cls.COPY_EVENTS.format(claimed=f'JOIN {cls.CLAIMED} c ON c.event_id = rev.id'),
+            source=source
+        )
+        # Files of the rows before and after the change (an event may move to another file)
+        source_files = sorted(source_files | cls._claimed_source_files(cur))
+        cur.execute(
+            f"INSERT INTO {cls.SOURCE_FILE_CHANGES} (source_file_id) SELECT unnest(%s::bigint[]) "
+            f"ON CONFLICT (source_file_id) DO NOTHING",
+            [source_files]
+        )
+        logger.info(f"Synced {changed} changed events into {cls.TABLE}: -{deleted} +{inserted} rows "
+                    f"in {len(source_files)} source files")
+        return {'mode': 'incremental', 'changed': changed, 'deleted': deleted, 'inserted': inserted,
+                'source_files': source_files}
+
+    @classmethod
+    def _claimed_source_files(cls, cur) -> set:
+        """SourceFile ids of the staging rows of the claimed events"""
+        cur.execute(
+            f"""
+            SELECT DISTINCT se.source_file_id
+            FROM {cls.TABLE} se JOIN {cls.CLAIMED} c ON c.event_id = se.revenue_event_id
+            WHERE se.source_file_id IS NOT NULL
+            """
+        )
+        return {source_file_id for source_file_id, in cur.fetchall()}
+
+    @classmethod
+    def claim_source_files(cls, cur) -> list:
+        """
+        Claim the SourceFiles recorded by incremental syncs since the last claim
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction; a
+                rollback returns the claimed ids)
+
+        Returns:
+            list: Sorted SourceFile ids
+        """
+        cur.execute(f"DELETE FROM {cls.SOURCE_FILE_CHANGES} RETURNING source_file_id")
+        return sorted(source_file_id for source_file_id, in cur.fetchall())
@@ -0,0 +1,120 @@
+"""
+Store Dimension Service
+
+Canonicalizes distributor store names (e.g. "YouTube Content ID" -> "YouTube")
+and keeps dw.dim_store seeded so the DW build can join canonical names in SQL.
+"""
+
+import logging
+
+from finances.services.dw_facets import FacetIndexService
+from finances.services.dw_rollup import MonthlyRollupService
+
+logger = logging.getLogger(__name__)
+
+
+class StoreDimensionService:
+    """Seeds dw.dim_store from the canonical store rules"""
+
+    # Ordered (substrings, canonical name) rules; the first match wins
+    RULES = [
+        (('youtube',), 'YouTube'),
+        (('apple music', 'applemusic', 'itunes'), 'Apple Music'),
+        (('amazon',), 'Amazon Music'),
+        (('google play',), 'Google Play'),
+        (('tiktok',), 'TikTok'),
+        (('deezer',), 'Deezer'),
+        (('tidal',), 'TIDAL'),
+        (('spotify',), 'Spotify'),
+        (('beatport',), 'Beatport'),
+        (('qobuz',), 'Qobuz'),
+        (('yandex',), 'Yandex'),
+        (('netease',), 'Netease'),
+        (('traxsource',), 'Traxsource'),
+        (('juno',), 'Juno'),
+    ]
+
+    @classmethod
+    def canonicalize(cls, store_name: str) -> str:
+        """
+        Consolidate common brand variants of a store name
+
+        Args:
+            store_name: Raw store name as reported by the distributor
+
+        Returns:
+            str: Canonical store name, or the stripped input when no rule matches
+        """
+        if not store_name:
+            return ''
+        name = store_name.strip()
+        lower = name.lower()
+        for needles, canonical in cls.RULES:
+            if any(needle in lower for needle in needles):
+                return canonical
+        return name
+
+    @classmethod
+    def sync(cls, cur) -> int:
+        """
+        Insert dw.dim_store rows for store names not mapped yet
+
+        Names come from staging.distribution_event and finances_store. Existing
+        mappings are left untouched so manual edits in the admin are kept.
+
+        Args:
+            cur: Open database cursor
+
+        Returns:
+            int: Number of new store mappings
+        """
+        cur.execute(
+            """
+            SELECT DISTINCT names.store_name
+            FROM (
+              SELECT store AS store_name FROM staging.distribution_event
+              UNION
+              SELECT name FROM finances_store
+            ) names
+            LEFT JOIN dw.dim_store ds ON ds.store_name = names.store_name
+            WHERE names.store_name IS NOT NULL
+              AND names.store_name <> ''
+              AND ds.id IS NULL
+            """
+        )
+        new_rows = [(name, cls.canonicalize(name)) for (name,) in cur.fetchall()]
+        if new_rows:
+            cur.executemany(
+                "INSERT INTO dw.dim_store (store_name, store_canonical) VALUES (%s, %s) "
+                "ON CONFLICT (store_name) DO NOTHING",
+                new_rows
+            )
+            logger.info(f"Seeded {len(new_rows)} new dw.dim_store mappings")
+        return len(new_rows)
+
+    @classmethod
+    def refresh_store(cls, cur, store_name: str) -> int:
+        """
+        Refresh the rollup months and facets that carry a store's canonical name
+
+        Facts reference dw.dim_store by key and see an edited mapping at once;
+        dw.agg_month_store and dw.facet_value copy the name and are rebuilt here.
+
+        Args:
+            cur: Open database cursor (runs inside the caller's transaction)
+            store_name: Raw store name whose mapping changed
+
+        Returns:
+            int: Number of rollup rows written
+        """
+        cur.execute(
+            f"SELECT DISTINCT month FROM {MonthlyRollupService.TABLE} WHERE store = %s",
+            [store_name]
+        )
+        months = [month for month, in cur.fetchall()]
+        if not months:
+            return 0
+        rows = MonthlyRollupService.refresh(cur, months)
+        FacetIndexService.refresh(cur)
+        logger.info(f"Refreshed {len(months)} rollup months for store {store_name}")
+        return rows
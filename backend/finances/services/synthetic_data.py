@@ -0,0 +1,394 @@
+"""
+Synthetic Revenue Data
+
+Seeded generator for benchmarking the finance API at scale. Rows are produced
+set-based in Postgres (generate_series + setseed/random), so tens of millions
+of events load without Python in the loop:
+
+- Zebralution and Labelworx monthly statement lines, with store mixes that
+  follow each distributor (streaming-heavy vs. Beatport-heavy)
+- Bandcamp daily sales (tracks, albums, bundles) with pay-what-you-want prices
+
+Events land in finances_revenueevent under a dedicated synthetic label and
+are mirrored into the raw.* tables, tagged with their synthetic:// source file
+in raw_row so a replace removes them and nothing else; the staging and DW
+layers are then built by the regular build commands. Run it against a
+dedicated database.
+"""
+
+import logging
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.utils import timezone
+
+from finances.services.load_ledger import LoadLedgerService
+
+logger = logging.getLogger(__name__)
+
+
+class SyntheticDataError(Exception):
+    """Raised when synthetic data cannot be loaded safely"""
+    pass
+
+
+class SyntheticRevenueGenerator:
+    """Bulk-loads deterministic synthetic revenue at a configurable scale"""
+
+    LABEL_NAME = 'Synthetic Benchmark Label'
+    OWNER_USERNAME = 'synthetic-benchmark'
+
+    # Share of generated rows per source
+    SOURCE_SHARE = {
+        'zebralution': 0.55,
+        'labelworx': 0.30,
+        'bandcamp': 0.15,
+    }
+
+    # (store, weight, unit price EUR, is download store)
+    ZEBRALUTION_STORES = [
+        ('Spotify', 38, 0.0032, False),
+        ('Apple Music', 14, 0.0065, False),
+        ('YouTube Content ID', 9, 0.0008, False),
+        ('YouTube Music', 5, 0.0020, False),
+        ('Amazon Unlimited', 8, 0.0040, False),
+        ('TikTok', 6, 0.0005, False),
+        ('Deezer', 4, 0.0035, False),
+        ('Facebook', 4, 0.0004, False),
+        ('iTunes', 3, 0.9000, True),
+        ('TIDAL', 2, 0.0090, False),
+        ('Yandex', 2, 0.0010, False),
+        ('Netease', 2, 0.0010, False),
+        ('Anghami', 1, 0.0015, False),
+        ('Napster', 1, 0.0080, False),
+        ('Qobuz', 1, 0.0100, False),
+    ]
+    LABELWORX_STORES = [
+        ('Beatport', 42, 1.10, True),
+        ('Traxsource', 14, 1.00, True),
+        ('Spotify', 14, 0.0032, False),
+        ('Apple Music', 8, 0.0065, False),
+        ('Juno Download', 6, 0.95, True),
+        ('YouTube Content ID', 6, 0.0008, False),
+        ('iTunes', 4, 0.90, True),
+        ('Amazon Unlimited', 4, 0.0040, False),
+        ('Deezer', 2, 0.0035, False),
+    ]
+    # (item type, weight, list price USD)
+    BANDCAMP_ITEMS = [
+        ('track', 70, 1.25),
+        ('album', 25, 8.00),
+        ('bundle', 5, 20.00),
+    ]
+
+    DATA_SOURCES = {
+        'zebralution': 'zebralution',
+        'labelworx': 'labelworx',
+        'bandcamp': 'bandcamp_api',
+    }
+
+    BATCH_SIZE = 500_000
+
+    def __init__(self, rows: int, seed: int = 42, start: date = date(2018, 1, 1), months: int = 84,
+                 batch_size: int = None):
+        if rows <= 0:
+            raise SyntheticDataError('rows must be positive')
+        self.rows = rows
+        self.seed = seed
+        self.start = start
+        self.months = months
+        self.batch_size = batch_size or self.BATCH_SIZE
+        # Catalog grows with the data set: ~1 track per 2k rows, 8 tracks per release
+        self.n_tracks = min(max(rows // 2000, 200), 50_000)
+        self.n_artists = max(self.n_tracks // 6, 20)
+
+    @classmethod
+    def existing_rows(cls) -> dict:
+        """Row counts of the tables the generator writes to"""
+        counts = {}
+        with connection.cursor() as cur:
+            for table in ('finances_revenueevent', 'raw.bandcamp_event_raw', 'raw.zebralution_event_raw',
+                          'raw.labelworx_event_raw', 'staging.distribution_event', 'dw.fact_revenue'):
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+                if cur.fetchone()[0]:
+                    cur.execute(f"SELECT COUNT(*) FROM {table}")
+                    counts[table] = cur.fetchone()[0]
+        return counts
+
+    def generate(self, replace: bool = False, log=None) -> dict:
+        """
+        Load synthetic events and raw rows
+
+        Args:
+            replace: Delete previous synthetic events and raw rows first (other rows
+                are kept); without it the generator refuses to run on non-empty raw tables
+            log: Optional callable receiving progress lines
+
+        Returns:
+            dict: Rows written per table and elapsed seconds per step
+        """
+        log = log or logger.info
+        refs = self._ensure_references()
+        raw_tables = self._raw_tables()
+
+        with connection.cursor() as cur:
+            if replace:
+                # Only rows of earlier synthetic loads: real raw rows are never removed
+                for source, table in raw_tables.items():
+                    cur.execute(f"DELETE FROM {table} WHERE raw_row->>'source_file' = %s",
+                                [self.source_file_path(source)])
+                cur.execute("DELETE FROM finances_revenueevent WHERE label_id = %s", [refs['label']])
+            else:
+                for table in raw_tables.values():
+                    cur.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+                    if cur.fetchone()[0]:
+                        raise SyntheticDataError(f'{table} is not empty (use replace to load alongside its rows)')
+
+        stats = {'rows': {}, 'seconds': {}}
+        self._create_dimensions(refs)
+
+        for source, share in self.SOURCE_SHARE.items():
+            started = time.monotonic()
+            total = max(int(self.rows * share), 1)
+            written = 0
+            for batch_no, lo in enumerate(range(0, total, self.batch_size)):
+                hi = min(lo + self.batch_size, total)
+                written += self._insert_events(source, refs, lo, hi, batch_no)
+                log(f'  {source}: {written}/{total} events')
+            stats['rows'][f'events.{source}'] = written
+            stats['seconds'][f'events.{source}'] = round(time.monotonic() - started, 2)
+
+        for source, table in raw_tables.items():
+            started = time.monotonic()
+            stats['rows'][table] = self._insert_raw(source, table, refs)
+            stats['seconds'][table] = round(time.monotonic() - started, 2)
+            log(f'  {table}: {stats["rows"][table]} rows')
+
+        with connection.cursor() as cur:
+            cur.execute("ANALYZE finances_revenueevent")
+            for table in raw_tables.values():
+                cur.execute(f"ANALYZE {table}")
+                LoadLedgerService.measure(cur, table, source='generate_synthetic_revenue')
+        return stats
+
+    @staticmethod
+    def source_file_path(source: str) -> str:
+        """Path of the SourceFile synthetic rows of a source belong to (also tags their raw rows)"""
+        return f'synthetic://{source}'
+
+    def _raw_tables(self) -> dict:
+        tables = {}
+        with connection.cursor() as cur:
+            for source, table in (('zebralution', 'raw.zebralution_event_raw'),
+                                  ('labelworx', 'raw.labelworx_event_raw'),
+                                  ('bandcamp', 'raw.bandcamp_event_raw')):
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+                if cur.fetchone()[0]:
+                    tables[source] = table
+                else:
+                    logger.warning(f"{table} does not exist; skipping raw {source} rows")
+        return tables
+
+    def _ensure_references(self) -> dict:
+        from django.contrib.auth.models import User
+        from api.models import Label
+        from finances.models import DataSource, Platform, SourceFile, Store
+
+        owner, _ = User.objects.get_or_create(username=self.OWNER_USERNAME, defaults={'is_active': False})
+        label, _ = Label.objects.get_or_create(name=self.LABEL_NAME, defaults={'owner': owner})
+        distribution, _ = Platform.objects.get_or_create(name='Distribution')
+        bandcamp, _ = Platform.objects.get_or_create(name='Bandcamp')
+
+        source_files = {}
+        for source, datasource_name in self.DATA_SOURCES.items():
+            datasource, _ = DataSource.objects.get_or_create(name=datasource_name)
+            source_file, _ = SourceFile.objects.get_or_create(
+                datasource=datasource, label=label, path=self.source_file_path(source),
+                defaults={'sha256': '0' * 64, 'bytes': 0, 'mtime': timezone.now(), 'statement_type': 'synthetic'}
+            )
+            source_files[source] = source_file.id
+
+        store_ids = {}
+        for name, _, _, _ in self.ZEBRALUTION_STORES + self.LABELWORX_STORES:
+            store_ids[name] = Store.objects.get_or_create(platform=distribution, name=name)[0].id
+
+        return {
+            'label': label.pk,
+            'platforms': {'distribution': distribution.id, 'bandcamp': bandcamp.id},
+            'source_files': source_files,
+            'stores': store_ids,
+        }
+
+    def _create_dimensions(self, refs):
+        """Session temp tables holding the synthetic catalog and the weighted store/item mixes"""
+        with connection.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS synthetic_track, synthetic_mix")
+            cur.execute(
+                """
+                CREATE TEMP TABLE synthetic_track AS
+                SELECT idx,
+                       'QZSYN' || lpad(idx::text, 7, '0') AS isrc,
+                       'Synthetic Track ' || lpad(idx::text, 5, '0') AS title,
+                       'Synthetic Artist ' || lpad(((idx * 7919) %% %s)::text, 4, '0') AS artist,
+                       'SYN' || lpad((idx / 8)::text, 4, '0') AS catalog,
+                       '19' || lpad((idx / 8)::text, 10, '0') AS upc
+                FROM generate_series(0, %s - 1) idx
+                """,
+                [self.n_artists, self.n_tracks]
+            )
+            cur.execute("CREATE UNIQUE INDEX ON synthetic_track (idx)")
+            cur.execute(
+                """
+                CREATE TEMP TABLE synthetic_mix (
+                  source text, name text, store_id bigint, lo float8, hi float8,
+                  unit_price numeric, is_download boolean
+                )
+                """
+            )
+            mixes = {
+                'zebralution': [(n, w, p, d, refs['stores'][n]) for n, w, p, d in self.ZEBRALUTION_STORES],
+                'labelworx': [(n, w, p, d, refs['stores'][n]) for n, w, p, d in self.LABELWORX_STORES],
+                'bandcamp': [(n, w, p, True, None) for n, w, p in self.BANDCAMP_ITEMS],
+            }
+            rows = []
+            for source, items in mixes.items():
+                total = sum(weight for _, weight, _, _, _ in items)
+                cumulative = 0
+                for name, weight, price, is_download, store_id in items:
+                    lo = cumulative / total
+                    cumulative += weight
+                    # Last bucket is closed at 1.0 so every random() value matches
+                    hi = cumulative / total if cumulative < total else 1.1
+                    rows.append((source, name, store_id, lo, hi, price, is_download))
+            cur.executemany("INSERT INTO synthetic_mix VALUES (%s, %s, %s, %s, %s, %s, %s)", rows)
+
+    def _insert_events(self, source, refs, lo, hi, batch_no) -> int:
+        if source == 'bandcamp':
+            # Daily sales skewed towards recent years, spread over the day
+            occurred = ("%(start)s::timestamptz"
+                        " + floor(sqrt(g.r_day) * %(days)s) * interval '1 day'"
+                        " + g.r_amt * interval '1 day'")
+            quantity = "1 + floor(power(g.r_qty, 8) * 3)::int"
+            gross = "round(qty.quantity * m.unit_price * (0.9 + 0.3 * g.r_amt)::numeric, 6)"
+            currency, platform, store = 'USD', refs['platforms']['bandcamp'], 'NULL::bigint'
+            product_type = "m.name"
+        else:
+            # Monthly statement lines, more volume in recent months
+            occurred = ("%(start)s::timestamptz"
+                        " + floor(sqrt(g.r_day) * %(months)s) * interval '1 month'")
+            quantity = ("CASE WHEN m.is_download THEN 1 + floor(power(g.r_qty, 4) * 20)::int"
+                        " ELSE 1 + floor(power(g.r_qty, 3) * 5000)::int END")
+            gross = "round(qty.quantity * m.unit_price * (0.8 + 0.4 * g.r_amt)::numeric, 6)"
+            currency, platform, store = 'EUR', refs['platforms']['distribution'], 'm.store_id'
+            product_type = "CASE WHEN m.is_download THEN 'download' ELSE 'stream' END"
+
+        params = {
+            'source': source,
+            'lo': lo + 1,
+            'hi': hi,
+            'start': self.start,
+            'months': self.months,
+            'days': (self.start + relativedelta(months=self.months) - self.start).days,
+            'n_tracks': self.n_tracks,
+            'source_file': refs['source_files'][source],
+            'label': refs['label'],
+            'platform': platform,
+            'currency': currency,
+            'key': f'synthetic:{self.seed}:{source}:',
+        }
+        # setseed takes [-1, 1]; derive a distinct, reproducible seed per source batch
+        batch_seed = ((self.seed * 1_000_003 + batch_no * 7 + list(self.SOURCE_SHARE).index(source))
+                      % 2_000_000) / 1_000_000 - 1
+
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.execute("SELECT setseed(%s)", [batch_seed])
+            cur.execute(
+                f"""
+                INSERT INTO finances_revenueevent (
+                  source_file_id, label_id, occurred_at, platform_id, store_id, currency, product_type,
+                  quantity, gross_amount, publisher_deduction, marketplace_fees, transaction_fees,
+                  net_amount, base_ccy, net_amount_base, isrc, upc_ean, label_order_nr,
+                  track_artist_name, track_title, catalog_number, row_hash
+                )
+                SELECT %(source_file)s, %(label)s, q.occurred_at, %(platform)s, q.store_id, %(currency)s, q.product_type,
+                       q.quantity, q.gross, 0, 0, 0,
+                       round(q.gross * 0.85, 6), %(currency)s, round(q.gross * 0.85, 6),
+                       t.isrc, t.upc, t.catalog, t.artist, t.title, t.catalog,
+                       md5(%(key)s || q.i) || md5(%(key)s || q.i || ':')
+                FROM (
+                  SELECT g.i, g.r_track,
+                         {occurred} AS occurred_at,
+                         {store} AS store_id,
+                         {product_type} AS product_type,
+                         qty.quantity,
+                         {gross} AS gross
+                  FROM (
+                    SELECT i, random() AS r_mix, random() AS r_day, random() AS r_track,
+                           random() AS r_qty, random() AS r_amt
+                    FROM generate_series(%(lo)s, %(hi)s) i
+                  ) g
+                  JOIN synthetic_mix m ON m.source = %(source)s AND g.r_mix >= m.lo AND g.r_mix < m.hi
+                  CROSS JOIN LATERAL (SELECT {quantity} AS quantity) qty
+                ) q
+                JOIN synthetic_track t ON t.idx = floor(power(q.r_track, 2) * %(n_tracks)s)::int
+                """,
+                params
+            )
+            return cur.rowcount
+
+    def _insert_raw(self, source, table, refs) -> int:
+        params = {'source_file': refs['source_files'][source], 'path': self.source_file_path(source)}
+        with connection.cursor() as cur:
+            if source == 'zebralution':
+                cur.execute(
+                    f"""
+                    INSERT INTO {table} (
+                      period, shop, provider, artist, title, isrc, ean, label_order_nr, country,
+                      sales, revenue_eur, rev_less_publ_eur, raw_row
+                    )
+                    SELECT to_char(rev.occurred_at, 'YYYY-MM'), s.name, 'Zebralution', rev.track_artist_name,
+                           rev.track_title, rev.isrc, rev.upc_ean, rev.label_order_nr,
+                           (ARRAY['DE', 'US', 'BR', 'GB', 'FR', 'NL'])[1 + rev.id %% 6],
+                           rev.quantity, rev.gross_amount, rev.net_amount,
+                           jsonb_build_object('source_file', %(path)s)
+                    FROM finances_revenueevent rev
+                    LEFT JOIN finances_store s ON s.id = rev.store_id
+                    WHERE rev.source_file_id = %(source_file)s
+                    """,
+                    params
+                )
+            elif source == 'labelworx':
+                cur.execute(
+                    f"""
+                    INSERT INTO {table} (
+                      store_name, track_artist, track_title, isrc, catalog, qty, royalty, value, format, raw_row
+                    )
+                    SELECT s.name, rev.track_artist_name, rev.track_title, rev.isrc, rev.catalog_number,
+                           rev.quantity, rev.net_amount, rev.gross_amount,
+                           CASE WHEN rev.product_type = 'download' THEN 'MP3' ELSE 'Stream' END,
+                           jsonb_build_object('source_file', %(path)s)
+                    FROM finances_revenueevent rev
+                    LEFT JOIN finances_store s ON s.id = rev.store_id
+                    WHERE rev.source_file_id = %(source_file)s
+                    """,
+                    params
+                )
+            else:
+                cur.execute(
+                    f"""
+                    INSERT INTO {table} (
+                      date_str, occurred_at, item_name, item_type, artist, quantity, currency,
+                      item_total, amount_received, raw_row
+                    )
+                    SELECT to_char(rev.occurred_at, 'YYYY-MM-DD HH24:MI:SS'), rev.occurred_at,
+                           CASE WHEN rev.product_type = 'track' THEN rev.track_title ELSE rev.catalog_number END,
+                           rev.product_type, rev.track_artist_name, rev.quantity, 'USD',
+                           rev.gross_amount, rev.net_amount, jsonb_build_object('source_file', %(path)s)
+                    FROM finances_revenueevent rev
+                    WHERE rev.source_file_id = %(source_file)s
+                    """,
+                    params
+                )
+            return cur.rowcount
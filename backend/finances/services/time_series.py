@@ -0,0 +1,152 @@
+"""
+Time Series Engine
+
+Builds dense revenue time series in SQL: facts are bucketed with date_trunc,
+series beyond the top N (ranked with a window function) are folded into
+"Others", and generate_series fills every period between the first and last
+bucket so the caller never pads the timeline in Python.
+"""
+
+import logging
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class TimeSeriesError(ValueError):
+    """Raised for unsupported time series requests"""
+    pass
+
+
+class TimeSeriesEngine:
+    """Dense per-store revenue series at a selectable granularity"""
+
+    # granularity -> generate_series step
+    GRANULARITIES = {
+        'day': '1 day',
+        'week': '1 week',
+        'month': '1 month',
+        'quarter': '3 months',
+        'year': '1 year',
+    }
+
+    # Series that are always charted on their own, outside the top-N ranking
+    PINNED = ('Bandcamp',)
+    OTHERS = 'Others'
+
+    def __init__(self, queryset, date_field: str, value_field: str, granularity: str = 'month', top_n: int = 5):
+        if granularity not in self.GRANULARITIES:
+            raise TimeSeriesError(
+                f"Unknown granularity '{granularity}' (expected one of {', '.join(self.GRANULARITIES)})"
+            )
+        self.queryset = queryset
+        self.date_field = date_field
+        self.value_field = value_field
+        self.granularity = granularity
+        self.top_n = top_n
+
+    def build(self):
+        """
+        Run the series query
+
+        Returns:
+            tuple: (periods, series) where periods is the ascending list of
+            period start dates and series maps each series name to one value
+            per period (None where the series has no revenue)
+        """
+        from django.db.models import F
+
+        base_sql, base_params = self.queryset.values(
+            'platform', 'store_canonical',
+            bucket=F(self.date_field), amount=F(self.value_field)
+        ).query.sql_with_params()
+
+        pinned = list(self.PINNED)
+        step = self.GRANULARITIES[self.granularity]
+        with connection.cursor() as cur:
+            cur.execute(
+                f"""
+                WITH base AS ({base_sql}),
+                cells AS (
+                  -- Bandcamp is one series; distribution is split per canonical store
+                  SELECT date_trunc(%s, bucket)::date AS period,
+                         CASE WHEN platform = ANY(%s) THEN platform ELSE NULLIF(store_canonical, '') END AS series,
+                         SUM(amount) AS revenue
+                  FROM base
+                  GROUP BY 1, platform, store_canonical
+                  HAVING SUM(amount) > 0
+                ),
+                ranked AS (
+                  SELECT series,
+                         ROW_NUMBER() OVER (ORDER BY SUM(revenue) DESC, series) AS rn
+                  FROM cells
+                  WHERE series IS NOT NULL AND NOT series = ANY(%s)
+                  GROUP BY series
+                ),
+                collapsed AS (
+                  SELECT c.period,
+                         CASE
+                           WHEN c.series = ANY(%s) THEN c.series
+                           WHEN r.rn <= %s THEN c.series
+                           ELSE %s
+                         END AS series,
+                         SUM(c.revenue) AS revenue
+                  FROM cells c
+                  LEFT JOIN ranked r ON r.series = c.series
+                  WHERE c.series IS NOT NULL
+                  GROUP BY 1, 2
+                ),
+                periods AS (
+                  SELECT generate_series(MIN(period), MAX(period), %s::interval)::date AS period
+                  FROM cells
+                ),
+                names AS (
+                  SELECT DISTINCT series FROM collapsed
+                )
+                SELECT p.period, n.series, c.revenue
+                FROM periods p
+                CROSS JOIN names n
+                LEFT JOIN collapsed c ON c.period = p.period AND c.series = n.series
+                ORDER BY p.period, n.series
+                """,
+                [*base_params, self.granularity, pinned, pinned, pinned, self.top_n, self.OTHERS, step]
+            )
+            rows = cur.fetchall()
+
+        periods = []
+        series = {}
+        for period, name, revenue in rows:
+            if not periods or periods[-1] != period:
+                periods.append(period)
+            series.setdefault(name, []).append(float(revenue) if revenue is not None else None)
+
+        logger.debug(f"Time series: {len(periods)} {self.granularity} periods, {len(series)} series")
+        return periods, series
+
+    def columns(self) -> dict:
+        """Compact columnar form: one period array and one value array per series"""
+        periods, series = self.build()
+        return {
+            'granularity': self.granularity,
+            'periods': [str(period) for period in periods],
+            'series': series,
+        }
+
+    def rows(self) -> list:
+        """
+        Row-per-period form used by the dashboard chart
+
+        Every series is present on every row (None when empty) except
+        Others, which only appears on periods where it has revenue.
+        """
+        periods, series = self.build()
+        chart = []
+        for i, period in enumerate(periods):
+            row = {'period': str(period)}
+            for name, values in series.items():
+                if name == self.OTHERS and values[i] is None:
+                    continue
+                row[name] = values[i]
+            chart.append(row)
+        return chart
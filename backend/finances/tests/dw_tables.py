@@ -0,0 +1,49 @@
+"""Tables the DW build reads and writes that are created outside the migrations"""
+
+from finances.services.staging_sync import StagingSyncService
+
+RAW_BANDCAMP_DDL = """
+    CREATE SCHEMA IF NOT EXISTS raw;
+    CREATE TABLE raw.bandcamp_event_raw (
+      id bigserial PRIMARY KEY,
+      date_str varchar(32) NOT NULL DEFAULT '',
+      occurred_at timestamptz NULL,
+      item_name varchar(400) NOT NULL DEFAULT '',
+      item_type varchar(50) NOT NULL DEFAULT '',
+      artist varchar(200) NOT NULL DEFAULT '',
+      quantity integer NOT NULL DEFAULT 0,
+      currency varchar(3) NOT NULL DEFAULT 'USD',
+      item_total numeric(18,6) NOT NULL DEFAULT 0,
+      amount_received numeric(18,6) NOT NULL DEFAULT 0,
+      raw_row jsonb NULL,
+      bandcamp_sale_id text NULL UNIQUE
+    );
+"""
+
+# Unpartitioned, as before the quarter partitions: the first build converts it
+FACT_REVENUE_DDL = """
+    CREATE TABLE dw.fact_revenue (
+      id bigserial PRIMARY KEY,
+      occurred_at date NOT NULL,
+      source_key smallint NOT NULL,
+      store_key bigint NULL,
+      artist_key integer NOT NULL,
+      track_key integer NOT NULL,
+      release_key integer NOT NULL,
+      quantity integer DEFAULT 0,
+      revenue_base numeric(18,6) DEFAULT 0,
+      revenue_brl numeric(18,6) DEFAULT 0,
+      revenue_usd numeric(18,6) DEFAULT 0,
+      revenue_eur numeric(18,6) DEFAULT 0,
+      source_file_id bigint NULL
+    );
+    CREATE INDEX fact_revenue_source_occurred_idx ON dw.fact_revenue (source_key, occurred_at);
+    CREATE INDEX fact_revenue_source_file_idx ON dw.fact_revenue (source_key, source_file_id);
+"""
+
+
+def create_dw_tables(cur):
+    """Create empty raw Bandcamp, staging and fact tables"""
+    cur.execute(RAW_BANDCAMP_DDL)
+    StagingSyncService.ensure_table(cur)
+    cur.execute(FACT_REVENUE_DDL)
@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.http import QueryDict
+from django.test import TestCase
+
+from finances.services.analytics_filters import AnalyticsFilterError, AnalyticsFilters
+
+
+class AnalyticsFiltersTests(TestCase):
+    """Filter parsing, and the 400 every analytics action returns for malformed filters"""
+
+    def test_parses_lists_and_months(self):
+        filters = AnalyticsFilters.from_params(
+            QueryDict('year=2024&year=2025&quarter=1,2&store=Spotify,%20Deezer&month_from=2024-03')
+        )
+        self.assertEqual(filters.years, [2024, 2025])
+        self.assertEqual(filters.quarters, [1, 2])
+        self.assertEqual(filters.values['store'], ['Spotify', 'Deezer'])
+        self.assertEqual(filters.month_from, date(2024, 3, 1))
+        self.assertTrue(AnalyticsFilters.from_params(QueryDict('')).is_empty())
+
+    def test_malformed_filters_are_rejected(self):
+        for query in ('year=abc', 'quarter=5', 'month_from=2024-13', 'month_from=2024-05&month_to=2024-01'):
+            with self.subTest(query=query), self.assertRaises(AnalyticsFilterError):
+                AnalyticsFilters.from_params(QueryDict(query))
+
+    def test_actions_answer_400(self):
+        # Filters are validated before the action runs, so no warehouse tables are needed
+        for action in ('monthly_overview', 'detailed_overview', 'kpi_summary'):
+            response = self.client.get(f'/api/finances/revenue/{action}/', {'quarter': '7'})
+            with self.subTest(action=action):
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'quarter must be between 1 and 4'})
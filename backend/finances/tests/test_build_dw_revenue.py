@@ -0,0 +1,153 @@
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Label
+from finances.models import DataSource, Platform, RevenueEvent, SourceFile, Store
+from finances.models_etl import DwFactRevenue
+from finances.services.dw_cache import DwGenerationService
+from finances.tests.dw_tables import create_dw_tables
+
+
+@patch('finances.management.commands.build_dw_revenue.ExchangeRateService.get_rate_to_brl',
+       return_value=Decimal('5'))
+class IncrementalBuildTests(TestCase):
+    """Incremental builds pick up rows changed below the watermark"""
+
+    def setUp(self):
+        with connection.cursor() as cur:
+            create_dw_tables(cur)
+            cur.execute(
+                "INSERT INTO staging.distribution_event (occurred_at, platform, store, track_artist_name, "
+                "track_title, quantity, net_amount_eur, source_file_id) VALUES "
+                "('2024-01-10', 'Distribution', 'Spotify', 'Artist', 'Track', 3, 1.5, 1), "
+                "('2024-02-10', 'Distribution', 'Spotify', 'Artist', 'Track', 2, 1, 2)"
+            )
+            cur.execute(
+                "INSERT INTO raw.bandcamp_event_raw (occurred_at, item_type, item_name, artist, quantity, "
+                "amount_received) VALUES ('2024-03-01', 'track', 'Track', 'Artist', 1, 2)"
+            )
+
+    def _build(self, **options):
+        output = io.StringIO()
+        call_command('build_dw_revenue', stdout=output, **options)
+        return output.getvalue()
+
+    def _totals(self):
+        with connection.cursor() as cur:
+            cur.execute(
+                "SELECT s.source, COUNT(*), SUM(f.revenue_base) FROM dw.fact_revenue f "
+                "JOIN dw.dim_source s ON s.id = f.source_key GROUP BY 1"
+            )
+            return {source: (rows, amount) for source, rows, amount in cur.fetchall()}
+
+    def test_unchanged_sources_do_not_bump_the_generation(self, rate):
+        self._build()
+        generation = DwGenerationService.current()[0]
+        self.assertIn('No new facts', self._build())
+        self.assertEqual(DwGenerationService.current()[0], generation)
+
+    def test_corrected_amount_replaces_its_source_file(self, rate):
+        self._build()
+        generation = DwGenerationService.current()[0]
+        with connection.cursor() as cur:
+            cur.execute("UPDATE staging.distribution_event SET net_amount_eur = 1001 WHERE source_file_id = 2")
+
+        output = self._build()
+        self.assertIn('distribution: 1 source file(s) changed below the watermark', output)
+        self.assertEqual(self._totals()['distribution'], (2, Decimal('1002.5')))
+        self.assertGreater(DwGenerationService.current()[0], generation)
+
+    def test_corrected_source_without_files_is_reloaded(self, rate):
+        self._build()
+        with connection.cursor() as cur:
+            cur.execute("UPDATE raw.bandcamp_event_raw SET amount_received = 3")
+
+        self.assertIn('bandcamp: upstream rows changed below the watermark', self._build())
+        self.assertEqual(self._totals()['bandcamp'], (1, Decimal('3')))
+
+
+    def test_quarter_rebuild_refreshes_the_rollup_before_attaching(self, rate):
+        self._build()
+        with connection.cursor() as cur:
+            # Only a rebuild picks this up: the totals of the file stay the same
+            cur.execute("UPDATE staging.distribution_event SET store = 'Deezer' WHERE source_file_id = 1")
+
+        output = self._build(quarters=['2024Q1'])
+        self.assertLess(output.index('dw.agg_month_store'), output.index('attached as dw.fact_revenue_2024q1'))
+        with connection.cursor() as cur:
+            cur.execute("SELECT store, SUM(revenue_base) FROM dw.agg_month_store WHERE source = 'distribution' "
+                        "GROUP BY 1 ORDER BY 1")
+            self.assertEqual(cur.fetchall(), [('Deezer', Decimal('1.5')), ('Spotify', Decimal('1'))])
+            cur.execute("SELECT to_regclass('dw.fact_revenue_2024q1_load'), to_regclass('pg_temp.fact_revenue_rebuilt')")
+            self.assertEqual(cur.fetchone(), (None, None))
+        self.assertEqual(self._totals()['distribution'], (2, Decimal('2.5')))
+
+class StagingChangeBuildTests(TestCase):
+    """Events changed after a build reach the DW through staging and the changed SourceFiles"""
+
+    def setUp(self):
+        rate = patch('finances.management.commands.build_dw_revenue.ExchangeRateService.get_rate_to_brl',
+                     return_value=Decimal('5'))
+        rate.start()
+        self.addCleanup(rate.stop)
+        with connection.cursor() as cur:
+            create_dw_tables(cur)
+        label = Label.objects.create(name='Test Records', owner=User.objects.create(username='owner'))
+        datasource = DataSource.objects.create(name='zebralution')
+        distribution = Platform.objects.create(name='Distribution')
+        store = Store.objects.create(platform=distribution, name='Spotify')
+        self.files = [
+            SourceFile.objects.create(datasource=datasource, label=label, path=f'statement-{n}.csv', sha256='0' * 64,
+                                      bytes=0, mtime=timezone.now(), statement_type='monthly')
+            for n in range(2)
+        ]
+        self.events = [
+            RevenueEvent.objects.create(
+                source_file=source_file, label=label, occurred_at=timezone.now().replace(year=2024, month=month),
+                platform=distribution, store=store, currency='EUR', quantity=1, net_amount_base=Decimal('2'),
+                track_artist_name='Artist', track_title='Track', row_hash=f'{month}'
+            )
+            for month, source_file in ((1, self.files[0]), (2, self.files[0]), (3, self.files[1]))
+        ]
+        self._sync()
+        self._build()
+
+    def _sync(self):
+        output = io.StringIO()
+        call_command('build_staging_distribution', stdout=output)
+        return output.getvalue()
+
+    def _build(self):
+        output = io.StringIO()
+        call_command('build_dw_revenue', stdout=output)
+        return output.getvalue()
+
+    def _titles(self):
+        return sorted(DwFactRevenue.objects.with_attributes('track_title').values_list('track_title', flat=True))
+
+    def test_updated_event_replaces_its_source_file(self):
+        # Same amount: only the changed SourceFile record brings the new title in
+        RevenueEvent.objects.filter(pk=self.events[0].pk).update(track_title='Track (Remix)')
+
+        self.assertIn('1 source files to replace in the DW', self._sync())
+        output = self._build()
+        self.assertIn('Mode: incremental', output)
+        self.assertIn('distribution: 2 facts of 1 source file(s) replaced by 2', output)
+        self.assertEqual(self._titles(), ['Track', 'Track', 'Track (Remix)'])
+
+        # Claimed by the build
+        self.assertIn('No new facts', self._build())
+
+    def test_deleted_event_is_removed(self):
+        RevenueEvent.objects.filter(pk=self.events[2].pk).delete()
+        self._sync()
+        self._build()
+        self.assertEqual(DwFactRevenue.objects.count(), 2)
+        self.assertEqual(set(DwFactRevenue.objects.values_list('source_file_id', flat=True)), {self.files[0].pk})
@@ -0,0 +1,74 @@
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from finances.tests.dw_tables import create_dw_tables
+from finances.views import RevenueAnalysisViewSet
+
+
+@patch('finances.management.commands.build_dw_revenue.ExchangeRateService.get_rate_to_brl',
+       return_value=Decimal('5'))
+class DetailedOverviewCursorTests(TestCase):
+    """Keyset pages of detailed_overview over a DW built from Bandcamp sales"""
+
+    # Ties on the amount: pages must break them on the fact id
+    AMOUNTS = [5, 5, 5, 3, 3, 1, 1]
+
+    def setUp(self):
+        cache.clear()
+        with connection.cursor() as cur:
+            create_dw_tables(cur)
+            cur.execute(
+                "INSERT INTO raw.bandcamp_event_raw (occurred_at, item_type, item_name, artist, quantity, "
+                "amount_received) SELECT '2024-02-01'::timestamptz + g * interval '1 day', 'track', "
+                "'Track ' || g, 'Artist', 1, a FROM unnest(%s::numeric[]) WITH ORDINALITY AS t(a, g)",
+                [self.AMOUNTS]
+            )
+
+    def _build(self):
+        call_command('build_dw_revenue', stdout=io.StringIO())
+
+    def _page(self, cursor=None):
+        params = {'pagination': 'cursor', 'page_size': 2, 'currency': 'USD'}
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get('/api/finances/revenue/detailed_overview/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_round_trip(self, rate):
+        view = RevenueAnalysisViewSet()
+        token = view._encode_cursor(Decimal('5.000000'), 42)
+        self.assertEqual(view._decode_cursor(token), (Decimal('5.000000'), 42))
+        with self.assertRaises(ValueError):
+            view._decode_cursor('not-a-cursor')
+
+    def test_pages_break_ties_on_id(self, rate):
+        self._build()
+        rows, cursor, pages = [], None, 0
+        while True:
+            body = self._page(cursor)
+            pages += 1
+            rows += [(Decimal(row['revenue']), row['id']) for row in body['data']]
+            cursor = body['pagination']['next_cursor']
+            if not body['pagination']['has_next']:
+                self.assertIsNone(cursor)
+                break
+            # The cursor is the (revenue, id) of the page's last row
+            self.assertEqual(RevenueAnalysisViewSet()._decode_cursor(cursor), rows[-1])
+
+        self.assertEqual(pages, 4)
+        self.assertEqual(len({pk for _, pk in rows}), len(self.AMOUNTS))
+        self.assertEqual(rows, sorted(rows, reverse=True))
+        self.assertEqual([revenue for revenue, _ in rows], sorted(map(Decimal, self.AMOUNTS), reverse=True))
+
+    def test_invalid_cursor_gets_400(self, rate):
+        self._build()
+        response = self.client.get('/api/finances/revenue/detailed_overview/',
+                                   {'pagination': 'cursor', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
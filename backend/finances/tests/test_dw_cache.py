@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from finances.services.dw_cache import DwGenerationService, dw_cached
+
+
+class CountingViewSet(viewsets.ViewSet):
+    calls = 0
+
+    @dw_cached
+    def summary(self, request):
+        CountingViewSet.calls += 1
+        return Response({'calls': CountingViewSet.calls})
+
+
+class DwCachedTests(TestCase):
+    """Responses cached per DW generation, with ETags revalidated by conditional requests"""
+
+    def setUp(self):
+        cache.clear()
+        CountingViewSet.calls = 0
+        self.view = CountingViewSet.as_view({'get': 'summary'})
+        self.factory = APIRequestFactory()
+
+    def _get(self, path='/summary/', **headers):
+        response = self.view(self.factory.get(path, **headers))
+        # 304s are plain Django responses
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_responses_are_cached_within_a_generation(self):
+        first = self._get()
+        second = self._get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, {'calls': 1})
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(first['Cache-Control'], 'no-cache')
+
+        # Other parameters are other entries
+        self.assertEqual(self._get('/summary/?year=2024').data, {'calls': 2})
+
+    def test_matching_etag_gets_304(self):
+        etag = self._get()['ETag']
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(CountingViewSet.calls, 1)
+
+    def test_new_generation_invalidates_entries_and_etags(self):
+        first = self._get()
+        generation = DwGenerationService.bump(mode='incremental', fact_rows=1)
+        self.assertEqual(DwGenerationService.current()[0], generation)
+
+        response = self._get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'calls': 2})
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertTrue(response['ETag'].startswith(f'"{generation}-'))
+        self.assertIn('Last-Modified', response)
@@ -0,0 +1,84 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+
+from finances.services.dw_partitions import FactPartitionError, FactPartitionService
+from finances.services.load_ledger import LoadLedgerService
+
+
+class FactPartitionServiceTests(TestCase):
+    """Quarter partitions of a scratch fact table partitioned like dw.fact_revenue"""
+
+    TABLE = 'dw.partition_test'
+
+    def setUp(self):
+        with connection.cursor() as cur:
+            cur.execute("CREATE SCHEMA IF NOT EXISTS dw")
+            cur.execute(
+                f"""
+                CREATE TABLE {self.TABLE} (
+                  id bigserial,
+                  occurred_at date NOT NULL,
+                  revenue_base numeric(18,6) DEFAULT 0,
+                  PRIMARY KEY (id, occurred_at)
+                ) PARTITION BY {FactPartitionService.PARTITION_BY}
+                """
+            )
+
+    def _insert(self, cur, *days):
+        cur.execute(
+            f"INSERT INTO {self.TABLE} (occurred_at, revenue_base) SELECT d, 1 FROM unnest(%s::date[]) AS d",
+            [list(days)]
+        )
+
+    def _routing(self, cur) -> dict:
+        cur.execute(f"SELECT tableoid::regclass::text, COUNT(*) FROM {self.TABLE} GROUP BY 1")
+        return dict(cur.fetchall())
+
+    def test_quarter_helpers(self):
+        self.assertEqual(FactPartitionService.quarter_start(date(2024, 5, 17)), date(2024, 4, 1))
+        self.assertEqual(FactPartitionService.quarter_end(date(2024, 10, 1)), date(2025, 1, 1))
+        self.assertEqual(FactPartitionService.parse_quarter('2024-Q3'), date(2024, 7, 1))
+        self.assertEqual(FactPartitionService.partition_name(self.TABLE, date(2024, 7, 1)), 'dw.partition_test_2024q3')
+        with self.assertRaises(FactPartitionError):
+            FactPartitionService.parse_quarter('2024Q5')
+
+    def test_rows_route_to_their_quarter(self):
+        with connection.cursor() as cur:
+            created = FactPartitionService.ensure(cur, self.TABLE, [date(2024, 2, 10), date(2024, 3, 31), date(2024, 4, 1)])
+            # Q1 and Q2 plus the DEFAULT partition; ensure() is idempotent
+            self.assertEqual(created, 3)
+            self.assertEqual(FactPartitionService.ensure(cur, self.TABLE, [date(2024, 1, 1)]), 0)
+
+            self._insert(cur, date(2024, 1, 1), date(2024, 3, 31), date(2024, 4, 1))
+            self.assertEqual(self._routing(cur), {'dw.partition_test_2024q1': 2, 'dw.partition_test_2024q2': 1})
+
+    def test_default_partition_rows_move_to_a_new_quarter(self):
+        with connection.cursor() as cur:
+            FactPartitionService.ensure(cur, self.TABLE, [date(2024, 1, 1)])
+            self._insert(cur, date(2024, 1, 2), date(2025, 7, 4), date(2025, 8, 1))
+            self.assertEqual(self._routing(cur), {'dw.partition_test_2024q1': 1, 'dw.partition_test_default': 2})
+
+            FactPartitionService.ensure(cur, self.TABLE, [date(2025, 7, 1)])
+            self.assertEqual(self._routing(cur), {'dw.partition_test_2024q1': 1, 'dw.partition_test_2025q3': 2})
+
+    def test_attach_replaces_the_quarter(self):
+        start = date(2024, 1, 1)
+        with connection.cursor() as cur, patch.dict(LoadLedgerService.TABLES, {self.TABLE: 'revenue_base'}):
+            FactPartitionService.ensure(cur, self.TABLE, [start])
+            self._insert(cur, date(2024, 1, 2), date(2024, 2, 3))
+
+            loaded = FactPartitionService.create_detached(cur, self.TABLE, start)
+            cur.execute(f"INSERT INTO {loaded} (occurred_at, revenue_base) VALUES ('2024-03-01', 5)")
+            self.assertEqual(FactPartitionService.prepare(cur, self.TABLE, loaded), 1)
+            replaced = FactPartitionService.attach(cur, self.TABLE, start, loaded)
+
+            self.assertEqual(replaced, 2)
+            self.assertEqual(self._routing(cur), {'dw.partition_test_2024q1': 1})
+            cur.execute("SELECT to_regclass(%s)", [loaded])
+            self.assertIsNone(cur.fetchone()[0])
+            # The attached table took the partition's name and the parent's indexes
+            cur.execute("SELECT COUNT(*) FROM pg_index WHERE indrelid = 'dw.partition_test_2024q1'::regclass")
+            self.assertEqual(cur.fetchone()[0], 1)
@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test import TestCase
+
+from finances.services.dw_partitions import FactPartitionService
+from finances.services.dw_shadow import ShadowTableError, ShadowTableService
+
+
+class ShadowTableServiceTests(TestCase):
+    """Shadow build and swap on a scratch table in the dw schema"""
+
+    TABLE = 'dw.swap_test'
+
+    def setUp(self):
+        with connection.cursor() as cur:
+            cur.execute("CREATE SCHEMA IF NOT EXISTS dw")
+            cur.execute(
+                f"""
+                CREATE TABLE {self.TABLE} (
+                  id bigserial PRIMARY KEY,
+                  occurred_at date NOT NULL,
+                  amount numeric(18,6) DEFAULT 0
+                )
+                """
+            )
+            cur.execute(f"CREATE INDEX swap_test_occurred_idx ON {self.TABLE} (occurred_at)")
+            cur.execute(f"INSERT INTO {self.TABLE} (occurred_at, amount) VALUES ('2024-01-05', 1), ('2024-02-05', 2)")
+
+    def _indexes(self, cur, table):
+        cur.execute(
+            "SELECT c.relname FROM pg_index x JOIN pg_class c ON c.oid = x.indexrelid "
+            "WHERE x.indrelid = %s::regclass ORDER BY 1",
+            [table]
+        )
+        return [name for name, in cur.fetchall()]
+
+    def test_swap_replaces_rows_and_keeps_index_names(self):
+        with connection.cursor() as cur:
+            shadow = ShadowTableService.create(cur, self.TABLE)
+            self.assertEqual(shadow, 'dw.swap_test_shadow')
+            cur.execute(f"INSERT INTO {shadow} (occurred_at, amount) SELECT '2024-03-01'::date + g, g FROM generate_series(1, 5) g")
+            self.assertEqual(ShadowTableService.build_indexes(cur, self.TABLE, shadow), 2)
+            self.assertEqual(self._indexes(cur, shadow), ['swap_test_shadow_occurred_idx', 'swap_test_shadow_pkey'])
+
+            ShadowTableService.swap(cur, self.TABLE, shadow)
+
+            cur.execute(f"SELECT COUNT(*), SUM(amount) FROM {self.TABLE}")
+            self.assertEqual(cur.fetchone(), (5, 15))
+            self.assertEqual(self._indexes(cur, self.TABLE), ['swap_test_occurred_idx', 'swap_test_pkey'])
+            cur.execute("SELECT to_regclass(%s)", [shadow])
+            self.assertIsNone(cur.fetchone()[0])
+            cur.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [self.TABLE])
+            self.assertEqual(cur.fetchone()[0], 'swap_test_pkey')
+
+    def test_swap_keeps_the_id_sequence(self):
+        with connection.cursor() as cur:
+            shadow = ShadowTableService.create(cur, self.TABLE)
+            ShadowTableService.build_indexes(cur, self.TABLE, shadow)
+            ShadowTableService.swap(cur, self.TABLE, shadow)
+            cur.execute(f"INSERT INTO {self.TABLE} (occurred_at) VALUES ('2024-04-01') RETURNING id")
+            # Ids continue after the rows of the replaced table
+            self.assertGreater(cur.fetchone()[0], 2)
+
+    def test_partitioned_shadow_widens_the_primary_key(self):
+        with connection.cursor() as cur:
+            shadow = ShadowTableService.create(cur, self.TABLE, partition_by=FactPartitionService.PARTITION_BY)
+            FactPartitionService.ensure(cur, shadow, [])
+            ShadowTableService.build_indexes(cur, self.TABLE, shadow)
+            ShadowTableService.swap(cur, self.TABLE, shadow)
+            cur.execute(
+                "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+                [self.TABLE]
+            )
+            self.assertEqual(cur.fetchone()[0], 'PRIMARY KEY (id, occurred_at)')
+            cur.execute("SELECT to_regclass('dw.swap_test_default')")
+            self.assertIsNotNone(cur.fetchone()[0])
+
+    def test_index_without_table_prefix_is_rejected(self):
+        with connection.cursor() as cur:
+            cur.execute(f"CREATE INDEX other_amount_idx ON {self.TABLE} (amount)")
+            shadow = ShadowTableService.create(cur, self.TABLE)
+            with self.assertRaises(ShadowTableError):
+                ShadowTableService.build_indexes(cur, self.TABLE, shadow)
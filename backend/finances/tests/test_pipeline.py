@@ -0,0 +1,107 @@
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from api.models import Label
+from finances.models import ImportBatch
+from finances.services.pipeline import PipelineError, PipelineOrchestrator
+
+
+# Stages run on worker threads with their own connections, which only see committed rows
+@patch('finances.services.pipeline.call_command')
+class PipelineOrchestratorTests(TransactionTestCase):
+    """Stage fingerprints, skipping and failure handling (the stage commands are mocked)"""
+
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        self.label = Label.objects.create(name='Test Records', owner=owner)
+        sources = tempfile.TemporaryDirectory()
+        self.addCleanup(sources.cleanup)
+        self.sources = Path(sources.name)
+        (self.sources / 'distribution' / '2024-Q1').mkdir(parents=True)
+        self.statement = self.sources / 'distribution' / '2024-Q1' / 'statement.csv'
+        self.statement.write_text('artist;title;revenue\nA;B;1,00\n')
+
+    def _run(self, **options):
+        return PipelineOrchestrator(self.label, source_path=self.sources, **options).run()
+
+    @staticmethod
+    def _commands(call_command):
+        return sorted(call.args[0] for call in call_command.call_args_list)
+
+    def test_first_run_runs_every_stage(self, call_command):
+        batch = self._run()
+        self.assertEqual(batch.status, 'completed')
+        self.assertEqual(self._commands(call_command),
+                         ['build_dw_revenue', 'build_staging_distribution', 'finances_ingest', 'finances_normalize'])
+        self.assertEqual({result['status'] for result in batch.stages.values()}, {'completed'})
+        for result in batch.stages.values():
+            self.assertEqual(len(result['fingerprint']), 64)
+            self.assertGreaterEqual(result['seconds'], 0)
+        normalize = next(call for call in call_command.call_args_list if call.args[0] == 'finances_normalize')
+        self.assertEqual(normalize.kwargs['batch_id'], batch.id)
+
+    def test_unchanged_inputs_are_skipped(self, call_command):
+        first = self._run()
+        call_command.reset_mock()
+
+        batch = self._run()
+        call_command.assert_not_called()
+        self.assertEqual({name: result['status'] for name, result in batch.stages.items()},
+                         {'ingest': 'skipped', 'normalize': 'skipped', 'staging': 'skipped', 'dw': 'skipped'})
+        for name, result in batch.stages.items():
+            self.assertEqual(result['fingerprint'], first.stages[name]['fingerprint'])
+
+    def test_changed_source_file_reruns_ingest_only(self, call_command):
+        self._run()
+        call_command.reset_mock()
+        self.statement.write_text('artist;title;revenue\nA;B;2,00\n')
+        # Ingest's own outputs are not inputs
+        (self.sources / 'distribution' / 'canonical').mkdir()
+        (self.sources / 'distribution' / 'canonical' / 'meta.json').write_text('{}')
+
+        batch = self._run()
+        self.assertEqual(self._commands(call_command), ['finances_ingest'])
+        self.assertEqual(batch.stages['normalize']['status'], 'skipped')
+
+        call_command.reset_mock()
+        self._run()
+        call_command.assert_not_called()
+
+    def test_force_runs_unchanged_stages(self, call_command):
+        self._run()
+        call_command.reset_mock()
+        batch = self._run(force=True)
+        self.assertEqual(len(call_command.call_args_list), 4)
+        self.assertEqual({result['status'] for result in batch.stages.values()}, {'completed'})
+
+    def test_failed_stage_blocks_its_dependents(self, call_command):
+        def fail_normalize(command, **options):
+            if command == 'finances_normalize':
+                raise CommandError('Normalization failed: boom')
+        call_command.side_effect = fail_normalize
+
+        with self.assertRaises(PipelineError), self.assertLogs('finances.services.pipeline', 'ERROR'):
+            self._run()
+        batch = ImportBatch.objects.get()
+        self.assertEqual(batch.status, 'failed')
+        self.assertEqual(batch.stages['normalize']['error'], 'Normalization failed: boom')
+        self.assertEqual(batch.stages['staging'], {'status': 'blocked'})
+        self.assertEqual(batch.stages['dw'], {'status': 'blocked'})
+
+        # A failed run is not a baseline: the next run retries the stage
+        call_command.side_effect = None
+        call_command.reset_mock()
+        self._run()
+        self.assertIn('finances_normalize', self._commands(call_command))
+
+    def test_bandcamp_api_always_runs(self, call_command):
+        self._run(bandcamp_api=True)
+        call_command.reset_mock()
+        batch = self._run(bandcamp_api=True)
+        self.assertEqual(self._commands(call_command), ['ingest_bandcamp_api'])
+        self.assertIsNone(batch.stages['bandcamp_api']['fingerprint'])
@@ -0,0 +1,53 @@
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from finances.models_etl import DwAggMonthStore, DwDimStore
+from finances.services.dw_cache import DwGenerationService
+from finances.tests.dw_tables import create_dw_tables
+
+
+class DwDimStoreAdminTests(TestCase):
+    """Editing a store mapping in the admin refreshes what copies the canonical name"""
+
+    def setUp(self):
+        with connection.cursor() as cur:
+            create_dw_tables(cur)
+            cur.execute(
+                "INSERT INTO staging.distribution_event (occurred_at, platform, store, track_artist_name, "
+                "track_title, quantity, net_amount_eur, source_file_id) VALUES "
+                "('2024-01-10', 'Distribution', 'YouTube Content ID', 'Artist', 'Track', 3, 1.5, 1), "
+                "('2024-05-10', 'Distribution', 'Spotify', 'Artist', 'Track', 2, 1, 1)"
+            )
+        with patch('finances.management.commands.build_dw_revenue.ExchangeRateService.get_rate_to_brl',
+                   return_value=Decimal('5')):
+            call_command('build_dw_revenue', stdout=io.StringIO())
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+
+    def test_save_refreshes_rollup_and_bumps_generation(self):
+        store = DwDimStore.objects.get(store_name='YouTube Content ID')
+        self.assertEqual(store.store_canonical, 'YouTube')
+        generation = DwGenerationService.current()[0]
+
+        response = self.client.post(
+            f'/admin/finances/dwdimstore/{store.pk}/change/',
+            {'store_name': store.store_name, 'store_canonical': 'YouTube CID'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(DwAggMonthStore.objects.filter(store='YouTube Content ID').values_list('store_canonical', flat=True)),
+            ['YouTube CID']
+        )
+        self.assertEqual(DwAggMonthStore.objects.get(store='Spotify').store_canonical, 'Spotify')
+        self.assertGreater(DwGenerationService.current()[0], generation)
+
+    def test_stores_cannot_be_deleted(self):
+        store = DwDimStore.objects.get(store_name='Spotify')
+        response = self.client.post(f'/admin/finances/dwdimstore/{store.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(DwDimStore.objects.filter(pk=store.pk).exists())
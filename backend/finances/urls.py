@@ -1,10 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import RevenueAnalysisViewSet
+from .async_views import async_views
 
 router = DefaultRouter()
 router.register(r'revenue', RevenueAnalysisViewSet, basename='revenue')
 
 urlpatterns = [
     path('api/finances/', include(router.urls)),
+] + [
+    # Async variants running independent aggregates concurrently (ASGI)
+    path(f'api/finances/revenue-async/{name}/', view, name=f'revenue-async-{name}')
+    for name, view in async_views.items()
 ]
@@ -1,17 +1,32 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django.db.models import Sum, Count, Q, Avg, Min, Max
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from decimal import Decimal
 from django.utils import timezone
 from datetime import datetime, timedelta
+import base64
 import csv
 import json
+import uuid
 
 from .models import RevenueEvent, Platform, SourceFile
-from .models_etl import DwFactRevenue
+from .models_etl import DwFactRevenue, DwAggMonthStore
 from .serializers import RevenueEventSerializer, PlatformSerializer
+from .renderers import ColumnarJSONRenderer, ColumnTable
+from .services.dw_cache import dw_cached
+from .services.dw_facets import FacetIndexService
+from .services.analytics_filters import AnalyticsFilters, AnalyticsFilterError
+from .services.time_series import TimeSeriesEngine, TimeSeriesError
+from .services.pivot import PivotQuery, PivotError
+from .services.concurrent_aggregates import run_aggregates
+from .services.leaderboard import LeaderboardService
+from .services.load_ledger import LoadLedgerService
+from .services.dw_sketches import DistinctSketchService
+from .services.fact_export import FactExporter, FactExportError
+from .services.instrumentation import count_queries
 from api.models import Label
 
 
@@ -21,93 +36,127 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
     Updated to handle both CSV and API-sourced data
     """
 
+    # Run independent aggregates on separate worker connections at the same
+    # time; enabled for the async routes in finances/async_views.py
+    concurrent_aggregates = False
+
+    # ?format=columnar returns row lists as column tables (see finances/renderers.py)
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Validate filter parameters up front so every action rejects bad input alike
+        self.get_filters()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, AnalyticsFilterError):
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return super().handle_exception(exc)
+
+    def get_filters(self):
+        """Filters parsed from the query string (year, quarter, month_from/month_to, platform, ...)"""
+        if not hasattr(self, '_filters'):
+            self._filters = AnalyticsFilters.from_params(self.request.query_params)
+        return self._filters
+
+    def is_columnar(self) -> bool:
+        """Whether the negotiated renderer is the columnar one (views may then skip per-row dicts)"""
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return getattr(renderer, 'format', None) == ColumnarJSONRenderer.format
+
+    def run_aggregates(self, tasks):
+        """Evaluate a dict of independent query callables, concurrently when enabled"""
+        return run_aggregates(tasks, concurrent=self.concurrent_aggregates)
+
     def get_queryset(self):
-        # Return unfiltered revenue events - frontend handles all filtering
-        return RevenueEvent.objects.select_related('platform', 'store', 'source_file').all()
+        # Revenue events restricted to the requested filters
+        queryset = RevenueEvent.objects.select_related('platform', 'store', 'source_file').all()
+        return self.get_filters().apply(queryset, 'events')
+
+    def use_distinct_sketches(self, dataset) -> bool:
+        """
+        Whether unique counts come from the HyperLogLog sketches (dw.agg_month_sketch)
+
+        ``?exact=1`` forces exact COUNT(DISTINCT ...); so do filters the
+        sketches cannot answer (platform, store, artist, catalog).
+        """
+        if self.request.query_params.get('exact', '').lower() in ('1', 'true', 'yes'):
+            return False
+        return DistinctSketchService.supports(dataset, self.get_filters())
 
     def get_dw_queryset(self):
-        """Return unfiltered data warehouse facts - frontend handles all filtering"""
-        return DwFactRevenue.objects.all()
-
-    def canonical_store(self, store_name: str) -> str:
-        if not store_name:
-            return ''
-        name = (store_name or '').strip()
-        lower = name.lower()
-        # Consolidate common brand variants
-        if 'youtube' in lower:
-            return 'YouTube'
-        if 'apple music' in lower or 'applemusic' in lower or 'itunes' in lower:
-            return 'Apple Music'
-        if 'amazon' in lower:
-            return 'Amazon Music'
-        if 'google play' in lower:
-            return 'Google Play'
-        if 'tiktok' in lower:
-            return 'TikTok'
-        if 'deezer' in lower:
-            return 'Deezer'
-        if 'tidal' in lower:
-            return 'TIDAL'
-        if 'spotify' in lower:
-            return 'Spotify'
-        if 'beatport' in lower:
-            return 'Beatport'
-        if 'qobuz' in lower:
-            return 'Qobuz'
-        if 'yandex' in lower:
-            return 'Yandex'
-        if 'netease' in lower:
-            return 'Netease'
-        if 'traxsource' in lower:
-            return 'Traxsource'
-        if 'juno' in lower:
-            return 'Juno'
-        return name
+        """Return data warehouse facts restricted to the requested filters"""
+        return self.get_filters().apply(DwFactRevenue.objects.all(), 'dw')
+
+    def get_leaderboard_label(self):
+        """Label id from the ``label`` query parameter (None = all labels)"""
+        value = self.request.query_params.get('label')
+        if not value:
+            return None
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            raise AnalyticsFilterError(f"Invalid label '{value}'")
+
+    def get_rollup_queryset(self):
+        """
+        Return the monthly rollup (dw.agg_month_store) for month-grain aggregations.
+
+        Falls back to the fact table, annotated with the same ``month`` and
+        ``transactions`` columns, when the rollup has not been built yet.
+        """
+        if DwAggMonthStore.objects.exists():
+            return self.get_filters().apply(DwAggMonthStore.objects.all(), 'rollup')
+        from django.db.models import Value, IntegerField
+        from django.db.models.functions import TruncMonth
+        return self.get_dw_queryset().with_attributes().annotate(
+            month=TruncMonth('occurred_at'),
+            transactions=Value(1, output_field=IntegerField())
+        )
 
     @action(detail=False, methods=['get'])
     def status(self, request):
-        """Return ingestion/build progress across raw, staging, and DW."""
+        """Return ingestion/build progress across raw, staging, and DW.
+
+        Counts and sums come from the load ledger the ingest/build commands
+        maintain (no table scans); tables the ledger has not seen yet report
+        planner estimates and are listed under ``estimated``.
+        """
         try:
-            from django.db import connection
-            with connection.cursor() as cur:
-                cur.execute("SELECT COALESCE(count(*),0) FROM raw.bandcamp_event_raw")
-                raw_bandcamp = cur.fetchone()[0]
-                cur.execute("SELECT COALESCE(count(*),0) FROM raw.zebralution_event_raw")
-                raw_zebra = cur.fetchone()[0]
-                cur.execute("SELECT COALESCE(count(*),0) FROM raw.labelworx_event_raw")
-                raw_labelworx = cur.fetchone()[0]
-                cur.execute("SELECT COALESCE(count(*),0), COALESCE(sum(net_amount_eur),0) FROM staging.distribution_event")
-                staging_row = cur.fetchone()
-                staging_count = staging_row[0] if staging_row else 0
-                staging_sum = str(staging_row[1]) if staging_row else '0'
-                cur.execute("SELECT COALESCE(count(*),0), COALESCE(sum(revenue_base),0) FROM dw.fact_revenue")
-                dw_row = cur.fetchone()
-                dw_count = dw_row[0] if dw_row else 0
-                dw_sum = str(dw_row[1]) if dw_row else '0'
+            ledger = LoadLedgerService.snapshot()
         except Exception:
-            raw_bandcamp = raw_zebra = raw_labelworx = 0
-            staging_count = 0
-            staging_sum = '0'
-            dw_count = 0
-            dw_sum = '0'
+            ledger = {}
+
+        def rows(table):
+            return ledger.get(table, {}).get('rows') or 0
+
+        def amount(table):
+            value = ledger.get(table, {}).get('amount')
+            return str(value) if value is not None else None
+
+        updated = [entry['updated_at'] for entry in ledger.values() if entry.get('updated_at')]
         return Response({
             'raw': {
-                'bandcamp': raw_bandcamp,
-                'zebralution': raw_zebra,
-                'labelworx': raw_labelworx,
+                'bandcamp': rows('raw.bandcamp_event_raw'),
+                'zebralution': rows('raw.zebralution_event_raw'),
+                'labelworx': rows('raw.labelworx_event_raw'),
             },
             'staging': {
-                'distribution_events': staging_count,
-                'sum_net_eur': staging_sum,
+                'distribution_events': rows('staging.distribution_event'),
+                'sum_net_eur': amount('staging.distribution_event'),
             },
             'dw': {
-                'fact_revenue_rows': dw_count,
-                'sum_revenue_base': dw_sum,
+                'fact_revenue_rows': rows('dw.fact_revenue'),
+                'sum_revenue_base': amount('dw.fact_revenue'),
+            },
+            'ledger': {
+                'updated_at': max(updated) if updated else None,
+                'estimated': sorted(table for table, entry in ledger.items() if entry.get('estimated')),
             }
         })
 
     @action(detail=False, methods=['get'])
+    @dw_cached
     def monthly_overview(self, request):
         """Get monthly aggregated overview data for the main table"""
         # Get currency parameter
@@ -122,60 +171,106 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
             'EUR': 'revenue_eur'
         }
         currency_field = currency_field_map[currency]
-        
+
         queryset = self.get_dw_queryset()
-        
-        # Group by month and aggregate
-        from django.db.models.functions import TruncMonth
-        monthly_data = queryset.annotate(
-            month=TruncMonth('occurred_at')
-        ).values('month').annotate(
-            total_revenue=Sum(currency_field),
-            total_downloads=Sum('quantity', filter=Q(platform='Bandcamp') | Q(store__icontains='Beatport')),
-            total_streams=Sum('quantity', filter=~Q(platform='Bandcamp') & ~Q(store__icontains='Beatport')),
-            total_transactions=Count('id'),
-            unique_artists=Count('artist_name', distinct=True),
-            unique_tracks=Count('track_title', distinct=True),
-            unique_catalogs=Count('catalog_number', distinct=True),
-            avg_per_transaction=Avg(currency_field)
-        ).order_by('-month')
-        
-        # Add platform breakdown for each month
+
+        # Set-based query: per-month totals plus the top 3 platform/store rows
+        # and the top release per month, ranked with window functions.
+        # The filtered fact rows come from the ORM so the SQL stays in sync
+        # with get_dw_queryset().
+        from django.db.models import F
+        base_sql, base_params = queryset.with_attributes(
+            'platform', 'store', 'store_canonical', 'artist_name', 'track_title', 'catalog_number'
+        ).annotate(
+            revenue=F(currency_field)
+        ).values(
+            'occurred_at', 'platform', 'store', 'store_canonical', 'artist_name', 'track_title',
+            'catalog_number', 'quantity', 'revenue'
+        ).query.sql_with_params()
+
+        # Unique counts: estimated from the month sketches, or an exact COUNT(DISTINCT ...) branch
+        approximate = self.use_distinct_sketches('dw')
+
+        if self.concurrent_aggregates:
+            # The branches are independent; run them as separate
+            # statements on worker connections and merge by month
+            tasks = {
+                'months': lambda: self._run_overview_sql(
+                    base_sql, base_params, ['months'], "SELECT * FROM months"
+                ),
+                'stores': lambda: self._run_overview_sql(
+                    base_sql, base_params, ['ranked_stores', 'top_stores'], "SELECT month, stores FROM top_stores"
+                ),
+                'releases': lambda: self._run_overview_sql(
+                    base_sql, base_params, ['ranked_releases'],
+                    "SELECT month, track_title FROM ranked_releases WHERE rn = 1"
+                ),
+            }
+            if not approximate:
+                tasks['distincts'] = lambda: self._run_overview_sql(
+                    base_sql, base_params, ['month_distincts'], "SELECT * FROM month_distincts"
+                )
+            results = self.run_aggregates(tasks)
+            stores = {row['month']: row['stores'] for row in results['stores']}
+            releases = {row['month']: row['track_title'] for row in results['releases']}
+            distincts = {row['month']: row for row in results.get('distincts', [])}
+            monthly_data = sorted(
+                (
+                    dict(
+                        distincts.get(row['month'], {}), **row,
+                        stores=stores.get(row['month']), track_title=releases.get(row['month'])
+                    )
+                    for row in results['months']
+                ),
+                key=lambda row: row['month'],
+                reverse=True
+            )
+        else:
+            # Single statement joining all branches
+            ctes = ['months', 'ranked_stores', 'top_stores', 'ranked_releases']
+            distinct_columns, distinct_join = '', ''
+            if not approximate:
+                ctes.append('month_distincts')
+                distinct_columns = 'd.unique_artists, d.unique_tracks, d.unique_catalogs,'
+                distinct_join = 'LEFT JOIN month_distincts d ON d.month = m.month'
+            monthly_data = self._run_overview_sql(
+                base_sql, base_params, ctes,
+                f"""
+                SELECT m.month, m.total_revenue, m.total_downloads, m.total_streams,
+                       m.total_transactions, {distinct_columns} m.avg_per_transaction,
+                       r.track_title, s.stores
+                FROM months m
+                LEFT JOIN ranked_releases r ON r.month = m.month AND r.rn = 1
+                LEFT JOIN top_stores s ON s.month = m.month
+                {distinct_join}
+                ORDER BY m.month DESC
+                """
+            )
+
+        if approximate:
+            estimates = DistinctSketchService.monthly('dw', self.get_filters(), ['artist', 'track', 'catalog'])
+            for month_data in monthly_data:
+                counts = estimates.get(month_data['month'], {})
+                month_data['unique_artists'] = counts.get('artist')
+                month_data['unique_tracks'] = counts.get('track')
+                month_data['unique_catalogs'] = counts.get('catalog')
+
         result_data = []
         for month_data in monthly_data:
             month_date = month_data['month']
             if not month_date:
                 continue
-                
-            # Get platform breakdown for this month
-            month_platforms = queryset.filter(
-                occurred_at__year=month_date.year,
-                occurred_at__month=month_date.month
-            ).values('platform', 'store').annotate(
-                revenue=Sum(currency_field),
-                quantity=Sum('quantity')
-            ).order_by('-revenue')
-            
-            # Get top release for this month
-            top_release = queryset.filter(
-                occurred_at__year=month_date.year,
-                occurred_at__month=month_date.month
-            ).exclude(track_title='').values('track_title').annotate(
-                revenue=Sum(currency_field)
-            ).order_by('-revenue').first()
-            
+
             # Get top platforms for this month
             top_platforms = []
             total_month_revenue = month_data['total_revenue'] or 0
-            
-            for platform in month_platforms[:3]:  # Top 3 platforms
-                platform_name = platform['platform']
-                store_name = self.canonical_store(platform.get('store'))
+
+            for platform_name, store_name, raw_revenue, quantity in (month_data['stores'] or []):  # Top 3 platforms
                 display_name = 'Bandcamp' if platform_name == 'Bandcamp' else (store_name or platform_name)
-                
-                platform_revenue = platform['revenue'] or 0
+
+                platform_revenue = Decimal(raw_revenue) if raw_revenue is not None else 0
                 percentage = (platform_revenue / total_month_revenue * 100) if total_month_revenue > 0 else 0
-                quantity = platform['quantity'] or 0
+                quantity = quantity or 0
                 
                 # Determine if it's downloads or streams
                 is_download_platform = platform_name == 'Bandcamp' or 'beatport' in (store_name or '').lower()
@@ -200,14 +295,96 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
                 'unique_artists': month_data['unique_artists'] or 0,
                 'unique_tracks': month_data['unique_tracks'] or 0,
                 'unique_catalogs': month_data['unique_catalogs'] or 0,
+                'unique_counts': 'approximate' if approximate else 'exact',
                 'avg_per_transaction': str(month_data['avg_per_transaction'] or 0),
-                'top_release': top_release['track_title'] if top_release else 'N/A',
+                'top_release': month_data['track_title'] or 'N/A',
                 'top_platforms': top_platforms
             })
         
         return Response(result_data)
 
+    # Named CTEs of monthly_overview; each reads "base" (facts bucketed by month)
+    OVERVIEW_CTES = {
+        'months': """
+            SELECT month,
+                   SUM(revenue) AS total_revenue,
+                   SUM(quantity) FILTER (
+                     WHERE platform = 'Bandcamp' OR store ILIKE '%%Beatport%%'
+                   ) AS total_downloads,
+                   SUM(quantity) FILTER (
+                     -- Null-safe, like the ORM's ~Q(): rows without a platform or store are streams
+                     WHERE platform IS DISTINCT FROM 'Bandcamp' AND NOT (COALESCE(store, '') ILIKE '%%Beatport%%')
+                   ) AS total_streams,
+                   COUNT(*) AS total_transactions,
+                   AVG(revenue) AS avg_per_transaction
+            FROM base
+            WHERE month IS NOT NULL
+            GROUP BY month
+        """,
+        # Exact unique counts; only run with ?exact=1 or filters the sketches cannot answer
+        'month_distincts': """
+            SELECT month,
+                   COUNT(DISTINCT artist_name) AS unique_artists,
+                   COUNT(DISTINCT track_title) AS unique_tracks,
+                   COUNT(DISTINCT catalog_number) AS unique_catalogs
+            FROM base
+            WHERE month IS NOT NULL
+            GROUP BY month
+        """,
+        'ranked_stores': """
+            SELECT month, platform, store_canonical,
+                   SUM(revenue) AS revenue,
+                   SUM(quantity) AS quantity,
+                   ROW_NUMBER() OVER (
+                     PARTITION BY month ORDER BY SUM(revenue) DESC NULLS LAST
+                   ) AS rn
+            FROM base
+            WHERE month IS NOT NULL
+            GROUP BY month, platform, store_canonical
+        """,
+        'top_stores': """
+            SELECT month,
+                   json_agg(
+                     json_build_array(platform, store_canonical, revenue::text, quantity)
+                     ORDER BY rn
+                   ) AS stores
+            FROM ranked_stores
+            WHERE rn <= 3
+            GROUP BY month
+        """,
+        'ranked_releases': """
+            SELECT month, track_title,
+                   ROW_NUMBER() OVER (
+                     PARTITION BY month ORDER BY SUM(revenue) DESC NULLS LAST
+                   ) AS rn
+            FROM base
+            WHERE month IS NOT NULL AND track_title <> ''
+            GROUP BY month, track_title
+        """,
+    }
+
+    def _run_overview_sql(self, base_sql, base_params, ctes, select):
+        """Run a monthly_overview statement over the given CTEs and return dict rows"""
+        from django.db import connection
+        with_clause = ',\n'.join(f"{name} AS ({self.OVERVIEW_CTES[name]})" for name in ctes)
+        with connection.cursor() as cur:
+            cur.execute(
+                f"""
+                WITH facts AS ({base_sql}),
+                base AS (
+                  SELECT date_trunc('month', occurred_at)::date AS month, facts.*
+                  FROM facts
+                ),
+                {with_clause}
+                {select}
+                """,
+                base_params
+            )
+            columns = [col[0] for col in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
     @action(detail=False, methods=['get'])
+    @dw_cached
     def detailed_overview(self, request):
         """Get detailed overview data for the main table"""
         # Get currency parameter
@@ -224,16 +401,57 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
         currency_field = currency_field_map[currency]
         # Switch to DW-backed fact table for unified data
         queryset = self.get_dw_queryset()
-        page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 100))
+
+        if request.query_params.get('pagination') == 'cursor':
+            # Keyset pagination on (revenue_<ccy>, id): every page is an index
+            # range read, no OFFSET and no full count
+            ordered = queryset.with_attributes().order_by(f'-{currency_field}', '-id')
+            cursor = request.query_params.get('cursor')
+            if cursor:
+                try:
+                    last_revenue, last_id = self._decode_cursor(cursor)
+                except ValueError:
+                    return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+                # Qualified: the joined dimension tables have id columns too
+                fact_table = f'"{DwFactRevenue._meta.db_table}"'
+                ordered = ordered.extra(
+                    where=[f'({fact_table}.{currency_field}, {fact_table}.id) < (%s, %s)'],
+                    params=[last_revenue, last_id]
+                )
+            events = list(ordered[:page_size + 1])
+            has_next = len(events) > page_size
+            events = events[:page_size]
+            pagination = {
+                'mode': 'cursor',
+                'page_size': page_size,
+                'has_next': has_next,
+                'next_cursor': self._encode_cursor(getattr(events[-1], currency_field), events[-1].id) if has_next else None,
+            }
+            if request.query_params.get('estimate_total') in ('1', 'true'):
+                pagination['estimated_total_count'] = self._estimate_count(queryset)
+        else:
+            page = int(request.query_params.get('page', 1))
+
+            # Calculate pagination
+            offset = (page - 1) * page_size
+            total_count = queryset.count()
+
+            # Get paginated results - order by the selected currency field
+            events = queryset.with_attributes().order_by(f'-{currency_field}')[offset:offset + page_size]
+            pagination = {
+                'page': page,
+                'page_size': page_size,
+                'total_count': total_count,
+                'total_pages': (total_count + page_size - 1) // page_size
+            }
         
-        # Calculate pagination
-        offset = (page - 1) * page_size
-        total_count = queryset.count()
-        
-        # Get paginated results - order by the selected currency field
-        events = queryset.order_by(f'-{currency_field}')[offset:offset + page_size]
-        
+        if self.is_columnar():
+            return Response({
+                'data': self._detailed_columns(events, currency_field, currency),
+                'pagination': pagination
+            })
+
         detailed_data = []
         for event in events:
             # Determine vendor and data source
@@ -279,31 +497,107 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
         
         return Response({
             'data': detailed_data,
-            'pagination': {
-                'page': page,
-                'page_size': page_size,
-                'total_count': total_count,
-                'total_pages': (total_count + page_size - 1) // page_size
-            }
+            'pagination': pagination
         })
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream DW facts (dataset=dw) or revenue events (dataset=events) as csv, ndjson or parquet"""
+        dataset = request.query_params.get('dataset', 'dw')
+        queryset = self.get_queryset() if dataset == 'events' else self.get_dw_queryset().with_attributes()
+        try:
+            exporter = FactExporter(
+                queryset,
+                dataset=dataset,
+                export_format=request.query_params.get('output', 'csv')
+            )
+        except FactExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(exporter.stream(), content_type=exporter.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{exporter.filename}"'
+        return response
+
+    def _detailed_columns(self, events, currency_field, currency) -> ColumnTable:
+        """detailed_overview rows as columns, with raw Decimal/date values for the columnar renderer"""
+        events = list(events)
+        bandcamp = [event.platform == 'Bandcamp' for event in events]
+        dates = [event.occurred_at for event in events]
+        months = [d.month if d else None for d in dates]
+        columns = {
+            'id': [event.id for event in events],
+            'vendor': ['Bandcamp' if is_bc else 'Distribution' for is_bc in bandcamp],
+            'data_source': ['API' if event.source == 'bandcamp' else 'CSV' for event in events],
+            'year': [d.year if d else None for d in dates],
+            'quarter': [(m - 1) // 3 + 1 if m else None for m in months],
+            'month': months,
+            'date': dates,
+            'catalog_number': [event.catalog_number or '' for event in events],
+            'release_name': [''] * len(events),
+            'release_artist': [''] * len(events),
+            'track_artist': [event.artist_name or '' for event in events],
+            'track_name': [event.track_title or '' for event in events],
+            'isrc': [event.isrc or '' for event in events],
+            'upc_ean': [event.upc_ean or '' for event in events],
+            'platform': [
+                'Bandcamp' if is_bc else (event.store or event.platform or '')
+                for event, is_bc in zip(events, bandcamp)
+            ],
+            'downloads': [event.quantity if is_bc else 0 for event, is_bc in zip(events, bandcamp)],
+            'streams': [0 if is_bc else event.quantity for event, is_bc in zip(events, bandcamp)],
+            'revenue': [getattr(event, currency_field) for event in events],
+            'currency': [currency] * len(events),
+            'original_amount': [event.revenue_base for event in events],
+            'source_file': [''] * len(events),
+        }
+        integers = ('id', 'year', 'quarter', 'month', 'downloads', 'streams')
+        decimals = ('revenue', 'original_amount')
+        types = [
+            'integer' if name in integers else 'decimal' if name in decimals
+            else 'date' if name == 'date' else 'string'
+            for name in columns
+        ]
+        return ColumnTable(columns, columns.values(), types)
+
+    def _encode_cursor(self, revenue, pk) -> str:
+        payload = json.dumps([str(revenue), pk]).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii')
+
+    def _decode_cursor(self, token: str):
+        try:
+            revenue, pk = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            return Decimal(revenue), int(pk)
+        except Exception as e:
+            raise ValueError(f'Invalid cursor: {token}') from e
+
+    def _estimate_count(self, queryset) -> int:
+        """Row estimate from the planner statistics instead of an exact count(*)"""
+        try:
+            plan = json.loads(queryset.explain(format='json'))
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception:
+            return 0
+
     @action(detail=False, methods=['get'])
     def data_source_summary(self, request):
         """Get summary of data sources (API vs CSV)"""
         queryset = self.get_queryset()
         
         # Group by data source type
-        api_data = queryset.filter(source_file__datasource__name__icontains='api').aggregate(
-            revenue=Sum('net_amount_base'),
-            count=Count('id')
-        )
-        
-        csv_data = queryset.exclude(source_file__datasource__name__icontains='api').aggregate(
-            revenue=Sum('net_amount_base'),
-            count=Count('id')
-        )
-        
-        total_revenue = queryset.aggregate(total=Sum('net_amount_base'))['total'] or Decimal('0')
+        results = self.run_aggregates({
+            'api': lambda: queryset.filter(source_file__datasource__name__icontains='api').aggregate(
+                revenue=Sum('net_amount_base'),
+                count=Count('id')
+            ),
+            'csv': lambda: queryset.exclude(source_file__datasource__name__icontains='api').aggregate(
+                revenue=Sum('net_amount_base'),
+                count=Count('id')
+            ),
+            'total': lambda: queryset.aggregate(total=Sum('net_amount_base'))['total'],
+        })
+        api_data = results['api']
+        csv_data = results['csv']
+        total_revenue = results['total'] or Decimal('0')
         
         return Response({
             'api_source': {
@@ -320,8 +614,15 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @dw_cached
     def monthly_revenue_chart(self, request):
-        """Get daily revenue data for line chart with more granular view"""
+        """
+        Get revenue time series for the line chart
+
+        Query params: granularity (day|week|month|quarter|year, default month),
+        top (number of distribution stores charted before "Others", default 5)
+        and layout=columns for the compact columnar form.
+        """
         # Get currency parameter
         currency = request.GET.get('currency', 'BRL').upper()
         if currency not in ['BRL', 'USD', 'EUR']:
@@ -334,119 +635,85 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
             'EUR': 'revenue_eur'
         }
         currency_field = currency_field_map[currency]
-        
-        queryset = self.get_dw_queryset()
-        
-        # Aggregate by month, and use store name for distribution
-        from django.db.models.functions import TruncMonth
-        daily_data = queryset.annotate(
-            period=TruncMonth('occurred_at')
-        ).values('period', 'platform', 'store').annotate(
-            revenue=Sum(currency_field),
-            transactions=Count('id')
-        ).order_by('period', 'platform', 'store')
-        
-        # Build daily chart data
-        chart_data = {}
-        
-        # First pass: collect all platforms and determine date range
-        all_platforms = set()
-        min_date = None
-        max_date = None
-        
-        for item in daily_data:
-            if item['period']:
-                date_obj = item['period']
-                platform_name = item['platform']
-                store_name = self.canonical_store(item.get('store'))
-                
-                # Track date range
-                if min_date is None or date_obj < min_date:
-                    min_date = date_obj
-                if max_date is None or date_obj > max_date:
-                    max_date = date_obj
-                
-                # Bandcamp single series; Distribution broken down by store
-                key = 'Bandcamp' if platform_name == 'Bandcamp' else (store_name or None)
-                if key:
-                    all_platforms.add(key)
-        
-        # Generate continuous monthly timeline from min to max date
-        from datetime import datetime, timedelta
-        from dateutil.relativedelta import relativedelta
-        
-        chart_data = {}
-        if min_date and max_date:
-            current_date = min_date
-            while current_date <= max_date:
-                date_str = str(current_date)
-                chart_data[date_str] = {'period': date_str}
-                for platform in all_platforms:
-                    chart_data[date_str][platform] = None
-                current_date += relativedelta(months=1)
-        
-        # Second pass: add actual revenue data
-        for item in daily_data:
-            if item['period'] and item['revenue']:
-                date_str = str(item['period'])
-                platform_name = item['platform']
-                store_name = self.canonical_store(item.get('store'))
-                revenue = float(item['revenue'])
-                
-                # Bandcamp single series; Distribution broken down by store
-                key = 'Bandcamp' if platform_name == 'Bandcamp' else (store_name or None)
-                if key and revenue > 0:
-                    if chart_data[date_str][key] is None:
-                        chart_data[date_str][key] = revenue
-                    else:
-                        chart_data[date_str][key] += revenue
-        
-        # Apply top 5 distribution platforms + Others aggregation
-        # 1) Calculate totals per platform (excluding Bandcamp)
-        platform_totals = {}
-        for row in chart_data.values():
-            for k, v in row.items():
-                if k == 'period':
-                    continue
-                if k != 'Bandcamp' and v is not None:
-                    platform_totals[k] = platform_totals.get(k, 0) + v
-        
-        # 2) Get top 5 distribution platforms by total revenue
-        top5_platforms = sorted(platform_totals.items(), key=lambda x: x[1], reverse=True)[:5]
-        top5_keys = {k for k, _ in top5_platforms}
-        
-        # 3) Build final chart data with top 5 + Others
-        chart_list = []
-        for date_key in sorted(chart_data.keys()):
-            row = chart_data[date_key]
-            out = {'period': row['period']}
-            
-            # Always include Bandcamp if it exists
-            if 'Bandcamp' in row:
-                out['Bandcamp'] = row['Bandcamp']
-            
-            # Add top 5 distribution platforms
-            others_total = 0
-            others_has_data = False
-            for k, v in row.items():
-                if k == 'period' or k == 'Bandcamp':
-                    continue
-                if k in top5_keys:
-                    out[k] = v
-                else:
-                    if v is not None:
-                        others_total += v
-                        others_has_data = True
-            
-            # Add Others only if there's actual data (not just null values)
-            if others_has_data:
-                out['Others'] = others_total if others_total > 0 else None
-            
-            chart_list.append(out)
-        
-        return Response(chart_list)
+
+        granularity = request.query_params.get('granularity', 'month')
+        try:
+            top_n = int(request.query_params.get('top', 5))
+        except ValueError:
+            return Response({'error': 'top must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Day and week buckets need daily facts; coarser buckets read the monthly rollup
+        if granularity in ('day', 'week'):
+            queryset, date_field = self.get_dw_queryset().with_attributes('platform', 'store_canonical'), 'occurred_at'
+        else:
+            queryset, date_field = self.get_rollup_queryset(), 'month'
+
+        try:
+            engine = TimeSeriesEngine(queryset, date_field, currency_field, granularity=granularity, top_n=top_n)
+        except TimeSeriesError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('layout') == 'columns':
+            return Response(engine.columns())
+        return Response(engine.rows())
 
     @action(detail=False, methods=['get'])
+    @dw_cached
+    def pivot(self, request):
+        """
+        Measures grouped by any dimensions, with subtotals, in one query
+
+        Query params: dimensions (comma-separated, in nesting order: month,
+        quarter, year, source, platform, store, artist, catalog, isrc),
+        measures (revenue_brl, revenue_usd, revenue_eur, revenue_base,
+        quantity, transactions; default revenue in ``currency``, quantity and
+        transactions) and totals (rollup = subtotals per level, cube = every
+        combination, none). Each row lists the dimensions it sums over in
+        ``subtotal``; the row with every dimension there is the grand total.
+        """
+        currency = request.GET.get('currency', 'BRL').upper()
+        if currency not in ['BRL', 'USD', 'EUR']:
+            currency = 'BRL'
+
+        def split(name):
+            return [part.strip() for raw in request.query_params.getlist(name)
+                    for part in raw.split(',') if part.strip()]
+
+        try:
+            pivot = PivotQuery(
+                split('dimensions'),
+                split('measures') or [f'revenue_{currency.lower()}', 'quantity', 'transactions'],
+                totals=request.query_params.get('totals', 'rollup'),
+            )
+            # Month-grain dimensions read the rollup; isrc needs the facts
+            use_rollup = not pivot.needs_facts and DwAggMonthStore.objects.exists()
+            if use_rollup:
+                queryset = self.get_filters().apply(DwAggMonthStore.objects.all(), 'rollup')
+            else:
+                queryset = self.get_dw_queryset().with_attributes()
+            rows = pivot.build(queryset, rollup=use_rollup)
+        except PivotError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if rows and not self.is_columnar():
+            # Money as exact strings, like the other endpoints
+            revenue = [name for name in pivot.measures if name.startswith('revenue_')]
+            for row in rows:
+                for name in revenue:
+                    row[name] = str(row[name] or 0)
+                for name in ('month', 'quarter'):
+                    if row.get(name) is not None:
+                        row[name] = str(row[name])
+
+        return Response({
+            'dimensions': pivot.dimensions,
+            'measures': pivot.measures,
+            'totals': pivot.totals,
+            'rows': ColumnTable.from_rows(rows) if rows and self.is_columnar() else rows,
+        })
+
+    @action(detail=False, methods=['get'])
+    @dw_cached
     def platform_pie_chart(self, request):
         """Get platform revenue data for pie chart"""
         # Get currency parameter
@@ -462,17 +729,20 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
         }
         currency_field = currency_field_map[currency]
         
-        queryset = self.get_dw_queryset()
+        queryset = self.get_rollup_queryset()
         
         # Aggregate by effective display name:
         #  - 'Bandcamp' stays as Bandcamp
-        #  - Distribution is shown per store name (Spotify, Apple Music, etc.)
-        platform_data = queryset.values('platform', 'store').annotate(
-            revenue=Sum(currency_field),
-            transactions=Count('id')
-        ).order_by('-revenue')
-        
-        total_revenue = queryset.aggregate(total=Sum(currency_field))['total'] or Decimal('0')
+        #  - Distribution is shown per canonical store (dw.dim_store: Spotify, Apple Music, etc.)
+        results = self.run_aggregates({
+            'platforms': lambda: list(queryset.values('platform', 'store_canonical').annotate(
+                revenue=Sum(currency_field),
+                transaction_count=Sum('transactions')
+            ).order_by('-revenue')),
+            'total': lambda: queryset.aggregate(total=Sum(currency_field))['total'],
+        })
+        platform_data = results['platforms']
+        total_revenue = results['total'] or Decimal('0')
         
         # Collapse into a simple name -> totals mapping
         aggregated = {}
@@ -493,14 +763,14 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
         
         for row in platform_data:
             platform_name = row['platform']
-            store_name = self.canonical_store(row.get('store'))
+            store_name = row['store_canonical']
             display_name = 'Bandcamp' if platform_name == 'Bandcamp' else (store_name or 'Distribution')
             if display_name not in aggregated:
                 aggregated[display_name] = {'revenue': Decimal('0'), 'transactions': 0}
             aggregated[display_name]['revenue'] += row['revenue'] or Decimal('0')
-            aggregated[display_name]['transactions'] += row['transactions'] or 0
+            aggregated[display_name]['transactions'] += row['transaction_count'] or 0
         
-        # Return ALL platforms sorted by revenue - let frontend handle filtering
+        # Return every platform in the selection sorted by revenue
         sorted_items = sorted(aggregated.items(), key=lambda kv: kv[1]['revenue'], reverse=True)
         pie_data = []
         for name, stats in sorted_items:
@@ -517,46 +787,49 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
         return Response(pie_data)
 
     @action(detail=False, methods=['get'])
+    @dw_cached
     def filter_options(self, request):
-        """Get available filter options"""
-        queryset = self.get_dw_queryset()
-        
-        # Get unique values for filters
-        years = queryset.extra(
-            select={'year': 'EXTRACT(year FROM occurred_at)'}
-        ).values('year').distinct().order_by('-year')
-        
-        platforms = queryset.values('platform').distinct().order_by('platform')
-        
-        artists = queryset.exclude(artist_name='').values(
-            'artist_name'
-        ).distinct().order_by('artist_name')[:100]  # Limit for performance
-        
-        catalogs = queryset.exclude(catalog_number='').values(
-            'catalog_number'
-        ).distinct().order_by('catalog_number')
-        
+        """Get available filter options with row counts and revenue per value"""
+        filters = self.get_filters()
+        # Unfiltered requests read the facet index; a selection recounts the
+        # facets over the matching rollup rows
+        facets = FacetIndexService.load(None if filters.is_empty() else self.get_rollup_queryset())
+
+        def options(name, label=str):
+            return [
+                {'value': value, 'label': label(value), 'count': rows, 'revenue': str(revenue)}
+                for value, rows, revenue in facets[name]
+            ]
+
+        # Quarters are always listed, with zero counts for quarters without data
+        quarter_stats = {value: (rows, revenue) for value, rows, revenue in facets['quarter']}
+
         # Get data source types
         source_types = [
             {'value': 'all', 'label': 'All Sources'},
             {'value': 'api', 'label': 'API Data'},
             {'value': 'csv', 'label': 'CSV Data'}
         ]
-        
+
         return Response({
-            'years': [{'value': int(y['year']), 'label': str(int(y['year']))} for y in years if y['year']],
+            'years': options('year'),
             'quarters': [
-                {'value': 1, 'label': 'Q1'},
-                {'value': 2, 'label': 'Q2'},
-                {'value': 3, 'label': 'Q3'},
-                {'value': 4, 'label': 'Q4'}
+                {
+                    'value': q,
+                    'label': f'Q{q}',
+                    'count': quarter_stats.get(q, (0, 0))[0],
+                    'revenue': str(quarter_stats.get(q, (0, 0))[1])
+                }
+                for q in range(1, 5)
             ],
             'months': [
                 {'value': i, 'label': f'Month {i}'} for i in range(1, 13)
             ],
-            'platforms': [{'value': p['platform'], 'label': p['platform']} for p in platforms],
-            'artists': [{'value': a['artist_name'], 'label': a['artist_name']} for a in artists],
-            'catalogs': [{'value': c['catalog_number'], 'label': c['catalog_number']} for c in catalogs],
+            'platforms': options('platform'),
+            'stores': options('store'),
+            'artists': options('artist'),
+            'catalogs': options('catalog'),
+            'sources': options('source'),
             'source_types': source_types
         })
 
@@ -579,93 +852,98 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @count_queries
     def kpi_summary(self, request):
         """Get KPI summary data for dashboard cards"""
         queryset = self.get_queryset()
-        dw_qs = self.get_dw_queryset()
-        
-        # Basic aggregations
-        total_stats = queryset.aggregate(
-            total_revenue=Sum('net_amount_base'),
-            total_transactions=Count('id'),
-            avg_per_transaction=Avg('net_amount_base')
-        )
-        
-        # Count unique artists and tracks
-        unique_artists = queryset.exclude(track_artist_name='').values('track_artist_name').distinct().count()
-        unique_tracks = queryset.exclude(track_title='').values('track_title').distinct().count()
-        
-        # Platform breakdown
-        platform_stats = queryset.values('platform__name').annotate(
-            revenue=Sum('net_amount_base'),
-            transactions=Count('id')
-        ).order_by('-revenue')
-        
-        # Top performing data
-        top_artist = queryset.exclude(track_artist_name='').values('track_artist_name').annotate(
-            revenue=Sum('net_amount_base')
-        ).order_by('-revenue').first()
-        
-        top_track = queryset.exclude(track_title='').values('track_title', 'track_artist_name').annotate(
-            revenue=Sum('net_amount_base')
-        ).order_by('-revenue').first()
-        
+        dw_qs = self.get_rollup_queryset()
+
         # Revenue analysis by time periods (use timezone-aware datetimes)
-        from django.db.models import F
-        
         now = timezone.now()
         current_month = now.replace(day=1)
         last_month = current_month - timedelta(days=32)
         last_month = last_month.replace(day=1)
-        
+
         # Construct aware year boundaries
         current_tz = timezone.get_current_timezone()
         current_year = timezone.make_aware(datetime(now.year, 1, 1), current_tz)
         last_year = timezone.make_aware(datetime(now.year - 1, 1, 1), current_tz)
         last_year_end = timezone.make_aware(datetime(now.year - 1, 12, 31, 23, 59, 59), current_tz)
-        
+        twelve_months_ago = current_month - timedelta(days=365)
+
+        # Unique artists/tracks: HyperLogLog estimates unless ?exact=1 or the filters need the events
+        approximate = self.use_distinct_sketches('events')
+        distinct_counts = {} if approximate else {
+            'unique_artists': Count('track_artist_name', distinct=True, filter=~Q(track_artist_name='')),
+            'unique_tracks': Count('track_title', distinct=True, filter=~Q(track_title='')),
+        }
+
+        # The three scans below are independent, so they can run concurrently.
+        # Scan 1: totals, distinct counts and every period total in one pass
+        # using FILTER (WHERE ...) aggregates
+        results = self.run_aggregates({
+            'total_stats': lambda: queryset.aggregate(
+                total_revenue=Sum('net_amount_base'),
+                total_transactions=Count('id'),
+                avg_per_transaction=Avg('net_amount_base'),
+                **distinct_counts,
+                current_month_revenue=Sum('net_amount_base', filter=Q(occurred_at__gte=current_month)),
+                last_month_revenue=Sum(
+                    'net_amount_base',
+                    filter=Q(occurred_at__gte=last_month, occurred_at__lt=current_month)
+                ),
+                current_year_revenue=Sum('net_amount_base', filter=Q(occurred_at__gte=current_year)),
+                last_year_revenue=Sum(
+                    'net_amount_base',
+                    filter=Q(occurred_at__gte=last_year, occurred_at__lte=last_year_end)
+                ),
+                trailing_year_revenue=Sum('net_amount_base', filter=Q(occurred_at__gte=twelve_months_ago)),
+            ),
+            # Scan 2: platform breakdown plus top artist and top track via GROUPING SETS
+            'breakdowns': lambda: self._kpi_breakdowns(queryset),
+            # Scan 3: Bandcamp and Distribution totals from DW - already in BRL
+            'dw_totals': lambda: dw_qs.aggregate(
+                bandcamp=Sum('revenue_brl', filter=Q(platform='Bandcamp')),
+                distribution=Sum('revenue_brl', filter=~Q(platform='Bandcamp')),
+                total=Sum('revenue_brl')
+            ),
+        })
+        total_stats = results['total_stats']
+        platform_stats, top_artist, top_track = results['breakdowns']
+        dw_totals = results['dw_totals']
+
+        if approximate:
+            estimates = DistinctSketchService.totals('events', self.get_filters(), ['artist', 'track'])
+            unique_artists, unique_tracks = estimates['artist'], estimates['track']
+        else:
+            unique_artists = total_stats['unique_artists']
+            unique_tracks = total_stats['unique_tracks']
+
         # Current month vs last month
-        current_month_revenue = queryset.filter(
-            occurred_at__gte=current_month
-        ).aggregate(revenue=Sum('net_amount_base'))['revenue'] or 0
-        
-        last_month_revenue = queryset.filter(
-            occurred_at__gte=last_month,
-            occurred_at__lt=current_month
-        ).aggregate(revenue=Sum('net_amount_base'))['revenue'] or 0
-        
+        current_month_revenue = total_stats['current_month_revenue'] or 0
+        last_month_revenue = total_stats['last_month_revenue'] or 0
+
         monthly_growth_rate = 0
         if last_month_revenue > 0:
             monthly_growth_rate = ((current_month_revenue - last_month_revenue) / last_month_revenue) * 100
-        
+
         # Current year vs last year
-        current_year_revenue = queryset.filter(
-            occurred_at__gte=current_year
-        ).aggregate(revenue=Sum('net_amount_base'))['revenue'] or 0
-        
-        last_year_revenue = queryset.filter(
-            occurred_at__gte=last_year,
-            occurred_at__lte=last_year_end
-        ).aggregate(revenue=Sum('net_amount_base'))['revenue'] or 0
-        
+        current_year_revenue = total_stats['current_year_revenue'] or 0
+        last_year_revenue = total_stats['last_year_revenue'] or 0
+
         yearly_growth_rate = 0
         if last_year_revenue > 0:
             yearly_growth_rate = ((current_year_revenue - last_year_revenue) / last_year_revenue) * 100
-        
+
         # Average monthly revenue (last 12 months)
-        twelve_months_ago = current_month - timedelta(days=365)
-        avg_monthly_revenue = queryset.filter(
-            occurred_at__gte=twelve_months_ago
-        ).aggregate(revenue=Sum('net_amount_base'))['revenue'] or 0
-        avg_monthly_revenue = avg_monthly_revenue / 12
-        
-        # Bandcamp and Distribution totals from DW - already in BRL
-        bandcamp_total_brl = dw_qs.filter(platform='Bandcamp').aggregate(total=Sum('revenue_brl'))['total'] or 0
-        distribution_total_brl = dw_qs.exclude(platform='Bandcamp').aggregate(total=Sum('revenue_brl'))['total'] or 0
+        avg_monthly_revenue = (total_stats['trailing_year_revenue'] or 0) / 12
+
+        bandcamp_total_brl = dw_totals['bandcamp'] or 0
+        distribution_total_brl = dw_totals['distribution'] or 0
         overall_total_brl = bandcamp_total_brl + distribution_total_brl
-        
+
         # Total revenue from DW (already in BRL)
-        total_revenue_brl = dw_qs.aggregate(total=Sum('revenue_brl'))['total'] or 0
+        total_revenue_brl = dw_totals['total'] or 0
         avg_per_transaction_brl = total_revenue_brl / (total_stats['total_transactions'] or 1)
 
         return Response({
@@ -673,6 +951,7 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
             'total_transactions': total_stats['total_transactions'] or 0,
             'unique_artists': unique_artists,
             'unique_tracks': unique_tracks,
+            'unique_counts': 'approximate' if approximate else 'exact',
             'avg_per_transaction': str(avg_per_transaction_brl),
             'bandcamp_total': str(bandcamp_total_brl),
             'distribution_total': str(distribution_total_brl),
@@ -704,7 +983,67 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
             ]
         })
 
+    def _kpi_breakdowns(self, queryset):
+        """
+        Platform breakdown, top artist and top track for kpi_summary in one scan.
+
+        Returns (platform rows, top artist dict or None, top track dict or None)
+        shaped like the equivalent values()/annotate() results.
+        """
+        from django.db import connection
+        base_sql, base_params = queryset.values(
+            'platform__name', 'track_artist_name', 'track_title', 'net_amount_base'
+        ).query.sql_with_params()
+
+        with connection.cursor() as cur:
+            cur.execute(
+                f"""
+                WITH base AS ({base_sql}),
+                grouped AS (
+                  SELECT platform__name AS platform_name, track_artist_name, track_title,
+                         GROUPING(platform__name, track_artist_name, track_title) AS grp,
+                         SUM(net_amount_base) AS revenue,
+                         COUNT(*) AS transactions
+                  FROM base
+                  GROUP BY GROUPING SETS ((platform__name), (track_artist_name), (track_title, track_artist_name))
+                ),
+                ranked AS (
+                  SELECT grouped.*,
+                         ROW_NUMBER() OVER (PARTITION BY grp ORDER BY revenue DESC NULLS LAST) AS rn
+                  FROM grouped
+                  WHERE grp = 3
+                     OR (grp = 5 AND track_artist_name <> '')
+                     OR (grp = 4 AND track_title <> '')
+                )
+                SELECT grp, platform_name, track_artist_name, track_title, revenue, transactions
+                FROM ranked
+                WHERE grp = 3 OR rn = 1
+                ORDER BY grp, rn
+                """,
+                base_params
+            )
+            rows = cur.fetchall()
+
+        # GROUPING() bitmask over (platform, artist, title): 3 = platform set,
+        # 5 = artist set, 4 = title + artist set
+        platform_stats = [
+            {'platform__name': name, 'revenue': revenue, 'transactions': transactions}
+            for grp, name, _, _, revenue, transactions in rows if grp == 3
+        ]
+        top_artist = next(
+            ({'track_artist_name': artist, 'revenue': revenue}
+             for grp, _, artist, _, revenue, _ in rows if grp == 5),
+            None
+        )
+        top_track = next(
+            ({'track_title': title, 'track_artist_name': artist, 'revenue': revenue}
+             for grp, _, artist, title, revenue, _ in rows if grp == 4),
+            None
+        )
+        return platform_stats, top_artist, top_track
+
     @action(detail=False, methods=['get'])
+    @dw_cached
     def currency_data(self, request):
         """Get revenue data in all currencies (BRL, USD, EUR)"""
         currency = request.GET.get('currency', 'BRL').upper()
@@ -721,16 +1060,15 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
         
         currency_field = currency_field_map[currency]
         
-        queryset = self.get_dw_queryset()
+        queryset = self.get_rollup_queryset()
         
         # Get totals in selected currency
-        bandcamp_total = queryset.filter(platform='Bandcamp').aggregate(
-            total=Sum(currency_field)
-        )['total'] or 0
-        
-        distribution_total = queryset.exclude(platform='Bandcamp').aggregate(
-            total=Sum(currency_field)
-        )['total'] or 0
+        results = self.run_aggregates({
+            'bandcamp': lambda: queryset.filter(platform='Bandcamp').aggregate(total=Sum(currency_field))['total'],
+            'distribution': lambda: queryset.exclude(platform='Bandcamp').aggregate(total=Sum(currency_field))['total'],
+        })
+        bandcamp_total = results['bandcamp'] or 0
+        distribution_total = results['distribution'] or 0
         
         overall_total = bandcamp_total + distribution_total
         
@@ -744,18 +1082,26 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def revenue_by_artist(self, request):
         """Get revenue breakdown by artist"""
-        queryset = self.get_queryset()
         limit = int(request.query_params.get('limit', 50))
-        
-        total_revenue = queryset.aggregate(total=Sum('net_amount_base'))['total'] or Decimal('0')
-        
-        artist_revenue = queryset.exclude(track_artist_name='').values(
-            'track_artist_name'
-        ).annotate(
-            revenue=Sum('net_amount_base'),
-            tracks_count=Count('isrc', distinct=True),
-            transactions=Count('id')
-        ).order_by('-revenue')[:limit]
+        label_id = self.get_leaderboard_label()
+        filters = self.get_filters()
+
+        if LeaderboardService.supports(filters):
+            artist_revenue, total_revenue = LeaderboardService.top_artists(filters, limit, label_id)
+            total_revenue = total_revenue or Decimal('0')
+        else:
+            queryset = self.get_queryset()
+            if label_id is not None:
+                queryset = queryset.filter(label_id=label_id)
+            total_revenue = queryset.aggregate(total=Sum('net_amount_base'))['total'] or Decimal('0')
+
+            artist_revenue = queryset.exclude(track_artist_name='').values(
+                'track_artist_name'
+            ).annotate(
+                revenue=Sum('net_amount_base'),
+                tracks_count=Count('isrc', distinct=True),
+                transactions=Count('id')
+            ).order_by('-revenue')[:limit]
         
         artists_data = []
         for artist in artist_revenue:
@@ -778,18 +1124,26 @@ class RevenueAnalysisViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def revenue_by_track(self, request):
         """Get revenue breakdown by track"""
-        queryset = self.get_queryset()
         limit = int(request.query_params.get('limit', 50))
-        
-        total_revenue = queryset.aggregate(total=Sum('net_amount_base'))['total'] or Decimal('0')
-        
-        track_revenue = queryset.exclude(isrc='').exclude(
-            isrc__icontains='Exchange'
-        ).values('isrc', 'track_artist_name', 'track_title', 'catalog_number').annotate(
-            revenue=Sum('net_amount_base'),
-            streams=Count('id'),
-            avg_per_stream=Avg('net_amount_base')
-        ).order_by('-revenue')[:limit]
+        label_id = self.get_leaderboard_label()
+        filters = self.get_filters()
+
+        if LeaderboardService.supports(filters):
+            track_revenue, total_revenue = LeaderboardService.top_tracks(filters, limit, label_id)
+            total_revenue = total_revenue or Decimal('0')
+        else:
+            queryset = self.get_queryset()
+            if label_id is not None:
+                queryset = queryset.filter(label_id=label_id)
+            total_revenue = queryset.aggregate(total=Sum('net_amount_base'))['total'] or Decimal('0')
+
+            track_revenue = queryset.exclude(isrc='').exclude(
+                isrc__icontains='Exchange'
+            ).values('isrc', 'track_artist_name', 'track_title', 'catalog_number').annotate(
+                revenue=Sum('net_amount_base'),
+                streams=Count('id'),
+                avg_per_stream=Avg('net_amount_base')
+            ).order_by('-revenue')[:limit]
         
         tracks_data = []
         for track in track_revenue:
@@ -0,0 +1,200 @@
+"""
+Request metrics
+
+RequestMetricsMiddleware records, per view and action, the request latency,
+SQL query count, DB time and response size. /api/metrics serves the
+aggregates in the Prometheus text exposition format, and requests slower than
+METRICS_SLOW_REQUEST_MS are logged with their most expensive SQL statements
+(the latest ones are also listed at /api/metrics/slow).
+
+Metrics live in process memory, so each server worker exposes its own series.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+
+from finances.services.instrumentation import QueryCounter
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+METRICS_PATHS = ('/api/metrics', '/api/metrics/slow')
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Process-wide store of per-endpoint metrics"""
+
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Request latency in seconds', LATENCY_BUCKETS),
+        'http_request_db_queries': ('SQL statements issued per request', QUERY_BUCKETS),
+        'http_request_db_seconds': ('Time spent in the database per request', LATENCY_BUCKETS),
+        'http_response_size_bytes': ('Response body size in bytes', SIZE_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self.slow_requests = deque(maxlen=getattr(settings, 'METRICS_SLOW_REQUEST_LOG_SIZE', 50))
+
+    def observe(self, labels: tuple, duration: float, queries: int, db_time: float, size):
+        values = {
+            'http_request_duration_seconds': duration,
+            'http_request_db_queries': queries,
+            'http_request_db_seconds': db_time,
+            'http_response_size_bytes': size,
+        }
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    name: Histogram(buckets) for name, (_, buckets) in self.HISTOGRAMS.items()
+                }
+            for name, value in values.items():
+                # Streaming responses have no known size
+                if value is not None:
+                    series[name].observe(value)
+
+    def render(self) -> str:
+        """Serialize every series in the Prometheus text exposition format"""
+        with self._lock:
+            snapshot = {
+                labels: {name: (list(h.counts), h.total, h.sum) for name, h in series.items()}
+                for labels, series in self._series.items()
+            }
+
+        lines = []
+        for name, (help_text, buckets) in self.HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, series in sorted(snapshot.items()):
+                counts, total, value_sum = series[name]
+                label_text = _format_labels(labels)
+                for bound, count in zip(buckets, counts):
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {total}')
+                lines.append(f'{name}_sum{{{label_text}}} {value_sum}')
+                lines.append(f'{name}_count{{{label_text}}} {total}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.slow_requests.clear()
+
+
+registry = MetricsRegistry()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: tuple) -> str:
+    view, action, method, status = labels
+    return f'view="{_escape(view)}",action="{_escape(action)}",method="{method}",status="{status}"'
+
+
+def _view_labels(request):
+    """(view, action) for the resolved view; DRF viewsets report their action name"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', ''
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    view = view_class.__name__ if view_class else match.view_name or func.__name__
+    actions = getattr(func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), '')
+    return view, action
+
+
+class RequestMetricsMiddleware:
+    """Records latency, SQL query count/time and response size for every request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500)
+        self.slow_statements = getattr(settings, 'METRICS_SLOW_REQUEST_STATEMENTS', 5)
+
+    def __call__(self, request):
+        if request.path.rstrip('/') in METRICS_PATHS:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with QueryCounter(keep_statements=True) as counter:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view, action = _view_labels(request)
+        size = None if response.streaming else len(response.content)
+        registry.observe((view, action, request.method, response.status_code),
+                         duration, counter.count, counter.db_time, size)
+
+        if duration * 1000 >= self.slow_ms:
+            self._log_slow_request(request, view, action, duration, counter)
+        return response
+
+    def _log_slow_request(self, request, view, action, duration, counter):
+        worst = sorted(counter.statements, key=lambda item: item[0], reverse=True)[:self.slow_statements]
+        entry = {
+            'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'path': request.get_full_path(),
+            'view': view,
+            'action': action,
+            'duration_ms': round(duration * 1000, 1),
+            'queries': counter.count,
+            'db_ms': round(counter.db_time * 1000, 1),
+            'worst_statements': [
+                {'ms': round(elapsed * 1000, 2), 'sql': sql} for elapsed, sql in worst
+            ],
+        }
+        registry.slow_requests.append(entry)
+        logger.warning(
+            f"Slow request {entry['path']} ({view}.{action}): {entry['duration_ms']}ms, "
+            f"{counter.count} queries, {entry['db_ms']}ms in DB; worst: "
+            + '; '.join(f"{s['ms']}ms {s['sql'][:200]}" for s in entry['worst_statements'])
+        )
+
+
+def _metrics_allowed(request) -> bool:
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    return settings.DEBUG or request.META.get('REMOTE_ADDR') in allowed
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint (local addresses only)"""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden('Metrics are only available locally')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def slow_requests_view(request):
+    """Most recent slow requests with their worst SQL statements, newest first"""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden('Metrics are only available locally')
+    return JsonResponse({'slow_requests': list(reversed(registry.slow_requests))},
+                        json_dumps_params={'indent': 2})
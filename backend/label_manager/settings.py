@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'label_manager.metrics.RequestMetricsMiddleware',  # First, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware (before CommonMiddleware)
@@ -96,9 +97,24 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Persistent connections are opt-in (e.g. 60 for the async finance aggregate workers,
+        # which then reuse theirs across requests); by default each request closes its own
+        'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': os.getenv('POSTGRES_CONN_HEALTH_CHECKS', '').lower() in ('1', 'true', 'yes'),
     }
 }
 
+# Worker threads (each with its own DB connection) used by the async finance
+# analytics endpoints to run independent aggregates concurrently
+FINANCES_AGGREGATE_WORKERS = int(os.getenv('FINANCES_AGGREGATE_WORKERS', '4'))
+
+# Request metrics (/api/metrics): requests slower than this are logged with
+# their worst SQL statements
+METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', '500'))
+METRICS_SLOW_REQUEST_STATEMENTS = 5
+METRICS_SLOW_REQUEST_LOG_SIZE = 50
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -18,9 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .metrics import metrics_view, slow_requests_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics', metrics_view, name='metrics'),
+    path('api/metrics/slow', slow_requests_view, name='metrics-slow'),
     path('api/', include('api.urls')),
     path('', include('finances.urls')),
 ]